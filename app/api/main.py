@@ -1,12 +1,73 @@
+import asyncio
+import json
 import logging
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 import uvicorn
 
+from ..config import (
+    WARMUP_ENABLED,
+    WARMUP_TIMEOUT,
+    WARMUP_APPLICATIONS,
+    WARMUP_QUESTION,
+    SERVER_TIMING_ENABLED,
+    EVENT_LOOP_LAG_INTERVAL,
+    MAP_REDUCE_THRESHOLD_TOKENS,
+    GRAPH_ANALYTICS_ENABLED,
+)
+from ..mcp_client import create_session_pool, set_session_pool, get_session_pool, imaging_session
+from ..mcp_pool import MCPSessionPool
+from ..llm_client import init_anthropic_client, close_anthropic_client
+from ..tool_catalog import tool_catalog_cache, get_tool_catalog
+from ..tool_args import shape_memory
+from ..tools import application_inventory
+from ..result_cache import tool_result_cache
+from ..summary_cache import summary_cache
+from ..singleflight import SingleFlight, normalize_text
+from ..warmup import Warmup, WarmupStep, prefetch_all
+from ..metrics import registry, record_error, watch_event_loop_lag
+from ..profiling import profiled, span
+from ..compaction import compact_payload, SUMMARY_SECTIONS, IMPACT_SECTIONS, IMPACT_BATCH_SECTIONS
+from ..mapreduce import needs_map_reduce
+from ..graph_analytics import with_graph_analytics
 from ..services.summary_service import fetch_application_summary
-from ..services.impact_service import fetch_impact_analysis
-from ..summarizers import summarize_with_anthropic, summarize_impact_with_anthropic
-from .schemas import QueryRequest, QueryResponse, ImpactRequest, ImpactResponse
+from ..services.impact_service import complete_object_names, fetch_impact_analysis, fetch_impact_batch
+from ..symbol_index import symbol_index_store
+from ..call_graph import call_graph_store
+from ..summarizers import (
+    summarize_with_anthropic_async,
+    map_sections_async,
+    summarize_impact_with_anthropic_async,
+    summarize_impact_batch_with_anthropic_async,
+    stream_summary_with_anthropic,
+    stream_impact_with_anthropic,
+    llm_flight,
+)
+from .middleware import RequestMetricsMiddleware
+from .schemas import (
+    QueryRequest,
+    QueryResponse,
+    ImpactRequest,
+    ImpactResponse,
+    ImpactBatchRequest,
+    ImpactBatchResponse,
+    ObjectCompletionResponse,
+)
+
+T = TypeVar("T")
+
+# Identical concurrent requests share one MCP fetch (see app/singleflight.py);
+# the summarizers coalesce identical prompts the same way.
+mcp_flight = SingleFlight("mcp")
+
+# Startup warm-up state, reported by /readyz.
+warmup = Warmup(timeout=WARMUP_TIMEOUT)
+
+# How often a waiting handler checks whether its client went away.
+DISCONNECT_POLL_INTERVAL = 0.5
 
 # Configure logging to show more details
 logging.basicConfig(
@@ -19,14 +80,69 @@ logger = logging.getLogger("cast-imaging-agent.api")
 tools_logger = logging.getLogger("cast-imaging-agent.tools")
 tools_logger.setLevel(logging.INFO)
 
+def _warmup_steps(pool: MCPSessionPool) -> List[WarmupStep]:
+    async def open_sessions() -> Dict[str, Any]:
+        await pool.start()
+        if pool.size == 0:
+            raise RuntimeError("no MCP session could be opened")
+        return pool.stats()
+
+    async def prefetch_catalogs() -> Dict[str, Any]:
+        async with imaging_session() as session:
+            catalog = await get_tool_catalog(session)
+            applications_tool = catalog.resolve("applications")
+            if not applications_tool:
+                raise RuntimeError("Imaging MCP: 'applications' tool not found.")
+            inventory = await application_inventory.get(session, applications_tool)
+        return {"tools": len(catalog.names), "applications": len(inventory.apps)}
+
+    steps: List[WarmupStep] = [
+        ("mcp_sessions", open_sessions),
+        ("tool_catalog_and_inventory", prefetch_catalogs),
+    ]
+    if WARMUP_APPLICATIONS:
+        steps.append(("hot_summaries", lambda: prefetch_all(WARMUP_APPLICATIONS, _prefetch_summary)))
+    return steps
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Own process-wide resources: the MCP session pool, so requests borrow warm
+    sessions instead of re-running the MCP handshake, and one AsyncAnthropic
+    client shared by every summarizer call. Sessions, tool catalog, application
+    inventory and hot summaries are warmed in the background; /readyz reports
+    when that is done.
+    """
+    pool = create_session_pool()
+    set_session_pool(pool)
+    init_anthropic_client()
+    lag_probe = asyncio.ensure_future(watch_event_loop_lag(EVENT_LOOP_LAG_INTERVAL)) if EVENT_LOOP_LAG_INTERVAL > 0 else None
+    if WARMUP_ENABLED:
+        warmup.start(_warmup_steps(pool))
+    else:
+        warmup.disable()
+        await pool.start()
+    try:
+        yield
+    finally:
+        if lag_probe is not None:
+            lag_probe.cancel()
+        await warmup.stop()
+        set_session_pool(None)
+        await pool.close()
+        await close_anthropic_client()
+
 app = FastAPI(
     title="CAST Imaging Agent (Anthropic Sonnet)",
     description="API for application analysis and impact assessment using CAST Imaging and Anthropic AI",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
+app.add_middleware(RequestMetricsMiddleware, routes=lambda: [getattr(r, "path", "") for r in app.routes])
+
 @app.get("/", response_class=HTMLResponse)
 def root():
     """
@@ -138,6 +254,11 @@ def root():
                 <p>Health check endpoint - returns server status</p>
             </div>
 
+            <div class="endpoint">
+                <h3><span class="method get">GET</span> /livez &nbsp; <span class="method get">GET</span> /readyz</h3>
+                <p>Liveness and readiness probes; /readyz returns 503 until the startup warm-up has finished</p>
+            </div>
+
             <div class="endpoint">
                 <h3><span class="method post">POST</span> /query</h3>
                 <p>Get application summary based on a question</p>
@@ -155,8 +276,39 @@ def root():
                 <pre>{
   "question": "What breaks if we change X?",
   "object_hint": "class or method name",
-  "application_hint": "optional application name"
+  "application_hint": "optional application name",
+  "depth": 1
 }</pre>
+                <p><code>depth</code> &gt; 1 also follows callers of callers, breadth-first, and returns them ranked in <code>transitive_impact</code></p>
+            </div>
+
+            <div class="endpoint">
+                <h3><span class="method post">POST</span> /impact/batch</h3>
+                <p>One consolidated impact report for a change set touching several objects</p>
+                <strong>Example Request:</strong>
+                <pre>{
+  "object_hints": ["OrderService", "PaymentGateway.charge"],
+  "application_hint": "optional application name",
+  "include_per_object": true
+}</pre>
+            </div>
+
+            <div class="endpoint">
+                <h3><span class="method get">GET</span> /objects/complete?prefix=Order&amp;application=Payments</h3>
+                <p>Object name suggestions from the local symbol index (when <code>SYMBOL_INDEX_ENABLED</code> is set);
+                <code>ready</code> is false while the index of the application is still being built</p>
+            </div>
+
+            <div class="endpoint">
+                <h3><span class="method post">POST</span> /query/stream &nbsp; <span class="method post">POST</span> /impact/stream</h3>
+                <p>Same request bodies as /query and /impact (which answer with a <code>Server-Timing</code> header,
+                and the full phase span tree in <code>profile</code> with <code>?profile=1</code>); the report is streamed as Server-Sent Events
+                (<code>metadata</code>, then <code>delta</code> chunks, then <code>done</code> with usage and timings)</p>
+            </div>
+
+            <div class="endpoint">
+                <h3><span class="method get">GET</span> /metrics</h3>
+                <p>Prometheus text exposition: MCP, application selection and LLM latency histograms, token counts, in-flight requests, cache hits and errors</p>
             </div>
 
             <h2>🔧 Quick Start</h2>
@@ -400,29 +552,361 @@ async def health():
     """
     return html_content
 
+@app.get("/livez")
+async def livez():
+    """Liveness: the process is up and serving, whatever the state of its dependencies."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once warm-up has finished or timed out, 503 before."""
+    report = warmup.report()
+    return JSONResponse(report, status_code=200 if warmup.ready else 503)
+
+def _summary_payload(req: QueryRequest) -> Awaitable[Dict[str, Any]]:
+    key = ("query", normalize_text(req.question), normalize_text(req.application_hint))
+    return mcp_flight.do(key, lambda: fetch_application_summary(req.question, req.application_hint))
+
+def _impact_payload(req: ImpactRequest) -> Awaitable[Dict[str, Any]]:
+    key = (
+        "impact",
+        normalize_text(req.question),
+        normalize_text(req.object_hint),
+        normalize_text(req.application_hint),
+        req.depth,
+    )
+    return mcp_flight.do(
+        key, lambda: fetch_impact_analysis(req.question, req.object_hint, req.application_hint, req.depth)
+    )
+
+def _impact_batch_payload(req: ImpactBatchRequest) -> Awaitable[Dict[str, Any]]:
+    key = (
+        "impact_batch",
+        normalize_text(req.question),
+        tuple(sorted({normalize_text(h) for h in req.object_hints})),
+        normalize_text(req.application_hint),
+    )
+    return mcp_flight.do(key, lambda: fetch_impact_batch(req.question, req.object_hints, req.application_hint))
+
+async def _summary_prompt_payload(req: QueryRequest) -> Dict[str, Any]:
+    """
+    MCP data for a summary, compacted for the final prompt. The architectural
+    graph is reduced to its locally computed metrics and hotspots; sections
+    still too large for one prompt are then condensed by the map step of a
+    map-reduce summary when `summary_mode` asks for it (or "auto" finds it needed).
+    """
+    with span("mcp"):
+        raw = await _summary_payload(req)
+    if GRAPH_ANALYTICS_ENABLED:
+        with span("graph_analytics"):
+            # Pure-Python graph work: keep it off the event loop.
+            raw = await asyncio.to_thread(with_graph_analytics, raw)
+    mode = req.summary_mode
+    if mode == "map_reduce" or (mode == "auto" and needs_map_reduce(raw, MAP_REDUCE_THRESHOLD_TOKENS)):
+        raw = await map_sections_async(raw, cache_mode=req.cache_mode)
+    return compact_payload(raw, SUMMARY_SECTIONS)
+
+async def _prefetch_summary(application: str) -> None:
+    """Run the /query pipeline for one application so its MCP data and summary are cached."""
+    req = QueryRequest(question=WARMUP_QUESTION, application_hint=application)
+    payload = await _summary_prompt_payload(req)
+    await summarize_with_anthropic_async(payload, cache_mode=req.cache_mode)
+
+async def _cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """
+    Await `work`, cancelling it if the client disconnects first. Cancelling a
+    coalesced waiter only stops the shared computation once nobody else waits.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected; abandoning %s", request.url.path)
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+async def _profiled(request: Request, response: Response, run: Callable[[], Awaitable[T]], include_profile: bool) -> T:
+    """
+    Run a handler's work under a phase profile: the phases go out as a
+    `Server-Timing` header, and the whole span tree as `profile` when asked.
+    """
+    if not (SERVER_TIMING_ENABLED or include_profile):
+        return await _cancel_on_disconnect(request, run())
+    with profiled(request.url.path) as prof:
+        result = await _cancel_on_disconnect(request, run())
+    response.headers["Server-Timing"] = prof.server_timing()
+    if include_profile:
+        result.profile = prof.to_dict()
+    return result
+
 @app.post("/query", response_model=QueryResponse)
-async def query(req: QueryRequest):
+async def query(req: QueryRequest, request: Request, response: Response, profile: bool = False):
+    async def run() -> QueryResponse:
+        payload = await _summary_prompt_payload(req)
+        summary = await summarize_with_anthropic_async(payload, cache_mode=req.cache_mode)
+        return QueryResponse(
+            application=payload.get("selected_application", {}),
+            summary=summary,
+            compaction=payload["compaction"],
+            map_reduce=payload.get("map_reduce"),
+        )
+
     try:
-        payload = await fetch_application_summary(req.question, req.application_hint)
-        summary = summarize_with_anthropic(payload)
-        return QueryResponse(application=payload.get("selected_application", {}), summary=summary)
+        return await _profiled(request, response, run, profile)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Query failed")
+        record_error("query", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/impact", response_model=ImpactResponse)
-async def impact(req: ImpactRequest):
-    try:
-        payload = await fetch_impact_analysis(req.question, req.object_hint, req.application_hint)
-        summary = summarize_impact_with_anthropic(payload)
+async def impact(req: ImpactRequest, request: Request, response: Response, profile: bool = False):
+    async def run() -> ImpactResponse:
+        with span("mcp"):
+            raw = await _impact_payload(req)
+        payload = compact_payload(raw, IMPACT_SECTIONS)
+        summary = await summarize_impact_with_anthropic_async(payload, cache_mode=req.cache_mode)
         return ImpactResponse(
-            application=payload.get("selected_application", {}),
-            object=payload.get("object_details", {}),
+            application=raw.get("selected_application", {}),
+            object=raw.get("object_details", {}),
             summary=summary,
+            transitive_impact=raw.get("transitive_impact"),
+            compaction=payload["compaction"],
         )
+
+    try:
+        return await _profiled(request, response, run, profile)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Impact analysis failed")
+        record_error("impact", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/impact/batch", response_model=ImpactBatchResponse)
+async def impact_batch(req: ImpactBatchRequest, request: Request, response: Response, profile: bool = False):
+    """Impact analysis for a whole change set, in one session and one report."""
+    async def run() -> ImpactBatchResponse:
+        with span("mcp"):
+            raw = await _impact_batch_payload(req)
+        payload = compact_payload(raw, IMPACT_BATCH_SECTIONS)
+        summary = await summarize_impact_batch_with_anthropic_async(
+            payload, per_object=req.include_per_object, cache_mode=req.cache_mode
+        )
+        objects = [
+            {"object_hint": o["object_hint"], "object": o.get("object_details", {})}
+            for o in payload.get("objects", [])
+        ]
+        return ImpactBatchResponse(
+            application=payload.get("selected_application", {}),
+            objects=objects,
+            failed_objects=payload.get("failed_objects", []),
+            summary=summary,
+            compaction=payload["compaction"],
+        )
+
+    try:
+        return await _profiled(request, response, run, profile)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Batch impact analysis failed")
+        record_error("impact_batch", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/objects/complete", response_model=ObjectCompletionResponse)
+async def objects_complete(prefix: str, application: Optional[str] = None, limit: int = 10):
+    """Object name suggestions from the local symbol index (see SYMBOL_INDEX_ENABLED)."""
+    if not symbol_index_store.enabled:
+        raise HTTPException(status_code=404, detail="Symbol index is disabled")
+    try:
+        return ObjectCompletionResponse(**await complete_object_names(prefix, application, max(1, min(limit, 100))))
+    except Exception as e:
+        logger.exception("Object completion failed")
+        record_error("objects_complete", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Age, size and hit ratio of the in-process caches."""
+    return {
+        "tool_catalog": tool_catalog_cache.stats(),
+        "argument_shapes": shape_memory.stats(),
+        "application_inventory": application_inventory.stats(),
+        "tool_results": tool_result_cache.stats(),
+        "summaries": summary_cache.stats(),
+        "symbol_index": symbol_index_store.stats(),
+        "call_graph": call_graph_store.stats(),
+        "coalescing": {"mcp": mcp_flight.stats(), "llm": llm_flight.stats()},
+    }
+
+@app.post("/cache/invalidate")
+async def cache_invalidate():
+    """Drop cached MCP data so the next request refetches it."""
+    tool_catalog_cache.invalidate()
+    shape_memory.clear()
+    application_inventory.invalidate()
+    await tool_result_cache.clear()
+    return {"invalidated": ["tool_catalog", "argument_shapes", "application_inventory", "tool_results"]}
+
+@app.post("/cache/summaries/invalidate")
+async def summary_cache_invalidate():
+    """Drop cached LLM summaries (kept separate: they are the expensive ones)."""
+    await summary_cache.clear()
+    return {"invalidated": ["summaries"]}
+
+def _cache_metrics():
+    """Scrape-time view of the cache, coalescing and pool counters."""
+    catalog = tool_catalog_cache.stats()
+    inventory = application_inventory.stats()
+    results = tool_result_cache.stats()
+    summaries = summary_cache.stats()
+    hits = [
+        ({"cache": "tool_catalog", "tier": "memory"}, catalog["hits"]),
+        ({"cache": "application_inventory", "tier": "fresh"}, inventory["hits"]),
+        ({"cache": "application_inventory", "tier": "stale"}, inventory["stale_hits"]),
+        ({"cache": "tool_results", "tier": "memory"}, results["memory_hits"]),
+        ({"cache": "tool_results", "tier": "disk"}, results["disk_hits"]),
+        ({"cache": "summaries", "tier": "memory"}, summaries["memory_hits"]),
+        ({"cache": "summaries", "tier": "disk"}, summaries["disk_hits"]),
+    ]
+    misses = [
+        ({"cache": "tool_catalog"}, catalog["misses"]),
+        ({"cache": "application_inventory"}, inventory["misses"]),
+        ({"cache": "tool_results"}, results["misses"]),
+        ({"cache": "summaries"}, summaries["misses"]),
+    ]
+    families = [
+        ("imaging_agent_cache_hits_total", "counter", "Cache hits by cache and tier.", hits),
+        ("imaging_agent_cache_misses_total", "counter", "Cache misses by cache.", misses),
+        ("imaging_agent_coalesced_requests_total", "counter", "Requests that joined an identical in-flight computation.", [
+            ({"flight": "mcp"}, mcp_flight.coalesced),
+            ({"flight": "llm"}, llm_flight.coalesced),
+        ]),
+        ("imaging_agent_coalescing_in_flight", "gauge", "Distinct computations currently in flight.", [
+            ({"flight": "mcp"}, mcp_flight.in_flight()),
+            ({"flight": "llm"}, llm_flight.in_flight()),
+        ]),
+    ]
+    pool = get_session_pool()
+    if pool is not None:
+        pool_stats = pool.stats()
+        families.append(("imaging_agent_mcp_pool_sessions", "gauge", "Live MCP sessions in the pool.", [({}, pool_stats["size"])]))
+        families.append(("imaging_agent_mcp_pool_leases", "gauge", "MCP sessions currently lent out.", [({}, pool_stats["leases"])]))
+    return families
+
+registry.add_collector(_cache_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of the service metrics."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _stream_report(
+    fetch: Callable[[], Awaitable[Dict[str, Any]]],
+    metadata: Callable[[Dict[str, Any]], Dict[str, Any]],
+    stream: Callable[[Dict[str, Any]], AsyncIterator[Dict[str, Any]]],
+) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for a streamed report: one `metadata` event once the MCP
+    phase is done, a `delta` event per LLM text chunk, then a `done` event with
+    token usage and timings. Failures are reported as an `error` event since
+    the HTTP status has already been sent.
+    """
+    started = time.perf_counter()
+
+    def elapsed_ms(since: float) -> float:
+        return round((time.perf_counter() - since) * 1000, 1)
+
+    try:
+        payload = await fetch()
+    except Exception as e:
+        logger.exception("Streaming report failed during MCP phase")
+        record_error("stream_mcp", e)
+        yield _sse("error", {"phase": "mcp", "error": str(e), "error_type": type(e).__name__})
+        return
+    mcp_ms = elapsed_ms(started)
+    yield _sse("metadata", metadata(payload))
+
+    llm_started = time.perf_counter()
+    ttft_ms = None
+    final: Dict[str, Any] = {}
+    try:
+        async for event in stream(payload):
+            if event.get("type") == "delta":
+                if ttft_ms is None:
+                    ttft_ms = elapsed_ms(llm_started)
+                yield _sse("delta", {"text": event["text"]})
+            elif event.get("type") == "usage":
+                final = event
+    except Exception as e:
+        logger.exception("Streaming report failed during LLM phase")
+        record_error("stream_llm", e)
+        yield _sse("error", {"phase": "llm", "error": str(e), "error_type": type(e).__name__})
+        return
+
+    yield _sse("done", {
+        "usage": final.get("usage", {}),
+        "stop_reason": final.get("stop_reason"),
+        "cached": final.get("cached", False),
+        "timings": {
+            "mcp_ms": mcp_ms,
+            "ttft_ms": ttft_ms,
+            "llm_ms": elapsed_ms(llm_started),
+            "total_ms": elapsed_ms(started),
+        },
+    })
+
+@app.post("/query/stream")
+async def query_stream(req: QueryRequest):
+    """Like /query, but streams the summary as Server-Sent Events."""
+    return StreamingResponse(
+        _stream_report(
+            lambda: _summary_prompt_payload(req),
+            lambda payload: {
+                "application": payload.get("selected_application", {}),
+                "compaction": payload["compaction"],
+                "map_reduce": payload.get("map_reduce"),
+            },
+            lambda payload: stream_summary_with_anthropic(payload, cache_mode=req.cache_mode),
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/impact/stream")
+async def impact_stream(req: ImpactRequest):
+    """Like /impact, but streams the report as Server-Sent Events."""
+    raw: Dict[str, Any] = {}
+
+    async def fetch() -> Dict[str, Any]:
+        # Metadata carries the uncompacted records, as /impact returns them.
+        raw.update(await _impact_payload(req))
+        return compact_payload(raw, IMPACT_SECTIONS)
+
+    return StreamingResponse(
+        _stream_report(
+            fetch,
+            lambda payload: {
+                "application": raw.get("selected_application", {}),
+                "object": raw.get("object_details", {}),
+                "transitive_impact": raw.get("transitive_impact"),
+                "compaction": payload["compaction"],
+            },
+            lambda payload: stream_impact_with_anthropic(payload, cache_mode=req.cache_mode),
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
     uvicorn.run("app.api.main:app", host="0.0.0.0", port=8000, reload=False)
@@ -0,0 +1,47 @@
+import time
+from typing import Any, Callable, Collection, Dict, FrozenSet, Optional
+
+from ..metrics import HTTP_REQUESTS_IN_FLIGHT, HTTP_REQUEST_SECONDS
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware tracking in-flight requests and request duration per
+    route. Duration runs until the last body chunk is sent, so streamed
+    responses are measured in full. Paths outside `routes()` (read on the
+    first request, once every route is registered) are labelled "other" to
+    keep label cardinality bounded.
+    """
+
+    def __init__(self, app: Callable, routes: Callable[[], Collection[str]]):
+        self.app = app
+        self._routes = routes
+        self._known: Optional[FrozenSet[str]] = None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._known is None:
+            self._known = frozenset(self._routes())
+        path = scope.get("path", "")
+        route = path if path in self._known else "other"
+        status = {"code": 500}
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc(route=route)
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(route=route)
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - t0,
+                route=route,
+                method=scope.get("method", ""),
+                status=str(status["code"]),
+            )
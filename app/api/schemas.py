@@ -1,20 +1,61 @@
-from typing import Any, Dict, Optional
-from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+
+from ..config import IMPACT_BATCH_MAX_OBJECTS, IMPACT_MAX_DEPTH
+
+# "use" reads and writes the summary cache, "refresh" regenerates and stores,
+# "bypass" skips the cache entirely.
+CacheMode = Literal["use", "bypass", "refresh"]
+
+# "single" sends one summary prompt, "map_reduce" summarizes large sections in
+# chunks first, "auto" picks map-reduce once the data exceeds one prompt.
+SummaryMode = Literal["auto", "single", "map_reduce"]
 
 class QueryRequest(BaseModel):
     question: str
     application_hint: Optional[str] = None
+    cache_mode: CacheMode = "use"
+    summary_mode: SummaryMode = "auto"
 
 class QueryResponse(BaseModel):
     application: Dict[str, Any]
     summary: str
+    compaction: Optional[Dict[str, Any]] = None
+    map_reduce: Optional[Dict[str, Any]] = None
+    profile: Optional[Dict[str, Any]] = None
 
 class ImpactRequest(BaseModel):
     question: str = "What breaks if we change X?"
     object_hint: str
     application_hint: Optional[str] = None
+    cache_mode: CacheMode = "use"
+    # Levels of callers to follow: 1 is the object's direct relationships only.
+    depth: int = Field(1, ge=1, le=IMPACT_MAX_DEPTH)
 
 class ImpactResponse(BaseModel):
     application: Dict[str, Any]
     object: Dict[str, Any]
     summary: str
+    transitive_impact: Optional[Dict[str, Any]] = None
+    compaction: Optional[Dict[str, Any]] = None
+    profile: Optional[Dict[str, Any]] = None
+
+class ImpactBatchRequest(BaseModel):
+    question: str = "What breaks if we change these objects?"
+    object_hints: List[str] = Field(..., min_length=1, max_length=IMPACT_BATCH_MAX_OBJECTS)
+    application_hint: Optional[str] = None
+    include_per_object: bool = True
+    cache_mode: CacheMode = "use"
+
+class ImpactBatchResponse(BaseModel):
+    application: Dict[str, Any]
+    objects: List[Dict[str, Any]]
+    failed_objects: List[Dict[str, Any]]
+    summary: str
+    compaction: Optional[Dict[str, Any]] = None
+    profile: Optional[Dict[str, Any]] = None
+
+class ObjectCompletionResponse(BaseModel):
+    application: Dict[str, Any]
+    ready: bool
+    objects: List[Dict[str, Any]]
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("cast-imaging-agent.cache")
+
+_MISSING = object()
+
+class LRUCache:
+    """Bounded in-process LRU with per-entry expiry and an optional tag."""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max(1, max_entries)
+        self._data: "OrderedDict[str, Tuple[Any, float, Optional[str]]]" = OrderedDict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        value, expires_at, _ = entry
+        if expires_at <= time.time():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float, tag: Optional[str] = None) -> None:
+        self._data[key] = (value, time.time() + ttl, tag)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete_tag(self, tag: str) -> int:
+        doomed = [k for k, (_, _, t) in self._data.items() if t == tag]
+        for k in doomed:
+            del self._data[k]
+        return len(doomed)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class SQLiteCache:
+    """
+    Persistent JSON key/value store with expiry and tags. Calls are blocking;
+    `TieredCache` runs them in a worker thread.
+    """
+
+    def __init__(self, path: str, table: str = "entries"):
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, tag TEXT, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_tag ON {table}(tag)")
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float, Optional[str]]]:
+        """(value, remaining ttl, tag) for a live entry, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at, tag FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        remaining = row[1] - time.time()
+        if remaining <= 0:
+            self.delete(key)
+            return None
+        return json.loads(row[0]), remaining, row[2]
+
+    def set(self, key: str, value: Any, ttl: float, tag: Optional[str] = None) -> None:
+        encoded = json.dumps(value)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, tag, value, expires_at) VALUES (?, ?, ?, ?)",
+                (key, tag, encoded, time.time() + ttl),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def delete_tag(self, tag: str) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(f"DELETE FROM {self.table} WHERE tag = ?", (tag,)).rowcount
+
+    def purge_expired(self) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),)
+            ).rowcount
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class TieredCache:
+    """Memory LRU in front of an optional SQLite tier; disk hits are promoted."""
+
+    def __init__(self, memory: LRUCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Any:
+        """Cached value for `key`, or `None` on a miss."""
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            self.memory_hits += 1
+            return value
+        if self.disk is not None:
+            try:
+                entry = await asyncio.to_thread(self.disk.get_entry, key)
+            except Exception as e:
+                logger.warning("Disk cache read failed: %s", e)
+                entry = None
+            if entry is not None:
+                value, remaining, tag = entry
+                self.memory.set(key, value, remaining, tag)
+                self.disk_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, ttl: float, tag: Optional[str] = None) -> None:
+        self.memory.set(key, value, ttl, tag)
+        if self.disk is not None:
+            try:
+                await asyncio.to_thread(self.disk.set, key, value, ttl, tag)
+            except (TypeError, ValueError):
+                logger.debug("Value for %s is not JSON-serializable; kept in memory only", key)
+            except Exception as e:
+                logger.warning("Disk cache write failed: %s", e)
+
+    async def delete_tag(self, tag: str) -> int:
+        removed = self.memory.delete_tag(tag)
+        if self.disk is not None:
+            removed += await asyncio.to_thread(self.disk.delete_tag, tag)
+        return removed
+
+    async def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.clear)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self.memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else None,
+            "disk": self.disk.path if self.disk is not None else None,
+        }
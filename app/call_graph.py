@@ -0,0 +1,241 @@
+import asyncio
+import itertools
+import logging
+from array import array
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .config import CALL_GRAPH_CACHE_MAX_APPS
+from .singleflight import SingleFlight
+from .tools import application_inventory
+
+logger = logging.getLogger("cast-imaging-agent.call_graph")
+
+# fetch_callers(object_id) -> (caller records, whether the list was capped)
+CallerFetcher = Callable[[str], Awaitable[Tuple[List[Any], bool]]]
+
+# Every graph gets a new version, so a graph created after another one was
+# evicted never shares its in-flight fetches (unlike id(), which is reused).
+_graph_versions = itertools.count(1)
+
+def _record_id(record: Any) -> Optional[str]:
+    if isinstance(record, dict):
+        value = record.get("id") or record.get("objectId") or record.get("object_id")
+        return None if value is None else str(value)
+    return None if record is None else str(record)
+
+class CallGraph:
+    """
+    Caller edges of one application delivery, learned as traversals fetch
+    them. Object ids are interned to ints and each object's callers are an
+    array of ints, so the graph stays small as it grows; an object whose
+    callers were fetched is "expanded", and `truncated` holds those whose
+    caller list was capped.
+    """
+
+    def __init__(self, app_id: Optional[str] = None):
+        self.app_id = app_id
+        self.version = next(_graph_versions)
+        self._numbers: Dict[str, int] = {}
+        self.ids: List[str] = []
+        self.labels: List[Optional[Tuple[str, str, str]]] = []  # name, full name, type
+        self._callers: Dict[int, array] = {}
+        self.truncated: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edges(self) -> int:
+        return sum(len(c) for c in self._callers.values())
+
+    def intern(self, object_id: str, record: Any = None) -> int:
+        n = self._numbers.get(object_id)
+        if n is None:
+            n = len(self.ids)
+            self._numbers[object_id] = n
+            self.ids.append(object_id)
+            self.labels.append(None)
+        if isinstance(record, dict) and self.labels[n] is None:
+            self.labels[n] = (
+                str(record.get("name") or ""),
+                str(record.get("fullName") or record.get("full_name") or ""),
+                str(record.get("type") or ""),
+            )
+        return n
+
+    def node(self, n: int) -> Dict[str, str]:
+        name, full_name, kind = self.labels[n] or ("", "", "")
+        return {"id": self.ids[n], "name": name or self.ids[n], "fullName": full_name, "type": kind}
+
+    def callers(self, n: int) -> Optional[array]:
+        """Caller numbers of object `n`, or None when they were never fetched."""
+        return self._callers.get(n)
+
+    def set_callers(self, n: int, records: List[Any], truncated: bool = False) -> array:
+        callers = array("I")
+        for record in records:
+            object_id = _record_id(record)
+            if object_id is not None:
+                c = self.intern(object_id, record)
+                if c != n:
+                    callers.append(c)
+        self._callers[n] = callers
+        if truncated:
+            self.truncated.add(n)
+        return callers
+
+class CallGraphStore:
+    """
+    Call graphs keyed by MCP endpoint, application and delivery, the
+    `max_graphs` most recently used kept. A re-delivered application gets a
+    new key, and inventory change notifications drop its old graph eagerly.
+    Concurrent traversals fetching the callers of the same object share one call.
+    """
+
+    def __init__(self, max_graphs: int = 32):
+        self.max_graphs = max_graphs
+        self._graphs: "OrderedDict[Tuple[str, str, Optional[str]], CallGraph]" = OrderedDict()
+        self.flight = SingleFlight("call_graph")
+        self.fetched = 0
+        self.reused = 0
+
+    def graph(self, endpoint: str, app_id: Any, delivery: Optional[str]) -> CallGraph:
+        key = (endpoint, str(app_id), delivery)
+        graph = self._graphs.get(key)
+        if graph is None:
+            graph = self._graphs[key] = CallGraph(str(app_id))
+            while len(self._graphs) > self.max_graphs:
+                self._graphs.popitem(last=False)
+        else:
+            self._graphs.move_to_end(key)
+        return graph
+
+    async def expand(self, graph: CallGraph, n: int, fetch_callers: CallerFetcher) -> array:
+        """Callers of object `n`, fetched once per graph."""
+        callers = graph.callers(n)
+        if callers is not None:
+            self.reused += 1
+            return callers
+
+        async def fetch() -> array:
+            records, truncated = await fetch_callers(graph.ids[n])
+            self.fetched += 1
+            return graph.set_callers(n, records, truncated)
+
+        return await self.flight.do((graph.app_id, graph.version, n), fetch)
+
+    def invalidate_applications(self, endpoint: str, app_ids: Set[Any]) -> None:
+        wanted = {str(a) for a in app_ids}
+        for key in [k for k in self._graphs if k[0] == endpoint and k[1] in wanted]:
+            del self._graphs[key]
+
+    def clear(self) -> None:
+        self._graphs.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_graphs": self.max_graphs,
+            "fetched": self.fetched,
+            "reused": self.reused,
+            "graphs": {
+                f"{endpoint}#{app_id}": {"delivery": delivery, "objects": len(g), "edges": g.edges}
+                for (endpoint, app_id, delivery), g in self._graphs.items()
+            },
+        }
+
+call_graph_store = CallGraphStore(max_graphs=CALL_GRAPH_CACHE_MAX_APPS)
+application_inventory.add_listener(call_graph_store.invalidate_applications)
+
+async def traverse_callers(
+    graph: CallGraph,
+    root: Any,
+    fetch_callers: CallerFetcher,
+    *,
+    depth: int,
+    fan_out: int,
+    max_nodes: int,
+    concurrency: int,
+    store: Optional[CallGraphStore] = None,
+) -> Dict[str, Any]:
+    """
+    Breadth-first expansion of the callers of `root` (an object record or
+    id), `depth` levels out. The objects of one level are expanded
+    concurrently, at most `concurrency` fetches at a time; at most `fan_out`
+    of the newly reached objects are expanded at the next level (those
+    reached by the most paths first), and no more than `max_nodes` objects
+    are reported. Callers already in `graph` are not fetched again.
+
+    Reached objects are ranked by score = shortest paths from the root /
+    distance: an object calling into the change from many places, close
+    to it, comes first.
+    """
+    store = store if store is not None else call_graph_store
+    root_id = _record_id(root)
+    if root_id is None:
+        raise ValueError("Cannot traverse from an object without an id.")
+    start = graph.intern(root_id, root)
+    distance: Dict[int, int] = {start: 0}
+    paths: Dict[int, int] = {start: 1}
+    via: Dict[int, int] = {}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    levels: List[Dict[str, Any]] = []
+    truncated = False
+
+    async def expand(n: int) -> array:
+        async with semaphore:
+            return await store.expand(graph, n, fetch_callers)
+
+    frontier = [start]
+    for level in range(1, depth + 1):
+        if not frontier:
+            break
+        results = await asyncio.gather(*(expand(n) for n in frontier), return_exceptions=True)
+        reached: Dict[int, None] = {}
+        failed = 0
+        capped = False
+        for n, callers in zip(frontier, results):
+            if isinstance(callers, BaseException):
+                failed += 1
+                logger.warning("Callers of %s unavailable: %s", graph.ids[n], callers)
+                continue
+            capped = capped or n in graph.truncated
+            for c in callers:
+                if c not in distance:
+                    if len(distance) - 1 >= max_nodes:
+                        capped = True
+                        continue
+                    distance[c] = level
+                    paths[c] = 0
+                    via[c] = n
+                    reached[c] = None
+                if distance[c] == level:
+                    paths[c] += paths[n]
+
+        frontier = sorted(reached, key=lambda c: -paths[c])
+        if len(frontier) > fan_out:
+            capped = True
+            frontier = frontier[:fan_out]
+        truncated = truncated or capped or failed > 0
+        levels.append({"depth": level, "reached": len(reached), "expanded": len(results) - failed,
+                       "failed": failed, "truncated": capped})
+
+    impacted = []
+    for n, d in distance.items():
+        if n == start:
+            continue
+        impacted.append({
+            **graph.node(n),
+            "distance": d,
+            "paths": paths[n],
+            "score": round(paths[n] / d, 3),
+            "via": graph.ids[via[n]],
+        })
+    impacted.sort(key=lambda e: (-e["score"], e["distance"], e["name"]))
+    return {
+        "root": root_id,
+        "depth": depth,
+        "levels": levels,
+        "truncated": truncated,
+        "impacted": impacted,
+    }
@@ -0,0 +1,193 @@
+import json
+import logging
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .config import PROMPT_SECTION_TOKEN_BUDGET, PROMPT_TOTAL_TOKEN_BUDGET
+from .profiling import span
+
+logger = logging.getLogger("cast-imaging-agent.compaction")
+
+# Sample sizes tried, largest first, when collapsing long lists to fit a budget.
+_SAMPLE_STEPS = (50, 20, 10, 5, 2)
+
+# Prompt sections per report type, most important first. Lower-priority
+# sections are squeezed first when the whole prompt is over budget.
+SUMMARY_SECTIONS = (
+    "stats",
+    "packages",
+    "quality_insights",
+    "architectural_graph",
+    "transactions",
+    "data_graphs",
+)
+IMPACT_SECTIONS = (
+    "object_details",
+    "transactions_using_object",
+    "inter_applications_dependencies",
+    "data_graphs_involving_object",
+    "transitive_impact",
+)
+IMPACT_BATCH_SECTIONS = (
+    "object_summaries",
+    "transactions",
+    "inter_applications_dependencies",
+    "data_graphs",
+    "failed_objects",
+)
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), good enough for budgeting."""
+    return (len(text) + 3) // 4
+
+def render_value(value: Any) -> str:
+    """Prompt form of a section: strings verbatim, everything else minified JSON."""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def drop_empty(value: Any) -> Any:
+    """Recursively drop None, empty strings and empty containers."""
+    if isinstance(value, dict):
+        cleaned = {k: drop_empty(v) for k, v in value.items()}
+        return {k: v for k, v in cleaned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        cleaned = [drop_empty(v) for v in value]
+        return [v for v in cleaned if v not in (None, "", [], {})]
+    return value
+
+def hoist_common_fields(value: Any) -> Any:
+    """
+    In lists of 3+ records, move fields that have the same value in every
+    record into a single `_common` entry instead of repeating them.
+    """
+    if isinstance(value, dict):
+        return {k: hoist_common_fields(v) for k, v in value.items()}
+    if not isinstance(value, list):
+        return value
+    items = [hoist_common_fields(v) for v in value]
+    if len(items) < 3 or not all(isinstance(v, dict) for v in items):
+        return items
+    first = items[0]
+    common = {
+        k: v for k, v in first.items()
+        if all(k in other and other[k] == v for other in items[1:])
+    }
+    if not common or len(common) == len(first):
+        return items
+    return {
+        "_common": common,
+        "_records": [{k: v for k, v in item.items() if k not in common} for item in items],
+    }
+
+def collapse_lists(value: Any, sample: int) -> Any:
+    """Replace lists longer than `sample` by their count and the first `sample` items."""
+    if isinstance(value, dict):
+        return {k: collapse_lists(v, sample) for k, v in value.items()}
+    if isinstance(value, list):
+        if len(value) <= sample:
+            return [collapse_lists(v, sample) for v in value]
+        return {
+            "_count": len(value),
+            "_sample": [collapse_lists(v, sample) for v in value[:sample]],
+        }
+    return value
+
+def compact_section(value: Any, budget: int) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Shrink one section until its rendered form fits `budget` tokens, from the
+    cheapest lossless step to the lossiest: minify/drop empties, hoist
+    repeated fields, sample long lists, then hard-truncate the text.
+    """
+    original = estimate_tokens(render_value(value))
+    report: Dict[str, Any] = {"original_tokens": original, "strategy": "none"}
+
+    compacted = hoist_common_fields(drop_empty(value))
+    tokens = estimate_tokens(render_value(compacted))
+    report["strategy"] = "minified"
+
+    if tokens > budget:
+        for sample in _SAMPLE_STEPS:
+            candidate = collapse_lists(compacted, sample)
+            tokens = estimate_tokens(render_value(candidate))
+            if tokens <= budget:
+                compacted = candidate
+                report["strategy"] = f"sampled:{sample}"
+                break
+        else:
+            text = render_value(collapse_lists(compacted, _SAMPLE_STEPS[-1]))
+            compacted = text[: max(0, budget * 4 - 40)] + " …[truncated to fit prompt budget]"
+            tokens = estimate_tokens(compacted)
+            report["strategy"] = "truncated"
+
+    report["compacted_tokens"] = tokens
+    report["trimmed_tokens"] = max(0, original - tokens)
+    return compacted, report
+
+def compact_payload(
+    payload: Dict[str, Any],
+    sections: Sequence[str],
+    section_budget: int = PROMPT_SECTION_TOKEN_BUDGET,
+    total_budget: int = PROMPT_TOTAL_TOKEN_BUDGET,
+) -> Dict[str, Any]:
+    """
+    Copy of `payload` with every listed section compacted to `section_budget`
+    tokens; if the sections still exceed `total_budget` together, budgets are
+    halved starting from the lowest-priority section. The copy carries a
+    `compaction` report of what was trimmed.
+    """
+    with span("compact"):
+        return _compact_payload(payload, sections, section_budget, total_budget)
+
+def _compact_payload(
+    payload: Dict[str, Any],
+    sections: Sequence[str],
+    section_budget: int,
+    total_budget: int,
+) -> Dict[str, Any]:
+    present: List[str] = [s for s in sections if payload.get(s) is not None]
+    compacted = dict(payload)
+    reports: Dict[str, Dict[str, Any]] = {}
+    budgets = {s: section_budget for s in present}
+
+    for name in present:
+        compacted[name], reports[name] = compact_section(payload[name], budgets[name])
+
+    def total() -> int:
+        return sum(r["compacted_tokens"] for r in reports.values())
+
+    floor = 64
+    while total() > total_budget:
+        shrinkable = [s for s in reversed(present) if budgets[s] > floor]
+        if not shrinkable:
+            break
+        for name in shrinkable:
+            budgets[name] = max(floor, budgets[name] // 2)
+            compacted[name], reports[name] = compact_section(payload[name], budgets[name])
+            reports[name]["degraded"] = True
+            if total() <= total_budget:
+                break
+
+    original_total = sum(r["original_tokens"] for r in reports.values())
+    compacted["compaction"] = {
+        "sections": reports,
+        "original_tokens": original_total,
+        "compacted_tokens": total(),
+        "trimmed_tokens": max(0, original_total - total()),
+        "lossy": any(r["strategy"].startswith(("sampled", "truncated")) for r in reports.values()),
+    }
+    if compacted["compaction"]["trimmed_tokens"]:
+        logger.info(
+            "Prompt compaction: %d -> %d estimated tokens",
+            original_total, compacted["compaction"]["compacted_tokens"],
+        )
+    return compacted
+
+def compaction_note(payload: Dict[str, Any]) -> str:
+    """Prompt line telling the model that sampled sections are partial."""
+    report = payload.get("compaction") or {}
+    if not report.get("lossy"):
+        return ""
+    return (
+        "Note: some sections were sampled to fit the prompt budget; "
+        "\"_count\" gives the full number of records and \"_sample\" the records shown.\n"
+    )
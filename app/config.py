@@ -39,10 +39,145 @@ def get_anthropic_model() -> str:
     """
     return os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-latest")
 
+# Shared AsyncAnthropic client (see app/llm_client.py)
+ANTHROPIC_MAX_CONNECTIONS = int(os.getenv("ANTHROPIC_MAX_CONNECTIONS", "20"))
+ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS", "10"))
+ANTHROPIC_TIMEOUT = float(os.getenv("ANTHROPIC_TIMEOUT", "120"))
+ANTHROPIC_MAX_RETRIES = int(os.getenv("ANTHROPIC_MAX_RETRIES", "2"))
+
+# Anthropic prompt caching: cache breakpoints after the system/instructions
+# block and after the application data (see app/summarizers.py)
+PROMPT_CACHING_ENABLED = os.getenv("PROMPT_CACHING_ENABLED", "true").lower() in ("1", "true", "yes")
+
 MCP_CONFIG_PATH = os.getenv("MCP_CONFIG_PATH", "config/mcp.json")
 MCP_IMAGING_URL_OVERRIDE = os.getenv("MCP_IMAGING_URL", None)
 IMAGING_API_KEY = os.getenv("IMAGING_API_KEY", "")
 
+# MCP session pool (see app/mcp_pool.py)
+MCP_POOL_MIN_SIZE = int(os.getenv("MCP_POOL_MIN_SIZE", "1"))
+MCP_POOL_MAX_SIZE = int(os.getenv("MCP_POOL_MAX_SIZE", "4"))
+MCP_SESSION_MAX_INFLIGHT = int(os.getenv("MCP_SESSION_MAX_INFLIGHT", "8"))
+MCP_POOL_HEALTHCHECK_INTERVAL = float(os.getenv("MCP_POOL_HEALTHCHECK_INTERVAL", "30"))
+MCP_POOL_CONNECT_TIMEOUT = float(os.getenv("MCP_POOL_CONNECT_TIMEOUT", "15"))
+
+# Tool catalog cache (see app/tool_catalog.py)
+TOOL_CATALOG_TTL = float(os.getenv("TOOL_CATALOG_TTL", "600"))
+
+# Application inventory (see app/inventory.py): fresh for TTL seconds, then
+# served stale for up to MAX_STALE more seconds while it refreshes.
+APP_INVENTORY_TTL = float(os.getenv("APP_INVENTORY_TTL", "120"))
+APP_INVENTORY_MAX_STALE = float(os.getenv("APP_INVENTORY_MAX_STALE", "3600"))
+
+# MCP tool result cache (see app/result_cache.py). Per-tool TTLs use the
+# form "stats=3600,architectural_graph=7200"; an empty DB path keeps the cache
+# in memory only.
+MCP_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("MCP_RESULT_CACHE_MAX_ENTRIES", "512"))
+MCP_RESULT_CACHE_TTL = float(os.getenv("MCP_RESULT_CACHE_TTL", "900"))
+MCP_RESULT_CACHE_TTLS = os.getenv("MCP_RESULT_CACHE_TTLS", "")
+MCP_RESULT_CACHE_DB = os.getenv("MCP_RESULT_CACHE_DB", "")
+
+# Startup warm-up (see app/warmup.py). /readyz turns ready once it finishes or
+# WARMUP_TIMEOUT elapses. WARMUP_APPLICATIONS is a comma-separated list of
+# application names whose summaries are prefetched for WARMUP_QUESTION.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "90"))
+WARMUP_APPLICATIONS = [a.strip() for a in os.getenv("WARMUP_APPLICATIONS", "").split(",") if a.strip()]
+WARMUP_QUESTION = os.getenv("WARMUP_QUESTION", "Summarize this application")
+
+# Server-Timing header on /query and /impact responses (see app/profiling.py);
+# when off, phases are only collected for requests asking for ?profile=1.
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Event-loop lag probe period for /metrics, in seconds (0 disables it)
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.25"))
+
+# Per-call timeout for tool calls run through app/scheduler.py, in seconds
+TOOL_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "60"))
+
+# Batch impact analysis (POST /impact/batch)
+IMPACT_BATCH_CONCURRENCY = int(os.getenv("IMPACT_BATCH_CONCURRENCY", "8"))
+IMPACT_BATCH_MAX_OBJECTS = int(os.getenv("IMPACT_BATCH_MAX_OBJECTS", "100"))
+
+# Transitive impact (POST /impact with depth > 1, see app/call_graph.py): callers
+# are expanded breadth-first up to IMPACT_MAX_DEPTH levels, at most
+# TRAVERSAL_FAN_OUT objects per level and TRAVERSAL_CONCURRENCY calls at a time,
+# TRAVERSAL_MAX_CALLERS callers per object and TRAVERSAL_MAX_NODES objects in
+# all. Learned edges are kept for the CALL_GRAPH_CACHE_MAX_APPS most recently
+# traversed application deliveries.
+IMPACT_MAX_DEPTH = int(os.getenv("IMPACT_MAX_DEPTH", "4"))
+TRAVERSAL_FAN_OUT = int(os.getenv("TRAVERSAL_FAN_OUT", "50"))
+TRAVERSAL_CONCURRENCY = int(os.getenv("TRAVERSAL_CONCURRENCY", "8"))
+TRAVERSAL_MAX_CALLERS = int(os.getenv("TRAVERSAL_MAX_CALLERS", "100"))
+TRAVERSAL_MAX_NODES = int(os.getenv("TRAVERSAL_MAX_NODES", "500"))
+TRAVERSAL_TIMEOUT = float(os.getenv("TRAVERSAL_TIMEOUT", "120"))
+CALL_GRAPH_CACHE_MAX_APPS = int(os.getenv("CALL_GRAPH_CACHE_MAX_APPS", "32"))
+
+# Paged retrieval of list tools (see app/paging.py): PAGE_SIZE items per call,
+# up to PAGE_WINDOW pages in flight, stopping at PAGED_MAX_ITEMS items or
+# PAGED_MAX_TOKENS estimated tokens per section, whichever comes first.
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+PAGE_WINDOW = int(os.getenv("PAGE_WINDOW", "4"))
+PAGED_MAX_ITEMS = int(os.getenv("PAGED_MAX_ITEMS", "500"))
+PAGED_MAX_TOKENS = int(os.getenv("PAGED_MAX_TOKENS", "20000"))
+
+# Local object symbol index (see app/symbol_index.py): one memory-mapped file
+# per application delivery under SYMBOL_INDEX_DIR, built in the background from
+# the `objects` tool (up to SYMBOL_INDEX_MAX_OBJECTS objects) and used to
+# resolve /impact object hints and serve autocomplete.
+SYMBOL_INDEX_ENABLED = os.getenv("SYMBOL_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+SYMBOL_INDEX_DIR = os.getenv("SYMBOL_INDEX_DIR", ".cache/symbols")
+SYMBOL_INDEX_MAX_OBJECTS = int(os.getenv("SYMBOL_INDEX_MAX_OBJECTS", "200000"))
+
+# Prompt compaction (see app/compaction.py), in estimated tokens
+PROMPT_SECTION_TOKEN_BUDGET = int(os.getenv("PROMPT_SECTION_TOKEN_BUDGET", "6000"))
+PROMPT_TOTAL_TOKEN_BUDGET = int(os.getenv("PROMPT_TOTAL_TOKEN_BUDGET", "30000"))
+
+# Map-reduce summaries (see app/mapreduce.py): in "auto" mode, used when the
+# large sections exceed MAP_REDUCE_THRESHOLD_TOKENS. Sections are cut into
+# MAP_CHUNK_TOKENS chunks, summarized at most MAP_CONCURRENCY at a time across
+# all requests, and partial summaries are merged again (up to MAP_MAX_LEVELS
+# levels) until they fit PROMPT_SECTION_TOKEN_BUDGET.
+MAP_REDUCE_THRESHOLD_TOKENS = int(os.getenv("MAP_REDUCE_THRESHOLD_TOKENS", str(PROMPT_TOTAL_TOKEN_BUDGET)))
+MAP_CHUNK_TOKENS = int(os.getenv("MAP_CHUNK_TOKENS", "8000"))
+MAP_CONCURRENCY = int(os.getenv("MAP_CONCURRENCY", "4"))
+MAP_OUTPUT_TOKENS = int(os.getenv("MAP_OUTPUT_TOKENS", "400"))
+MAP_MAX_LEVELS = int(os.getenv("MAP_MAX_LEVELS", "3"))
+
+# Architectural graph analytics (see app/graph_analytics.py): summaries get
+# the graph's metrics and GRAPH_HOTSPOTS_TOP_K hotspots instead of the graph
+# itself. GRAPH_LAYER_ORDER lists layers from outermost to innermost, each a
+# "|"-separated set of node types; an edge from an inner layer to an outer
+# one is a layering violation. Centrality is PageRank, iterated until the
+# ranks move by less than GRAPH_PAGERANK_TOLERANCE (L1) or for at most
+# GRAPH_PAGERANK_MAX_ITERATIONS rounds; those rounds are most of the cost on
+# large graphs.
+GRAPH_ANALYTICS_ENABLED = os.getenv("GRAPH_ANALYTICS_ENABLED", "true").lower() in ("1", "true", "yes")
+GRAPH_HOTSPOTS_TOP_K = int(os.getenv("GRAPH_HOTSPOTS_TOP_K", "15"))
+GRAPH_PAGERANK_MAX_ITERATIONS = int(os.getenv("GRAPH_PAGERANK_MAX_ITERATIONS", "50"))
+GRAPH_PAGERANK_TOLERANCE = float(os.getenv("GRAPH_PAGERANK_TOLERANCE", "1e-6"))
+GRAPH_LAYER_ORDER = os.getenv(
+    "GRAPH_LAYER_ORDER",
+    "web|ui|presentation|view|controller,service|business|application,domain|model|entity,repository|dao|data|persistence|database",
+)
+
+# LLM summary cache (see app/summary_cache.py)
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "256"))
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", "86400"))
+SUMMARY_CACHE_DB = os.getenv("SUMMARY_CACHE_DB", "")
+
+def parse_ttl_overrides(spec: str) -> Dict[str, float]:
+    """Parse "name=seconds,name=seconds" into a dict, ignoring malformed items."""
+    ttls: Dict[str, float] = {}
+    for item in (spec or "").split(","):
+        name, sep, value = item.partition("=")
+        if not sep:
+            continue
+        try:
+            ttls[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return ttls
+
 def load_mcp_config() -> Dict[str, Any]:
     with open(MCP_CONFIG_PATH, "r") as f:
         return json.load(f)
@@ -0,0 +1,290 @@
+import heapq
+import re
+from array import array
+from itertools import accumulate
+from operator import mul, sub
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config import (
+    GRAPH_HOTSPOTS_TOP_K,
+    GRAPH_LAYER_ORDER,
+    GRAPH_PAGERANK_MAX_ITERATIONS,
+    GRAPH_PAGERANK_TOLERANCE,
+)
+
+# Local analysis of the architectural graph: fan-in/fan-out, cycles, layering
+# violations and centrality are computed here over a compact adjacency
+# structure, and the summary prompt gets the aggregate metrics and top
+# hotspots instead of every node and edge.
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+def parse_layer_order(spec: str) -> List[Tuple[str, ...]]:
+    """Layers from outermost to innermost: "web|ui,service,repository|dao" -> [("web", "ui"), ...]."""
+    layers = []
+    for layer in spec.split(","):
+        aliases = tuple(a.strip().lower() for a in layer.split("|") if a.strip())
+        if aliases:
+            layers.append(aliases)
+    return layers
+
+class ArchitectureGraph:
+    """
+    Directed graph in compressed sparse row form: the targets of node `n` are
+    `indices[indptr[n]:indptr[n + 1]]`, both unsigned int arrays, and its
+    sources likewise in `in_indices`/`in_indptr`. Parallel edges are merged
+    and self-loops are only counted.
+    """
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Tuple[int, int]], self_loops: int = 0, dangling: int = 0):
+        self.nodes = nodes
+        self.self_loops = self_loops
+        self.dangling = dangling
+        n = len(nodes)
+        unique = {(s, t) for s, t in edges if s != t}
+        self.indptr, self.indices = self._csr(n, sorted(unique))
+        # The same edges grouped by target, for fan-in and for pulling rank.
+        self.in_indptr, self.in_indices = self._csr(n, sorted((t, s) for s, t in unique))
+
+    @staticmethod
+    def _csr(n: int, pairs: List[Tuple[int, int]]) -> Tuple[array, array]:
+        indptr = array("I", [0]) * (n + 1)
+        for row, _ in pairs:
+            indptr[row + 1] += 1
+        for i in range(n):
+            indptr[i + 1] += indptr[i]
+        return indptr, array("I", (col for _, col in pairs))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def fan_out(self, n: int) -> int:
+        return self.indptr[n + 1] - self.indptr[n]
+
+    def fan_in(self, n: int) -> int:
+        return self.in_indptr[n + 1] - self.in_indptr[n]
+
+    def targets(self, n: int) -> array:
+        return self.indices[self.indptr[n]:self.indptr[n + 1]]
+
+    @classmethod
+    def from_payload(cls, value: Any) -> Optional["ArchitectureGraph"]:
+        """
+        Graph from an `architectural_graph` result: a dict with a "nodes"
+        list and an "edges" (or "links") list whose items name their ends in
+        "from"/"to" or "source"/"target". None for any other shape.
+        """
+        if not isinstance(value, dict) or not isinstance(value.get("nodes"), list):
+            return None
+        raw_edges = value.get("edges", value.get("links", []))
+        if not isinstance(raw_edges, list):
+            return None
+        nodes: List[Dict[str, Any]] = []
+        number: Dict[str, int] = {}
+        for node in value["nodes"]:
+            if isinstance(node, dict) and node.get("id") is not None and str(node["id"]) not in number:
+                number[str(node["id"])] = len(nodes)
+                nodes.append(node)
+        edges: List[Tuple[int, int]] = []
+        self_loops = dangling = 0
+        for edge in raw_edges:
+            if not isinstance(edge, dict):
+                continue
+            s = number.get(str(edge.get("from", edge.get("source"))))
+            t = number.get(str(edge.get("to", edge.get("target"))))
+            if s is None or t is None:
+                dangling += 1
+            elif s == t:
+                self_loops += 1
+            else:
+                edges.append((s, t))
+        return cls(nodes, edges, self_loops, dangling)
+
+def strongly_connected_components(graph: ArchitectureGraph) -> List[List[int]]:
+    """Components of mutually reachable nodes (Tarjan's algorithm, iterative), larger than one node."""
+    n = len(graph)
+    indptr, indices = graph.indptr, graph.indices
+    index = array("l", [-1]) * n
+    low = array("l", [0]) * n
+    on_stack = bytearray(n)
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, indptr[root])]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        while work:
+            v, pos = work[-1]
+            if pos < indptr[v + 1]:
+                work[-1] = (v, pos + 1)
+                w = indices[pos]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    work.append((w, indptr[w]))
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+            work.pop()
+            if work and low[v] < low[work[-1][0]]:
+                low[work[-1][0]] = low[v]
+            if low[v] == index[v]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = 0
+                    component.append(w)
+                    if w == v:
+                        break
+                if len(component) > 1:
+                    components.append(component)
+    return components
+
+def pagerank(
+    graph: ArchitectureGraph,
+    damping: float = 0.85,
+    iterations: int = GRAPH_PAGERANK_MAX_ITERATIONS,
+    tolerance: float = GRAPH_PAGERANK_TOLERANCE,
+) -> List[float]:
+    """
+    PageRank along the edges, so that nodes many others depend on rank high;
+    sums to 1. Each iteration pulls the sources' shares in edge order and
+    sums them per target through prefix sums, without a Python loop per edge.
+    """
+    n = len(graph)
+    if n == 0:
+        return []
+    out_degree = [graph.fan_out(v) for v in range(n)]
+    inverse = [1.0 / d if d else 0.0 for d in out_degree]
+    sinks = [v for v in range(n) if not out_degree[v]]
+    bounds = list(zip(graph.in_indptr, graph.in_indptr[1:]))
+    sources = graph.in_indices
+    rank = [1.0 / n] * n
+    for _ in range(iterations):
+        share = list(map(mul, rank, inverse))
+        prefix = list(accumulate(map(share.__getitem__, sources), initial=0.0))
+        base = (1.0 - damping + damping * sum(rank[v] for v in sinks)) / n
+        nxt = [base + damping * (prefix[b] - prefix[a]) for a, b in bounds]
+        delta = sum(map(abs, map(sub, nxt, rank)))
+        rank = nxt
+        if delta < tolerance:
+            break
+    return rank
+
+def node_layers(graph: ArchitectureGraph, order: Sequence[Tuple[str, ...]]) -> List[int]:
+    """Position in `order` of each node's "layer" (or "type"), -1 when it matches none."""
+    out = []
+    for node in graph.nodes:
+        tokens = set(_TOKEN_RE.findall(str(node.get("layer") or node.get("type") or "").lower()))
+        out.append(next((i for i, aliases in enumerate(order) if tokens.intersection(aliases)), -1))
+    return out
+
+def _label(node: Dict[str, Any]) -> str:
+    return str(node.get("name") or node.get("id"))
+
+def analyze_graph(
+    graph: ArchitectureGraph,
+    top_k: int = GRAPH_HOTSPOTS_TOP_K,
+    layer_order: Optional[Sequence[Tuple[str, ...]]] = None,
+) -> Dict[str, Any]:
+    """
+    Aggregate metrics and the `top_k` hotspots of `graph`. Hotspots are
+    ranked by centrality (PageRank, scaled so that 1.0 is the average node),
+    then by fan-in + fan-out. A layering violation is an edge from an inner
+    layer of `layer_order` to an outer one.
+    """
+    order = parse_layer_order(GRAPH_LAYER_ORDER) if layer_order is None else list(layer_order)
+    n = len(graph)
+    fan_in = [graph.fan_in(v) for v in range(n)]
+    fan_out = [graph.fan_out(v) for v in range(n)]
+
+    components = sorted(strongly_connected_components(graph), key=len, reverse=True)
+    cycle_size: Dict[int, int] = {v: len(c) for c in components for v in c}
+
+    layers = node_layers(graph, order)
+    violations = []
+    for v in range(n):
+        if layers[v] < 0:
+            continue
+        for t in graph.targets(v):
+            if 0 <= layers[t] < layers[v]:
+                violations.append((v, t))
+
+    rank = pagerank(graph)
+    hot = heapq.nsmallest(top_k, range(n), key=lambda v: (-rank[v], -(fan_in[v] + fan_out[v]), _label(graph.nodes[v])))
+
+    def hotspot(v: int) -> Dict[str, Any]:
+        node = graph.nodes[v]
+        entry = {
+            "id": node.get("id"),
+            "name": _label(node),
+            "type": node.get("type"),
+            "fan_in": fan_in[v],
+            "fan_out": fan_out[v],
+            "centrality": round(rank[v] * n, 2),
+        }
+        if v in cycle_size:
+            entry["cycle_size"] = cycle_size[v]
+        return entry
+
+    def layer_name(v: int) -> str:
+        return order[layers[v]][0]
+
+    examples = heapq.nsmallest(top_k, violations, key=lambda e: (-rank[e[1]], _label(graph.nodes[e[0]])))
+    return {
+        "analysis": "computed over the full graph; only the top hotspots are listed",
+        "nodes": n,
+        "edges": graph.edge_count,
+        "self_loops": graph.self_loops,
+        "dangling_edges": graph.dangling,
+        "isolated_nodes": sum(1 for v in range(n) if fan_in[v] == 0 and fan_out[v] == 0),
+        "mean_fan_out": round(graph.edge_count / n, 2) if n else 0.0,
+        "max_fan_in": max(fan_in, default=0),
+        "max_fan_out": max(fan_out, default=0),
+        "cycles": {
+            "count": len(components),
+            "nodes_in_cycles": len(cycle_size),
+            "largest_size": len(components[0]) if components else 0,
+            "largest": [_label(graph.nodes[v]) for v in sorted(components[0], key=lambda v: -rank[v])[:top_k]]
+            if components else [],
+        },
+        "layering": {
+            "order": [aliases[0] for aliases in order],
+            "violations": len(violations),
+            "examples": [
+                {"from": _label(graph.nodes[s]), "to": _label(graph.nodes[t]),
+                 "from_layer": layer_name(s), "to_layer": layer_name(t)}
+                for s, t in examples
+            ],
+        },
+        "hotspots": [hotspot(v) for v in hot],
+    }
+
+def is_graph_analysis(value: Any) -> bool:
+    return isinstance(value, dict) and "hotspots" in value and "analysis" in value
+
+def with_graph_analytics(payload: Dict[str, Any], top_k: int = GRAPH_HOTSPOTS_TOP_K) -> Dict[str, Any]:
+    """
+    Copy of a summary payload whose `architectural_graph` is replaced by its
+    analysis; the payload itself when the graph is missing or not in a
+    node/edge shape this module understands.
+    """
+    value = payload.get("architectural_graph")
+    graph = ArchitectureGraph.from_payload(value)
+    if graph is None or not len(graph):
+        return payload
+    analysis = analyze_graph(graph, top_k)
+    if value.get("granularity") is not None:
+        analysis = {"granularity": value["granularity"], **analysis}
+    return {**payload, "architectural_graph": analysis}
@@ -0,0 +1,172 @@
+import asyncio
+import inspect
+import logging
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from .mcp_client import imaging_session, imaging_endpoint_key
+from .name_index import NameIndex
+
+logger = logging.getLogger("cast-imaging-agent.inventory")
+
+_DATETIME_RE = re.compile(r"dateTime:\s*([^,\]\s]+)")
+
+def application_display_name(app: Dict[str, Any], index: int = 0) -> str:
+    return str(app.get("name") or app.get("application") or app.get("id") or f"app_{index}")
+
+def normalize_app_id(app: Dict[str, Any]) -> Any:
+    return app.get("id") or app.get("applicationId") or app.get("name")
+
+def delivery_timestamp(app: Dict[str, Any]) -> Optional[str]:
+    """
+    The delivery dateTime of an application, as found in the `delivery` field
+    that `parse_applications_string` extracts (or a structured equivalent).
+    """
+    delivery = app.get("delivery")
+    if isinstance(delivery, dict):
+        value = delivery.get("dateTime") or delivery.get("date")
+        return str(value) if value else None
+    if isinstance(delivery, str):
+        m = _DATETIME_RE.search(delivery)
+        return m.group(1) if m else delivery
+    value = app.get("deliveryDate") or app.get("lastDelivery")
+    return str(value) if value else None
+
+class ApplicationInventory:
+    """
+    One snapshot of the portfolio: applications, their names and deliveries,
+    and a trigram index of the names. Passing the previous snapshot's `index`
+    updates it in place with the added and removed names only.
+    """
+
+    def __init__(self, apps: List[Dict[str, Any]], index: Optional[NameIndex] = None):
+        self.apps = apps
+        self.names = [application_display_name(app, i) for i, app in enumerate(apps)]
+        self.index = index if index is not None else NameIndex()
+        self.index.update(self.names)
+        self.deliveries: Dict[Any, Optional[str]] = {
+            normalize_app_id(app): delivery_timestamp(app) for app in apps
+        }
+        self.fetched_at = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def changed_since(self, previous: Optional["ApplicationInventory"]) -> Set[Any]:
+        """Applications added, removed, or re-delivered since `previous`."""
+        if previous is None:
+            return set()
+        keys = set(self.deliveries) | set(previous.deliveries)
+        return {
+            k for k in keys
+            if self.deliveries.get(k, "<absent>") != previous.deliveries.get(k, "<absent>")
+        }
+
+# Listeners may be coroutine functions, e.g. to drop disk-backed cache entries off the loop.
+InventoryListener = Callable[[str, Set[Any]], Optional[Awaitable[None]]]
+
+class ApplicationInventoryCache:
+    """
+    Application inventories keyed by MCP endpoint, with stale-while-revalidate:
+    fresh for `ttl` seconds, then served as-is for up to `max_stale` more
+    seconds while a background task refetches it.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Any, str], Awaitable[List[Dict[str, Any]]]],
+        ttl: float = 120.0,
+        max_stale: float = 3600.0,
+    ):
+        self._loader = loader
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries: Dict[str, ApplicationInventory] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._listeners: List[InventoryListener] = []
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def add_listener(self, listener: InventoryListener) -> None:
+        """Register `listener(endpoint, changed_app_ids)`, called (and awaited if async) on delivery changes."""
+        self._listeners.append(listener)
+
+    def peek(self, key: Optional[str] = None) -> Optional[ApplicationInventory]:
+        return self._entries.get(key or imaging_endpoint_key())
+
+    async def get(self, session, applications_tool: str, key: Optional[str] = None) -> ApplicationInventory:
+        key = key or imaging_endpoint_key()
+        inventory = self._entries.get(key)
+        if inventory is not None:
+            if inventory.age < self.ttl:
+                self.hits += 1
+                return inventory
+            if inventory.age < self.ttl + self.max_stale:
+                self.stale_hits += 1
+                self._schedule_refresh(key, applications_tool)
+                return inventory
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            inventory = self._entries.get(key)
+            if inventory is not None and inventory.age < self.ttl:
+                self.hits += 1
+                return inventory
+            self.misses += 1
+            return await self.refresh(session, applications_tool, key)
+
+    async def refresh(self, session, applications_tool: str, key: Optional[str] = None) -> ApplicationInventory:
+        key = key or imaging_endpoint_key()
+        apps = await self._loader(session, applications_tool)
+        previous = self._entries.get(key)
+        inventory = ApplicationInventory(apps, index=previous.index if previous else None)
+        changed = inventory.changed_since(previous)
+        self._entries[key] = inventory
+        if changed:
+            logger.info("Application inventory changed for %d application(s)", len(changed))
+            for listener in self._listeners:
+                try:
+                    result = listener(key, changed)
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception:
+                    logger.exception("Inventory listener failed")
+        return inventory
+
+    def _schedule_refresh(self, key: str, applications_tool: str) -> None:
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._background_refresh(key, applications_tool))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _background_refresh(self, key: str, applications_tool: str) -> None:
+        try:
+            async with imaging_session() as session:
+                await self.refresh(session, applications_tool, key)
+        except Exception as e:
+            logger.warning("Background application inventory refresh failed: %s", e)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "ttl_s": self.ttl,
+            "max_stale_s": self.max_stale,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else None,
+            "endpoints": {
+                key: {"age_s": round(inv.age, 1), "applications": len(inv.apps)}
+                for key, inv in self._entries.items()
+            },
+        }
@@ -0,0 +1,64 @@
+import logging
+from typing import Optional
+
+import anthropic
+import httpx
+
+from .config import (
+    get_anthropic_api_key,
+    ANTHROPIC_MAX_CONNECTIONS,
+    ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS,
+    ANTHROPIC_TIMEOUT,
+    ANTHROPIC_MAX_RETRIES,
+)
+
+logger = logging.getLogger("cast-imaging-agent.llm")
+
+# Process-wide client, created by the FastAPI lifespan (or lazily on first use).
+_client: Optional[anthropic.AsyncAnthropic] = None
+
+def create_anthropic_client() -> anthropic.AsyncAnthropic:
+    """
+    Build an AsyncAnthropic client with a bounded, keep-alive connection pool.
+    The API key is passed explicitly, so nothing is read from or written to
+    os.environ per call.
+    """
+    api_key = get_anthropic_api_key()
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY is not set or empty")
+
+    http_client = anthropic.DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=ANTHROPIC_MAX_CONNECTIONS,
+            max_keepalive_connections=ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+        timeout=ANTHROPIC_TIMEOUT,
+    )
+    return anthropic.AsyncAnthropic(
+        api_key=api_key,
+        auth_token=None,
+        http_client=http_client,
+        max_retries=ANTHROPIC_MAX_RETRIES,
+    )
+
+def init_anthropic_client() -> Optional[anthropic.AsyncAnthropic]:
+    """Create the shared client at startup; a missing key is logged, not raised."""
+    global _client
+    if _client is None:
+        try:
+            _client = create_anthropic_client()
+        except ValueError as e:
+            logger.warning("Anthropic client not initialized: %s", e)
+    return _client
+
+def get_anthropic_client() -> anthropic.AsyncAnthropic:
+    global _client
+    if _client is None:
+        _client = create_anthropic_client()
+    return _client
+
+async def close_anthropic_client() -> None:
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.close()
@@ -0,0 +1,72 @@
+from typing import Any, Dict, List, Sequence
+
+from .compaction import estimate_tokens, render_value
+
+# Map-reduce summarization of sections too large for one prompt. This module
+# only splits and recombines data; the LLM calls live in app/summarizers.py.
+
+MAP_REDUCE_SECTIONS = ("architectural_graph", "transactions", "data_graphs")
+
+def section_tokens(payload: Dict[str, Any], sections: Sequence[str]) -> int:
+    return sum(estimate_tokens(render_value(payload[s])) for s in sections if payload.get(s) is not None)
+
+def needs_map_reduce(payload: Dict[str, Any], threshold: int, sections: Sequence[str] = MAP_REDUCE_SECTIONS) -> bool:
+    """True when the large sections together exceed `threshold` estimated tokens."""
+    return section_tokens(payload, sections) > threshold
+
+def _group(items: List[Any], max_tokens: int, cost) -> List[List[Any]]:
+    groups: List[List[Any]] = []
+    current: List[Any] = []
+    used = 0
+    for item in items:
+        c = cost(item)
+        if current and used + c > max_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += c
+    if current:
+        groups.append(current)
+    return groups
+
+def split_section(value: Any, max_tokens: int) -> List[Any]:
+    """
+    Split one section into chunks of about `max_tokens` estimated tokens that
+    keep the section's shape: sub-lists of a list, dicts holding slices of a
+    dict's list fields (its other fields go with the first chunk), or groups
+    of lines of a text. A single record larger than the budget is its own chunk.
+    """
+    if isinstance(value, list):
+        return _group(value, max_tokens, lambda r: estimate_tokens(render_value(r)))
+    if isinstance(value, str):
+        lines = _group(value.splitlines(), max_tokens, lambda line: estimate_tokens(line) + 1)
+        return ["\n".join(group) for group in lines]
+    if not isinstance(value, dict):
+        return [value]
+
+    header = {k: v for k, v in value.items() if not isinstance(v, list)}
+    entries = [(k, item) for k, v in value.items() if isinstance(v, list) for item in v]
+    if not entries:
+        return [value]
+    chunks: List[Any] = []
+    for group in _group(entries, max_tokens, lambda e: estimate_tokens(render_value(e[1]))):
+        chunk: Dict[str, Any] = dict(header) if not chunks else {}
+        for key, item in group:
+            chunk.setdefault(key, []).append(item)
+        chunks.append(chunk)
+    return chunks
+
+def record_count(value: Any) -> int:
+    """Records in a section: list items, or the items of a dict's list fields."""
+    if isinstance(value, list):
+        return len(value)
+    if isinstance(value, dict):
+        lists = [len(v) for v in value.values() if isinstance(v, list)]
+        return sum(lists) if lists else 1
+    return 0 if value is None else 1
+
+def combine_partials(partials: List[str], records: int) -> str:
+    """Prompt form of a mapped section: the partial summaries, in order."""
+    parts = len(partials)
+    header = f"(Summarized from {records} records in {parts} part{'s' if parts != 1 else ''}.)"
+    return "\n".join([header] + [f"[{i}/{parts}] {p.strip()}" for i, p in enumerate(partials, 1)])
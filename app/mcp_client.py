@@ -1,46 +1,160 @@
+import json
 import logging
+import time
 from contextlib import asynccontextmanager
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from .config import load_mcp_config, resolve_imaging_endpoint
+from .config import (
+    load_mcp_config,
+    resolve_imaging_endpoint,
+    MCP_POOL_MIN_SIZE,
+    MCP_POOL_MAX_SIZE,
+    MCP_SESSION_MAX_INFLIGHT,
+    MCP_POOL_HEALTHCHECK_INTERVAL,
+    MCP_POOL_CONNECT_TIMEOUT,
+)
+from .mcp_pool import MCPSessionPool
+from .metrics import SESSION_ACQUIRE_SECONDS, MCP_TOOL_CALL_SECONDS, record_error, tool_label
+from .profiling import record_span
 
 logger = logging.getLogger("cast-imaging-agent.mcp")
 
+# Process-wide session pool, installed by the FastAPI lifespan.
+_session_pool: Optional[MCPSessionPool] = None
+
+def set_session_pool(pool: Optional[MCPSessionPool]) -> None:
+    global _session_pool
+    _session_pool = pool
+
+def get_session_pool() -> Optional[MCPSessionPool]:
+    return _session_pool
+
+@asynccontextmanager
+async def open_streamable_session(base_url: str, headers: Dict[str, str]):
+    """
+    Open a Streamable HTTP transport to Imaging and yield an initialized
+    ClientSession. Lazy-imports the SDK so tests can run without MCP installed.
+    """
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    async with streamablehttp_client(base_url, headers=headers) as (read, write, get_session_id):
+        async with ClientSession(read, write) as session:
+            # Initialize the protocol session explicitly
+            await session.initialize()
+            yield session
+
+def create_session_pool() -> MCPSessionPool:
+    """Build a session pool for the configured Imaging endpoint."""
+    cfg = load_mcp_config()
+    base_url, headers = resolve_imaging_endpoint(cfg)
+    return MCPSessionPool(
+        lambda: open_streamable_session(base_url, headers),
+        min_size=MCP_POOL_MIN_SIZE,
+        max_size=MCP_POOL_MAX_SIZE,
+        max_inflight=MCP_SESSION_MAX_INFLIGHT,
+        healthcheck_interval=MCP_POOL_HEALTHCHECK_INTERVAL,
+        connect_timeout=MCP_POOL_CONNECT_TIMEOUT,
+        endpoint=base_url,
+    )
+
+_endpoint_key: Optional[str] = None
+
+def imaging_endpoint_key() -> str:
+    """Identify the Imaging MCP endpoint in use, for keying per-server caches."""
+    global _endpoint_key
+    if _session_pool is not None and _session_pool.endpoint:
+        return _session_pool.endpoint
+    if _endpoint_key is None:
+        try:
+            _endpoint_key, _ = resolve_imaging_endpoint(load_mcp_config())
+        except Exception as e:
+            logger.warning("Could not resolve Imaging endpoint for cache keys: %s", e)
+            return "default"
+    return _endpoint_key
+
 @asynccontextmanager
 async def imaging_session():
     """
     Async context manager yielding an MCP ClientSession connected to Imaging
     over Streamable HTTP transport (available since MCP 2024-11-05).
-    Lazy-imports the SDK so tests can stub this function without installing MCP.
+    Borrows a warm session from the pool when one is installed, otherwise
+    opens a one-off session.
     """
     # Check if we're in test mode (mocked by pytest)
     if hasattr(imaging_session, '_test_implementation'):
         async with imaging_session._test_implementation() as session:
             yield session
         return
-    
-    # Lazy imports to avoid hard dependency at module import time (helps tests)
-    from mcp import ClientSession
-    from mcp.client.streamable_http import streamablehttp_client
+
+    t0 = time.perf_counter()
+    if _session_pool is not None:
+        async with _session_pool.acquire() as session:
+            SESSION_ACQUIRE_SECONDS.observe(time.perf_counter() - t0, mode="pool")
+            record_span("mcp_connect", t0, mode="pool")
+            yield session
+        return
 
     cfg = load_mcp_config()
     base_url, headers = resolve_imaging_endpoint(cfg)
-
-    # Connect with streamable HTTP client 
-    async with streamablehttp_client(base_url, headers=headers) as (read, write, get_session_id):
-        async with ClientSession(read, write) as session:
-            # Initialize the protocol session explicitly
-            await session.initialize()
+    try:
+        async with open_streamable_session(base_url, headers) as session:
+            SESSION_ACQUIRE_SECONDS.observe(time.perf_counter() - t0, mode="oneoff")
+            record_span("mcp_connect", t0, mode="oneoff")
             yield session
+    except BaseExceptionGroup as group:
+        # The transport's task group wraps errors raised by the caller; surface
+        # a lone error as itself so messages stay readable.
+        inner = group
+        while isinstance(inner, BaseExceptionGroup) and len(inner.exceptions) == 1:
+            inner = inner.exceptions[0]
+        if inner is group:
+            raise
+        raise inner from group
 
 async def list_tools(session) -> List[str]:
     tools = await session.list_tools()
     # Normalize to names (SDK returns an object with .tools list)
     return [t.name for t in tools.tools]
 
+async def list_tool_specs(session) -> List[Dict[str, Any]]:
+    """Tool names with their JSON `inputSchema` (None when the server sends none)."""
+    tools = await session.list_tools()
+    return [{"name": t.name, "input_schema": getattr(t, "inputSchema", None)} for t in tools.tools]
+
+class MCPToolError(RuntimeError):
+    """The server answered a tool call with `isError` set."""
+
+    def __init__(self, tool_name: str, message: str):
+        super().__init__(message or f"Tool '{tool_name}' failed")
+        self.tool_name = tool_name
+
+def _error_text(result) -> str:
+    for block in getattr(result, "content", None) or []:
+        text = getattr(block, "text", None)
+        if text:
+            return text
+    return ""
+
 async def call_tool(session, tool_name: str, args: Dict[str, Any]):
-    result = await session.call_tool(tool_name, args)
-    
+    t0 = time.perf_counter()
+    try:
+        result = await session.call_tool(tool_name, args)
+        if getattr(result, "isError", False) is True:
+            raise MCPToolError(tool_name, _error_text(result))
+    except Exception as e:
+        label = tool_label(tool_name)
+        MCP_TOOL_CALL_SECONDS.observe(time.perf_counter() - t0, tool=label, outcome="error")
+        record_span(f"tool_{label}", t0, outcome="error")
+        record_error("mcp_tool", e)
+        raise
+    label = tool_label(tool_name)
+    MCP_TOOL_CALL_SECONDS.observe(time.perf_counter() - t0, tool=label, outcome="ok")
+    record_span(f"tool_{label}", t0, outcome="ok")
+    return decode_tool_result(result)
+
+def decode_tool_result(result):
+    """Python value of a CallToolResult: first text block as JSON (or text), data, or the raw result."""
     # Extract the actual content from CallToolResult
     if hasattr(result, 'content') and result.content:
         # MCP CallToolResult has a content attribute which is a list
@@ -51,7 +165,6 @@ async def call_tool(session, tool_name: str, args: Dict[str, Any]):
             # Handle different content types
             if hasattr(first_content, 'text'):
                 # Text content - try to parse as JSON
-                import json
                 try:
                     return json.loads(first_content.text)
                 except (json.JSONDecodeError, AttributeError):
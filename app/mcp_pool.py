@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, Callable, Dict, List, Optional
+
+import anyio
+import httpx
+
+logger = logging.getLogger("cast-imaging-agent.mcp.pool")
+
+# Errors raised by the transport when the underlying Streamable HTTP connection
+# is gone. A session that surfaces one of these is discarded and re-opened.
+_TRANSPORT_ERRORS = (
+    ConnectionError,
+    OSError,
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+)
+
+def _is_transport_error(error: Optional[BaseException]) -> bool:
+    """True when `error`, or an exception it was raised from, is a transport error."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, _TRANSPORT_ERRORS):
+            return True
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return False
+
+class _PooledSession:
+    """One long-lived MCP session, owned by a dedicated background task."""
+
+    def __init__(self, max_inflight: int):
+        self.session: Any = None
+        self.error: Optional[BaseException] = None
+        self.ready = asyncio.Event()
+        self.closing = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.semaphore = asyncio.Semaphore(max_inflight)
+        self.leases = 0
+        self.broken = False
+        self.last_checked = time.monotonic()
+
+    @property
+    def dead(self) -> bool:
+        if self.broken or self.closing.is_set():
+            return True
+        if self.task is not None and self.task.done():
+            return True
+        return self.ready.is_set() and self.session is None
+
+class _ThrottledSession:
+    """
+    Session proxy handed to borrowers. Caps concurrent in-flight requests on
+    the shared session and forwards everything else untouched.
+    """
+
+    def __init__(self, pooled: _PooledSession):
+        self._pooled = pooled
+
+    async def call_tool(self, *args, **kwargs):
+        async with self._pooled.semaphore:
+            try:
+                return await self._pooled.session.call_tool(*args, **kwargs)
+            except _TRANSPORT_ERRORS:
+                # Callers may wrap or swallow the error; the session is dead either way.
+                self._pooled.broken = True
+                raise
+
+    async def list_tools(self, *args, **kwargs):
+        async with self._pooled.semaphore:
+            try:
+                return await self._pooled.session.list_tools(*args, **kwargs)
+            except _TRANSPORT_ERRORS:
+                self._pooled.broken = True
+                raise
+
+    async def send_ping(self):
+        async with self._pooled.semaphore:
+            return await self._pooled.session.send_ping()
+
+    def __getattr__(self, name: str):
+        return getattr(self._pooled.session, name)
+
+class MCPSessionPool:
+    """
+    Pool of initialized MCP ClientSessions shared across requests.
+
+    `session_factory` is an async context manager factory yielding an
+    initialized session; each pooled session lives inside its own task so the
+    transport's task groups are entered and exited from the same task.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncContextManager[Any]],
+        min_size: int = 1,
+        max_size: int = 4,
+        max_inflight: int = 8,
+        healthcheck_interval: float = 30.0,
+        connect_timeout: float = 15.0,
+        endpoint: Optional[str] = None,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self._session_factory = session_factory
+        self.endpoint = endpoint
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.max_inflight = max(1, max_inflight)
+        self.healthcheck_interval = healthcheck_interval
+        self.connect_timeout = connect_timeout
+        self._sessions: List[_PooledSession] = []
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+    async def start(self) -> None:
+        """Open `min_size` sessions up front. Failures are logged, not raised."""
+        async with self._lock:
+            pending = [self._spawn() for _ in range(self.min_size - len(self._sessions))]
+        for pooled in pending:
+            await self._wait_ready(pooled, raise_on_error=False)
+        logger.info("MCP session pool started with %d live session(s)", self.size)
+
+    async def close(self) -> None:
+        self._closed = True
+        async with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for pooled in sessions:
+            pooled.closing.set()
+        tasks = [p.task for p in sessions if p.task is not None]
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.connect_timeout)
+
+    @property
+    def size(self) -> int:
+        return sum(1 for p in self._sessions if not p.dead)
+
+    def stats(self) -> Dict[str, Any]:
+        live = [p for p in self._sessions if not p.dead]
+        return {
+            "size": len(live),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "max_inflight": self.max_inflight,
+            "leases": sum(p.leases for p in live),
+        }
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a warm session; re-opens it first if it was dropped."""
+        if self._closed:
+            raise RuntimeError("MCP session pool is closed.")
+        pooled = await self._checkout()
+        try:
+            yield _ThrottledSession(pooled)
+        except Exception as e:
+            # Services re-raise transport failures wrapped, e.g. RuntimeError(...) from e.
+            if _is_transport_error(e):
+                logger.warning("Discarding MCP session after transport error")
+                pooled.broken = True
+            raise
+        finally:
+            self._release(pooled)
+
+    async def _checkout(self) -> _PooledSession:
+        last_err: Optional[BaseException] = None
+        for _ in range(2):
+            async with self._lock:
+                self._prune()
+                pooled = self._pick() or self._spawn()
+                pooled.leases += 1
+            try:
+                await self._wait_ready(pooled, raise_on_error=True)
+                await self._health_check(pooled)
+                return pooled
+            except Exception as e:
+                last_err = e
+                pooled.broken = True
+                self._release(pooled)
+        raise RuntimeError(f"Imaging MCP: unable to obtain a session: {last_err}") from last_err
+
+    def _pick(self) -> Optional[_PooledSession]:
+        live = [p for p in self._sessions if not p.dead]
+        if not live:
+            return None
+        available = [p for p in live if p.leases < self.max_inflight]
+        if available:
+            return min(available, key=lambda p: p.leases)
+        if len(live) < self.max_size:
+            return None
+        # Every session is saturated: oversubscribe, the semaphore queues calls.
+        return min(live, key=lambda p: p.leases)
+
+    def _spawn(self) -> _PooledSession:
+        pooled = _PooledSession(self.max_inflight)
+        pooled.task = asyncio.create_task(self._run(pooled))
+        self._sessions.append(pooled)
+        return pooled
+
+    def _prune(self) -> None:
+        for pooled in self._sessions:
+            if pooled.dead and pooled.leases == 0:
+                pooled.closing.set()
+        self._sessions = [p for p in self._sessions if not (p.dead and p.leases == 0)]
+
+    def _release(self, pooled: _PooledSession) -> None:
+        pooled.leases -= 1
+        if pooled.broken and pooled.leases <= 0:
+            pooled.closing.set()
+
+    async def _run(self, pooled: _PooledSession) -> None:
+        try:
+            async with self._session_factory() as session:
+                pooled.session = session
+                pooled.last_checked = time.monotonic()
+                pooled.ready.set()
+                await pooled.closing.wait()
+        except Exception as e:
+            pooled.error = e
+            logger.warning("MCP pooled session terminated: %s", e)
+        finally:
+            pooled.session = None
+            pooled.ready.set()
+
+    async def _wait_ready(self, pooled: _PooledSession, raise_on_error: bool) -> None:
+        try:
+            await asyncio.wait_for(pooled.ready.wait(), timeout=self.connect_timeout)
+        except asyncio.TimeoutError:
+            pooled.broken = True
+            pooled.error = TimeoutError(f"session not ready after {self.connect_timeout}s")
+        if pooled.session is None:
+            if raise_on_error:
+                raise ConnectionError(f"MCP session failed to open: {pooled.error}")
+            logger.warning("MCP session failed to open: %s", pooled.error)
+
+    async def _health_check(self, pooled: _PooledSession) -> None:
+        if time.monotonic() - pooled.last_checked < self.healthcheck_interval:
+            return
+        await asyncio.wait_for(pooled.session.send_ping(), timeout=self.connect_timeout)
+        pooled.last_checked = time.monotonic()
@@ -0,0 +1,267 @@
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# Prometheus text exposition (format 0.0.4), kept in-process: /metrics renders
+# the registry on scrape, no client library or collector required.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(9))  # 1 KiB .. 64 MiB
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000, 200000)
+
+Sample = Tuple[Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]  # name, type, help, samples
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.label_names, key))
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        return [(self.name, self._labels(k), v) for k, v in sorted(self._values.items())]
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        return [(self.name, self._labels(k), v) for k, v in sorted(self._values.items())]
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket (non-cumulative) counts, +Inf count, sum.
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+                break
+        else:
+            series[1] += 1
+        series[2] += value
+
+    def count(self, **labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) + series[1] if series else 0
+
+    def sum(self, **labels: Any) -> float:
+        series = self._series.get(self._key(labels))
+        return series[2] if series else 0.0
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self):
+        out = []
+        for key, (counts, overflow, total) in sorted(self._series.items()):
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                out.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            cumulative += overflow
+            out.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, cumulative))
+            out.append((f"{self.name}_sum", labels, total))
+            out.append((f"{self.name}_count", labels, cumulative))
+        return out
+
+class Registry:
+    """Metrics owned by this process, plus collectors read at scrape time."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        """`collector()` returns (name, type, help, [(labels, value), ...]) families."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for collector in self._collectors:
+            for name, mtype, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {mtype}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+SESSION_ACQUIRE_SECONDS = registry.histogram(
+    "imaging_agent_mcp_session_acquire_seconds",
+    "Time to obtain an MCP session (pool checkout or one-off handshake).",
+    ["mode"],
+)
+MCP_TOOL_CALL_SECONDS = registry.histogram(
+    "imaging_agent_mcp_tool_call_seconds",
+    "MCP tool call latency by base tool name.",
+    ["tool", "outcome"],
+)
+APP_SELECTION_SECONDS = registry.histogram(
+    "imaging_agent_app_selection_seconds",
+    "Time spent selecting the target application.",
+)
+PROMPT_BYTES = registry.histogram(
+    "imaging_agent_prompt_bytes",
+    "Size of the prompt sent to the LLM, in bytes.",
+    ["kind"],
+    buckets=BYTES_BUCKETS,
+)
+PROMPT_TOKENS = registry.histogram(
+    "imaging_agent_prompt_tokens_estimated",
+    "Estimated prompt size in tokens (4 characters per token).",
+    ["kind"],
+    buckets=TOKEN_BUCKETS,
+)
+LLM_REQUEST_SECONDS = registry.histogram(
+    "imaging_agent_llm_request_seconds",
+    "Anthropic request latency, to the complete response.",
+    ["kind", "mode"],
+)
+LLM_TIME_TO_FIRST_TOKEN_SECONDS = registry.histogram(
+    "imaging_agent_llm_time_to_first_token_seconds",
+    "Time from sending a streaming request to the first text delta.",
+    ["kind"],
+)
+LLM_TOKENS = registry.histogram(
+    "imaging_agent_llm_tokens",
+    "Tokens per Anthropic request as reported by the API: input (uncached), output, and prompt-cache reads and writes.",
+    ["kind", "direction"],
+    buckets=TOKEN_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "imaging_agent_http_requests_in_flight",
+    "HTTP requests currently being served.",
+    ["route"],
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "imaging_agent_http_request_seconds",
+    "HTTP request duration, including streamed bodies.",
+    ["route", "method", "status"],
+)
+EVENT_LOOP_LAG_SECONDS = registry.histogram(
+    "imaging_agent_event_loop_lag_seconds",
+    "How late the event loop woke a periodic probe task.",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+ERRORS = registry.counter(
+    "imaging_agent_errors_total",
+    "Errors by where they surfaced and exception type.",
+    ["where", "type"],
+)
+
+def record_error(where: str, error: BaseException) -> None:
+    ERRORS.inc(where=where, type=type(error).__name__)
+
+async def watch_event_loop_lag(interval: float = 0.25) -> None:
+    """Sleep `interval` in a loop and record how much later than asked each wake-up came."""
+    while True:
+        t0 = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, time.perf_counter() - t0 - interval))
+
+# Concrete tool name -> base name, filled from each tool catalog refresh so
+# call metrics are labelled by base name whatever prefix the server uses.
+_tool_labels: Dict[str, str] = {}
+
+def set_tool_labels(labels: Dict[str, str]) -> None:
+    _tool_labels.update(labels)
+
+def tool_label(tool_name: str) -> str:
+    return _tool_labels.get(tool_name, tool_name)
@@ -0,0 +1,105 @@
+import heapq
+import re
+import sys
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Trigram index over names (applications today, objects later): candidates
+# come from the postings of the query's trigrams, so a lookup touches only
+# names sharing at least one trigram with the query instead of comparing the
+# query with every name.
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of the lowercased alphanumeric tokens of `text`, padded at token boundaries."""
+    grams: Set[str] = set()
+    for token in _TOKEN_RE.findall(text.lower()):
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+class NameIndex:
+    """
+    Mutable trigram index over a set of names. `update` applies the
+    difference with a new list of names, so an inventory refresh only
+    re-indexes the names that were added or removed.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._grams: Dict[str, Tuple[str, ...]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self.update(names)
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._grams
+
+    def add(self, name: str) -> None:
+        if name in self._grams:
+            return
+        # Interned so that each distinct trigram is stored once.
+        grams = tuple(sys.intern(g) for g in trigrams(name))
+        self._grams[name] = grams
+        postings = self._postings
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = {name}
+            else:
+                posting.add(name)
+
+    def remove(self, name: str) -> None:
+        for gram in self._grams.pop(name, ()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(name)
+                if not posting:
+                    del self._postings[gram]
+
+    def update(self, names: Iterable[str]) -> Tuple[int, int]:
+        """Make the index hold exactly `names`; returns (added, removed)."""
+        wanted = dict.fromkeys(names)
+        removed = [n for n in self._grams if n not in wanted]
+        for name in removed:
+            self.remove(name)
+        added = 0
+        for name in wanted:
+            if name not in self._grams:
+                self.add(name)
+                added += 1
+        return added, len(removed)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        cutoff: float = 0.0,
+        containment: bool = False,
+    ) -> List[Tuple[str, float]]:
+        """
+        Best-matching names for `query` with their scores, best first. The
+        score is the Dice coefficient of the trigram sets, or with
+        `containment=True` the share of a name's trigrams found in the query,
+        which suits looking for names mentioned in a longer text. Ties go to
+        the name sharing more trigrams, then the shorter name.
+        """
+        wanted = trigrams(query)
+        if not wanted:
+            return []
+        shared: Counter = Counter()
+        for gram in wanted:
+            posting = self._postings.get(gram)
+            if posting:
+                shared.update(posting)
+
+        scored = []
+        for name, count in shared.items():
+            size = len(self._grams[name])
+            score = count / size if containment else 2 * count / (len(wanted) + size)
+            if score >= cutoff:
+                scored.append((score, count, name))
+        best = heapq.nsmallest(limit, scored, key=lambda s: (-s[0], -s[1], len(s[2]), s[2]))
+        return [(name, round(score, 4)) for score, _, name in best]
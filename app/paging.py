@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import re
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .compaction import estimate_tokens, render_value
+from .config import PAGE_SIZE, PAGE_WINDOW, PAGED_MAX_ITEMS, PAGED_MAX_TOKENS
+from .tools import RECORD_LIST_KEYS, result_records
+
+logger = logging.getLogger("cast-imaging-agent.paging")
+
+# fetch_page(offset, limit) -> one tool result
+PageFetcher = Callable[[int, int], Awaitable[Any]]
+
+_TOTAL_KEYS = ("total", "totalCount", "total_count", "totalItems", "total_items")
+_TOTAL_TEXT = re.compile(r"\bof\s+(\d+)\s+total\b")
+
+def result_total(value: Any) -> Optional[int]:
+    """Total item count a list result reports about itself, if any."""
+    if isinstance(value, dict):
+        for key in _TOTAL_KEYS:
+            total = value.get(key)
+            if isinstance(total, int) and not isinstance(total, bool):
+                return total
+    elif isinstance(value, str):
+        m = _TOTAL_TEXT.search(value)
+        if m:
+            return int(m.group(1))
+    return None
+
+# Envelope fields describing one page, or counts that result_counts reports.
+_PAGE_KEYS = frozenset(_TOTAL_KEYS + (
+    "offset", "limit", "page", "page_size", "pageSize", "page_number", "pageNumber",
+    "hasMore", "has_more", "next", "nextOffset", "next_offset", "cursor", "nextCursor",
+))
+
+def result_envelope(value: Any) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    (list key, other fields) of a dict list result that carries more than its
+    records, e.g. {"granularity": ..., "items": [...]}; page-specific fields
+    and totals are left out. None for bare lists, text and dicts holding only
+    records.
+    """
+    if not isinstance(value, dict):
+        return None
+    for key in RECORD_LIST_KEYS:
+        if isinstance(value.get(key), list):
+            meta = {k: v for k, v in value.items() if k != key and k not in _PAGE_KEYS}
+            return (key, meta) if meta else None
+    return None
+
+_TEXT_RANGE = re.compile(r"\b(\d+)\s*-\s*(\d+)\s+of\s+\d+\s+total\b")
+
+def text_item_count(text: str) -> int:
+    """
+    Items on a text page: the "1-50 of N total" range it reports, or else
+    its non-empty lines. The text itself stays one record.
+    """
+    m = _TEXT_RANGE.search(text)
+    if m:
+        return max(0, int(m.group(2)) - int(m.group(1)) + 1)
+    return sum(1 for line in text.splitlines() if line.strip())
+
+class PageStats:
+    """What a paged retrieval fetched, against what the server says exists."""
+
+    def __init__(self):
+        self.total: Optional[int] = None
+        self.fetched = 0
+        self.pages = 0
+        self.tokens = 0
+        # complete | item_budget | token_budget | unpaged | error
+        self.stopped: Optional[str] = None
+        # (list key, fields) around the records of the first page, if any.
+        self.envelope: Optional[Tuple[str, Dict[str, Any]]] = None
+
+    @property
+    def truncated(self) -> bool:
+        if self.stopped in ("item_budget", "token_budget", "error"):
+            return True
+        return self.total is not None and self.fetched < self.total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "fetched": self.fetched,
+            "pages": self.pages,
+            "truncated": self.truncated,
+            "stopped": self.stopped,
+        }
+
+async def iter_pages(
+    fetch_page: PageFetcher,
+    *,
+    paged: bool = True,
+    page_size: int = PAGE_SIZE,
+    window: int = PAGE_WINDOW,
+    max_items: int = PAGED_MAX_ITEMS,
+    max_tokens: Optional[int] = PAGED_MAX_TOKENS,
+    stats: Optional[PageStats] = None,
+) -> AsyncIterator[List[Any]]:
+    """
+    Yield the records of a list tool page by page, in order. The first page
+    comes alone (it usually carries the total); after that up to `window`
+    pages are in flight while the consumer works on earlier ones. Retrieval
+    stops at the end of the data, after `max_items` records or once
+    `max_tokens` estimated tokens were yielded; pages still in flight are
+    cancelled. A tool without paging parameters (`paged=False`) is called
+    once with `max_items` as its limit.
+
+    A failing first page raises; a failing later page ends the iteration
+    with what was already fetched (`stats.stopped == "error"`).
+    """
+    stats = stats if stats is not None else PageStats()
+    page_size = max(1, page_size)
+    pending: Deque[Tuple[int, "asyncio.Future[Any]"]] = deque()
+    next_offset = 0
+
+    def schedule() -> None:
+        nonlocal next_offset
+        end = max_items if stats.total is None else min(max_items, stats.total)
+        while len(pending) < max(1, window) and next_offset < end:
+            pending.append((next_offset, asyncio.ensure_future(fetch_page(next_offset, page_size))))
+            next_offset += page_size
+
+    try:
+        if paged:
+            pending.append((0, asyncio.ensure_future(fetch_page(0, page_size))))
+            next_offset = page_size
+        else:
+            pending.append((0, asyncio.ensure_future(fetch_page(0, max_items))))
+
+        while pending:
+            offset, future = pending.popleft()
+            try:
+                value = await future
+            except Exception as e:
+                if stats.pages == 0:
+                    raise
+                logger.warning("Page at offset %d failed, keeping %d records: %s", offset, stats.fetched, e)
+                stats.stopped = "error"
+                return
+
+            records = result_records(value)
+            if stats.total is None:
+                stats.total = result_total(value)
+            if stats.pages == 0:
+                stats.envelope = result_envelope(value)
+            stats.pages += 1
+            # A text page is a single record standing for all the items it lists.
+            count = text_item_count(value) if isinstance(value, str) else len(records)
+            weight = count if isinstance(value, str) else 1
+
+            page: List[Any] = []
+            for record in records:
+                if stats.fetched >= max_items:
+                    stats.stopped = "item_budget"
+                    break
+                if max_tokens is not None:
+                    cost = estimate_tokens(render_value(record))
+                    if stats.tokens + cost > max_tokens and stats.fetched:
+                        stats.stopped = "token_budget"
+                        break
+                    stats.tokens += cost
+                page.append(record)
+                stats.fetched += weight
+            if not stats.stopped:
+                if not paged:
+                    stats.stopped = "unpaged"
+                elif count < page_size or (stats.total is not None and offset + page_size >= stats.total):
+                    stats.stopped = "complete"
+                elif stats.fetched >= max_items:
+                    stats.stopped = "item_budget"
+                else:
+                    # Keep the window full while the consumer works on this page.
+                    schedule()
+            if page:
+                yield page
+            if stats.stopped:
+                return
+        stats.stopped = stats.stopped or "complete"
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if pending:
+            await asyncio.gather(*(f for _, f in pending), return_exceptions=True)
+
+async def fetch_paged(
+    call: Callable[[Dict[str, Any]], Awaitable[Any]],
+    catalog,
+    tool: str,
+    stats: Optional[PageStats] = None,
+    *,
+    max_items: int = PAGED_MAX_ITEMS,
+    max_tokens: Optional[int] = PAGED_MAX_TOKENS,
+    keep_envelope: bool = False,
+    **values: Any,
+) -> Any:
+    """
+    Every record of list tool `tool`, paged the way its schema allows and
+    bounded by `max_items` / `max_tokens` (the PAGED_* settings by default).
+    `call(args)` performs one tool call; `values` are the service-level
+    arguments besides limit and offset. With `keep_envelope`, a result whose
+    first page wraps its records with other fields (see `result_envelope`)
+    comes back in that shape, holding the records of every page.
+    """
+    stats = stats if stats is not None else PageStats()
+    style = catalog.paging(tool)
+
+    def fetch_page(offset: int, limit: int) -> Awaitable[Any]:
+        extra: Dict[str, Any] = {}
+        if style == "offset":
+            extra["offset"] = offset
+        elif style == "page":
+            extra["page"] = offset // limit + 1
+        return call(catalog.args(tool, limit=limit, **extra, **values))
+
+    items: List[Any] = []
+    async for page in iter_pages(fetch_page, paged=style is not None, max_items=max_items, max_tokens=max_tokens, stats=stats):
+        items.extend(page)
+    if keep_envelope and stats.envelope is not None:
+        key, meta = stats.envelope
+        return {**meta, key: items}
+    return items
+
+def paging_note(payload: Dict[str, Any]) -> str:
+    """Prompt line listing sections that hold fewer records than the server has."""
+    partial = []
+    for name, counts in (payload.get("result_counts") or {}).items():
+        if not counts.get("truncated"):
+            continue
+        total = counts.get("total")
+        of = f" of {total}" if total is not None else ""
+        partial.append(f"{name} ({counts.get('fetched')}{of} fetched)")
+    if not partial:
+        return ""
+    return "Note: partial result sets: " + ", ".join(partial) + ".\n"
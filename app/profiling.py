@@ -0,0 +1,110 @@
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Per-request phase profile. A request opts in with `profiled()`; everything it
+# awaits, including tasks it spawns, records spans into the same tree through
+# a context variable. Outside a profiled request `span` and `record_span` are a
+# single context-variable read.
+
+class Span:
+    __slots__ = ("name", "start", "end", "attrs", "children")
+
+    def __init__(self, name: str, start: float, end: Optional[float] = None, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.attrs = attrs or {}
+        self.children: List["Span"] = []
+
+    @property
+    def duration(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return end - self.start
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2),
+        }
+        if self.attrs:
+            out["attrs"] = self.attrs
+        if self.children:
+            out["children"] = [c.to_dict(origin) for c in sorted(self.children, key=lambda c: c.start)]
+        return out
+
+    def walk(self) -> Iterator["Span"]:
+        for child in self.children:
+            yield child
+            yield from child.walk()
+
+_current: ContextVar[Optional[Span]] = ContextVar("profile_span", default=None)
+
+_TOKEN_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]")
+
+class Profile:
+    def __init__(self, name: str = "request"):
+        self.root = Span(name, time.perf_counter())
+
+    def finish(self) -> None:
+        if self.root.end is None:
+            self.root.end = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.root.to_dict(self.root.start)
+
+    def phases(self) -> List[Tuple[str, float, int]]:
+        """(name, total ms, count) per span name, in order of first appearance."""
+        totals: Dict[str, List[float]] = {}
+        for span in sorted(self.root.walk(), key=lambda s: s.start):
+            entry = totals.setdefault(span.name, [0.0, 0])
+            entry[0] += span.duration * 1000
+            entry[1] += 1
+        return [(name, ms, int(n)) for name, (ms, n) in totals.items()]
+
+    def server_timing(self) -> str:
+        """`Server-Timing` header value: one metric per phase, plus the total."""
+        parts = []
+        for name, ms, count in self.phases():
+            entry = f"{_TOKEN_UNSAFE.sub('_', name)};dur={ms:.1f}"
+            if count > 1:
+                entry += f';desc="x{count}"'
+            parts.append(entry)
+        parts.append(f"total;dur={self.root.duration * 1000:.1f}")
+        return ", ".join(parts)
+
+@contextmanager
+def profiled(name: str = "request") -> Iterator[Profile]:
+    """Collect spans for the enclosed work (and the tasks it starts)."""
+    profile = Profile(name)
+    token = _current.set(profile.root)
+    try:
+        yield profile
+    finally:
+        profile.finish()
+        _current.reset(token)
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    parent = _current.get()
+    if parent is None:
+        yield
+        return
+    child = Span(name, time.perf_counter(), attrs=attrs)
+    parent.children.append(child)
+    token = _current.set(child)
+    try:
+        yield
+    finally:
+        child.end = time.perf_counter()
+        _current.reset(token)
+
+def record_span(name: str, started: float, ended: Optional[float] = None, **attrs: Any) -> None:
+    """Attach an already-timed phase (perf_counter bounds) to the current span."""
+    parent = _current.get()
+    if parent is None:
+        return
+    parent.children.append(Span(name, started, ended if ended is not None else time.perf_counter(), attrs))
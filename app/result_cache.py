@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Iterable, Optional, Set
+
+from .cache import LRUCache, SQLiteCache, TieredCache
+from .config import (
+    MCP_RESULT_CACHE_MAX_ENTRIES,
+    MCP_RESULT_CACHE_TTL,
+    MCP_RESULT_CACHE_TTLS,
+    MCP_RESULT_CACHE_DB,
+    parse_ttl_overrides,
+)
+from .inventory import delivery_timestamp, normalize_app_id
+from .mcp_client import call_tool, imaging_endpoint_key
+from .tools import application_inventory
+
+logger = logging.getLogger("cast-imaging-agent.result_cache")
+
+# Tools whose results depend only on the analyzed delivery of an application.
+CACHEABLE_TOOLS = frozenset({
+    "stats",
+    "architectural_graph",
+    "quality_insights",
+    "packages",
+    "applications_transactions",
+    "applications_data_graphs",
+})
+
+def _app_tag(endpoint: str, app_id: Any) -> str:
+    return f"{endpoint}|{app_id}"
+
+class ToolResultCache:
+    """
+    Results of delivery-scoped MCP tools, keyed by (endpoint, base tool,
+    normalized args, application delivery). A new delivery changes the key, and
+    inventory change notifications drop the application's entries eagerly.
+    """
+
+    def __init__(
+        self,
+        store: TieredCache,
+        default_ttl: float = 900.0,
+        ttls: Optional[Dict[str, float]] = None,
+        tools: Iterable[str] = CACHEABLE_TOOLS,
+    ):
+        self.store = store
+        self.default_ttl = default_ttl
+        self.ttls = dict(ttls or {})
+        self.tools = frozenset(tools)
+
+    def ttl_for(self, base: str) -> float:
+        return self.ttls.get(base, self.default_ttl)
+
+    @staticmethod
+    def make_key(endpoint: str, base: str, args: Dict[str, Any], delivery: Optional[str]) -> str:
+        normalized = {k: v for k, v in args.items() if v is not None}
+        raw = json.dumps([endpoint, base, normalized, delivery], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def call(
+        self,
+        session,
+        tool_name: str,
+        args: Dict[str, Any],
+        *,
+        base: str,
+        app: Dict[str, Any],
+        refresh: bool = False,
+    ) -> Any:
+        """`call_tool`, answered from the cache when `base` is cacheable."""
+        if base not in self.tools or self.ttl_for(base) <= 0:
+            return await call_tool(session, tool_name, args)
+
+        endpoint = imaging_endpoint_key()
+        key = self.make_key(endpoint, base, args, delivery_timestamp(app))
+        if not refresh:
+            cached = await self.store.get(key)
+            if cached is not None:
+                return cached
+
+        result = await call_tool(session, tool_name, args)
+        if result is not None:
+            await self.store.set(key, result, self.ttl_for(base), _app_tag(endpoint, normalize_app_id(app)))
+        return result
+
+    async def invalidate_applications(self, endpoint: str, app_ids: Set[Any]) -> None:
+        removed = 0
+        for app_id in app_ids:
+            removed += await self.store.delete_tag(_app_tag(endpoint, app_id))
+        if removed:
+            logger.info("Dropped %d cached tool result(s) for re-delivered applications", removed)
+
+    async def clear(self) -> None:
+        await self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.store.stats(), "default_ttl_s": self.default_ttl, "ttls": self.ttls}
+
+def create_tool_result_cache() -> ToolResultCache:
+    disk = None
+    if MCP_RESULT_CACHE_DB:
+        try:
+            disk = SQLiteCache(MCP_RESULT_CACHE_DB, table="tool_results")
+        except Exception as e:
+            logger.warning("Tool result disk cache disabled (%s): %s", MCP_RESULT_CACHE_DB, e)
+    return ToolResultCache(
+        TieredCache(LRUCache(MCP_RESULT_CACHE_MAX_ENTRIES), disk),
+        default_ttl=MCP_RESULT_CACHE_TTL,
+        ttls=parse_ttl_overrides(MCP_RESULT_CACHE_TTLS),
+    )
+
+tool_result_cache = create_tool_result_cache()
+application_inventory.add_listener(tool_result_cache.invalidate_applications)
+
+async def cached_call_tool(session, tool_name: str, args: Dict[str, Any], *, base: str, app: Dict[str, Any]) -> Any:
+    return await tool_result_cache.call(session, tool_name, args, base=base, app=app)
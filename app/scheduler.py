@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+
+from .config import TOOL_CALL_TIMEOUT
+
+logger = logging.getLogger("cast-imaging-agent.scheduler")
+
+class ToolCall:
+    """
+    One node of a tool-call plan.
+
+    `run` receives the results of the steps listed in `depends_on` and returns
+    the step's result; `run=None` marks a tool the server does not expose (the
+    step resolves to None). A failing optional step resolves to None and skips
+    its dependents; a failing required step aborts the whole plan.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]],
+        depends_on: Sequence[str] = (),
+        required: bool = False,
+        timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        self.required = required
+        self.timeout = timeout
+
+class PlanError(RuntimeError):
+    """A required step of a plan failed."""
+
+    def __init__(self, step: str, cause: BaseException):
+        super().__init__(f"{step}: {cause}")
+        self.step = step
+        self.cause = cause
+
+class PlanResult:
+    """Outcome of a plan: per-step results, errors, skipped steps and timings (ms)."""
+
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+        self.skipped: List[str] = []
+        self.timings: Dict[str, float] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        return self.results.get(name)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.results.get(name, default)
+
+def _ordered(steps: Iterable[ToolCall]) -> List[ToolCall]:
+    """Topological order of `steps`; rejects duplicates, unknown dependencies and cycles."""
+    by_name: Dict[str, ToolCall] = {}
+    for step in steps:
+        if step.name in by_name:
+            raise ValueError(f"Duplicate step '{step.name}' in plan.")
+        by_name[step.name] = step
+
+    ordered: List[ToolCall] = []
+    state: Dict[str, str] = {}
+
+    def visit(name: str, path: List[str]) -> None:
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Cycle in plan: {' -> '.join(path + [name])}")
+        if name not in by_name:
+            raise ValueError(f"Step '{path[-1]}' depends on unknown step '{name}'.")
+        state[name] = "visiting"
+        for dep in by_name[name].depends_on:
+            visit(dep, path + [name])
+        state[name] = "done"
+        ordered.append(by_name[name])
+
+    for name in by_name:
+        visit(name, [])
+    return ordered
+
+async def run_plan(steps: Iterable[ToolCall], timeout: float = TOOL_CALL_TIMEOUT) -> PlanResult:
+    """
+    Run every step as soon as its dependencies have succeeded, so independent
+    calls overlap and the plan takes as long as its longest dependency chain.
+    Each step gets `timeout` seconds unless it sets its own.
+    """
+    plan = _ordered(steps)
+    outcome = PlanResult()
+    tasks: Dict[str, "asyncio.Task[None]"] = {}
+    started = time.perf_counter()
+
+    async def execute(step: ToolCall) -> None:
+        if step.depends_on:
+            await asyncio.wait([tasks[d] for d in step.depends_on])
+        blocked = [d for d in step.depends_on if d not in outcome.results or d in outcome.skipped]
+        if blocked or step.run is None:
+            outcome.results[step.name] = None
+            outcome.skipped.append(step.name)
+            if blocked:
+                logger.info("Step '%s' skipped: dependency %s unavailable", step.name, ", ".join(blocked))
+            if step.required:
+                reason = f"dependency {', '.join(blocked)} unavailable" if blocked else "tool not available"
+                raise PlanError(step.name, RuntimeError(reason))
+            return
+
+        t0 = time.perf_counter()
+        try:
+            deps = {d: outcome.results[d] for d in step.depends_on}
+            limit = step.timeout if step.timeout is not None else timeout
+            outcome.results[step.name] = await asyncio.wait_for(step.run(deps), timeout=limit)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError):
+                e = TimeoutError(f"timed out after {limit:g}s")
+            outcome.errors[step.name] = str(e) or type(e).__name__
+            if step.required:
+                raise PlanError(step.name, e) from e
+            logger.warning("Optional step '%s' failed: %s", step.name, e)
+        finally:
+            outcome.timings[step.name] = round((time.perf_counter() - t0) * 1000, 1)
+
+    for step in plan:
+        tasks[step.name] = asyncio.ensure_future(execute(step))
+
+    try:
+        pending = set(tasks.values())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is not None:
+                    raise error
+    finally:
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    outcome.timings["_total"] = round((time.perf_counter() - started) * 1000, 1)
+    return outcome
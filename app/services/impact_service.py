@@ -1,72 +1,314 @@
 import asyncio
-from typing import Any, Dict, Optional
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
 
-from ..mcp_client import imaging_session, list_tools, call_tool
-from ..tools import find_tool, select_application, normalize_app_id, match_tool_name
+from ..call_graph import call_graph_store, traverse_callers
+from ..config import (
+    IMPACT_BATCH_CONCURRENCY,
+    TRAVERSAL_CONCURRENCY,
+    TRAVERSAL_FAN_OUT,
+    TRAVERSAL_MAX_CALLERS,
+    TRAVERSAL_MAX_NODES,
+    TRAVERSAL_TIMEOUT,
+)
+from ..inventory import delivery_timestamp
+from ..mcp_client import imaging_session, imaging_endpoint_key, call_tool
+from ..paging import PageStats, fetch_paged
+from ..profiling import span
+from ..scheduler import PlanError, ToolCall, run_plan
+from ..symbol_index import application_symbols
+from ..tool_args import first_success, object_hint_keys, shape_memory
+from ..tool_catalog import ToolCatalog, get_tool_catalog
+from ..tools import select_application, normalize_app_id, result_records
 
-async def _resolve_object_details(session, tool_names, app_id: Any, object_hint: str) -> Dict[str, Any]:
-    od_tool = match_tool_name(tool_names, "object_details")
+logger = logging.getLogger("cast-imaging-agent.impact")
+
+async def _resolve_object_details(session, catalog: ToolCatalog, app_id: Any, object_hint: str) -> Dict[str, Any]:
+    """
+    Look the object up with the argument shape its schema declares, or the one
+    that last worked on this server: one round trip in the common case. The
+    other shapes are only probed, concurrently, when that misses.
+    """
+    od_tool = catalog.resolve("object_details")
     if not od_tool:
         raise RuntimeError("Imaging MCP: 'object_details' tool not found.")
 
-    candidates = [
-        {"app_id": app_id, "object_id": object_hint},
-        {"app_id": app_id, "name": object_hint},
-        {"app_id": app_id, "query": object_hint},
-        {"app_id": app_id, "object": object_hint},
-    ]
+    endpoint = imaging_endpoint_key()
+    base_args = catalog.args(od_tool, app_id=app_id)
+    keys = object_hint_keys(catalog.schema(od_tool))
+    remembered = shape_memory.get(endpoint, od_tool)
+    if remembered in keys:
+        keys.remove(remembered)
+        keys.insert(0, remembered)
+
+    def attempt(key: str):
+        return key, lambda: call_tool(session, od_tool, {**base_args, key: object_hint})
+
     last_err: Optional[Exception] = None
-    for args in candidates:
+    if remembered or catalog.schema(od_tool):
+        key, res, last_err = await first_success([attempt(keys[0])])
+        if res:
+            shape_memory.remember(endpoint, od_tool, key)
+            return res
+        keys = keys[1:]
+
+    if keys:
+        key, res, err = await first_success([attempt(k) for k in keys])
+        if res:
+            shape_memory.remember(endpoint, od_tool, key)
+            return res
+        last_err = err or last_err
+    raise RuntimeError(f"Unable to resolve object '{object_hint}' via object_details. Last error: {last_err}")
+
+async def _object_details_by_id(session, catalog: ToolCatalog, app_id: Any, obj: Dict[str, str]) -> Any:
+    """object_details for an object known from the symbol index: one call, by id when the tool takes one."""
+    od_tool = catalog.resolve("object_details")
+    if not od_tool:
+        raise RuntimeError("Imaging MCP: 'object_details' tool not found.")
+    keys = object_hint_keys(catalog.schema(od_tool))
+    key = next((k for k in keys if k in ("object_id", "objectId")), None)
+    if key:
+        return await call_tool(session, od_tool, {**catalog.args(od_tool, app_id=app_id), key: obj["id"]})
+    return await _resolve_object_details(session, catalog, app_id, obj["fullName"] or obj["name"])
+
+def _did_you_mean(match: Dict[str, Any]) -> str:
+    names = [c["fullName"] or c["name"] for c in match["candidates"]]
+    return f" Did you mean: {', '.join(names)}?" if names else ""
+
+async def _resolve_object(session, catalog: ToolCatalog, app: Dict[str, Any], object_hint: str) -> Dict[str, Any]:
+    """
+    Resolve an object hint against the application's local symbol index when
+    it is built: a hit costs one object_details call on a known id. A miss on
+    a complete index fails right away with "did you mean" candidates; without
+    an index (or on a truncated one) the hint is resolved remotely.
+    """
+    app_id = normalize_app_id(app)
+    index = application_symbols(app)
+    if index is None:
+        return await _resolve_object_details(session, catalog, app_id, object_hint)
+
+    match = index.lookup(object_hint)
+    logger.info("Object hint '%s' resolved locally: %s", object_hint, match["match"])
+    if match["object"] is not None:
         try:
-            res = await call_tool(session, od_tool, args)
-            if res:
-                return res
+            details = await _object_details_by_id(session, catalog, app_id, match["object"])
+            if details:
+                return details
         except Exception as e:
-            last_err = e
-    raise RuntimeError(f"Unable to resolve object '{object_hint}' via object_details. Last error: {last_err}")
+            logger.warning("object_details failed for indexed object %s: %s", match["object"]["id"], e)
+    elif not index.truncated:
+        raise RuntimeError(f"Unable to resolve object '{object_hint}' in application '{app_id}'.{_did_you_mean(match)}")
 
-async def fetch_impact_analysis(question: str, object_hint: str, app_hint: Optional[str] = None) -> Dict[str, Any]:
-    async with imaging_session() as session:
-        tool_names = await list_tools(session)
-        selected, _ = await select_application(session, tool_names, question, app_hint)
-        app_id = normalize_app_id(selected)
+    try:
+        return await _resolve_object_details(session, catalog, app_id, object_hint)
+    except RuntimeError as e:
+        raise RuntimeError(f"{e}{_did_you_mean(match)}") from e
+
+def _object_id(obj_details: Any, object_hint: str) -> Any:
+    if not isinstance(obj_details, dict):
+        return object_hint
+    return (
+        obj_details.get("id")
+        or obj_details.get("objectId")
+        or obj_details.get("object_id")
+        or object_hint
+    )
+
+async def _select(session, question: str, app_hint: Optional[str]) -> Tuple[ToolCatalog, Dict[str, Any], Any]:
+    catalog = await get_tool_catalog(session)
+    selected, _ = await select_application(
+        session, catalog.names, question, app_hint,
+        applications_tool=catalog.resolve("applications"),
+    )
+    return catalog, selected, normalize_app_id(selected)
 
-        obj_details = await _resolve_object_details(session, tool_names, app_id, object_hint)
+def _transitive_impact(session, catalog: ToolCatalog, app: Dict[str, Any], object_hint: str, depth: int) -> ToolCall:
+    """Plan step expanding the callers of the resolved object `depth` levels out, through the call-graph cache."""
+    callers_tool = catalog.resolve("object_callers") if depth > 1 else None
+    if not callers_tool:
+        if depth > 1:
+            logger.info("Tool 'object_callers' not found; impact stays one hop out.")
+        return ToolCall("transitive_impact", None, depends_on=["object_details"])
 
-        txu_tool = find_tool(tool_names, "transactions_using_object")
-        dgio_tool = find_tool(tool_names, "data_graphs_involving_object") or find_tool(tool_names, "datagraphs_involving_object")
-        iad_tool = find_tool(tool_names, "inter_applications_dependencies")
+    app_id = normalize_app_id(app)
+    graph = call_graph_store.graph(imaging_endpoint_key(), app_id, delivery_timestamp(app))
 
-        oid = (
-            obj_details.get("id")
-            or obj_details.get("objectId")
-            or obj_details.get("object_id")
-            or object_hint
+    async def fetch_callers(object_id: str):
+        stats = PageStats()
+        records = await fetch_paged(
+            lambda args: call_tool(session, callers_tool, args),
+            catalog, callers_tool, stats,
+            max_items=TRAVERSAL_MAX_CALLERS, max_tokens=None,
+            app_id=app_id, object_id=object_id,
         )
+        return records, stats.truncated
 
-        calls = []
-        if txu_tool:
-            calls.append(call_tool(session, txu_tool, {"app_id": app_id, "object_id": oid, "limit": 50}))
-        else:
-            calls.append(asyncio.sleep(0, result=None))
-        if dgio_tool:
-            calls.append(call_tool(session, dgio_tool, {"app_id": app_id, "object_id": oid, "limit": 50}))
-        else:
-            calls.append(asyncio.sleep(0, result=None))
-        if iad_tool:
-            calls.append(call_tool(session, iad_tool, {"app_id": app_id, "object_id": oid, "limit": 50}))
-        else:
-            calls.append(asyncio.sleep(0, result=None))
-
-        txu, dgio, iad = await asyncio.gather(*calls)
+    async def run(deps: Dict[str, Any]) -> Dict[str, Any]:
+        details = deps["object_details"]
+        root = details if isinstance(details, dict) and _object_id(details, "") else {"id": object_hint}
+        with span("traversal"):
+            return await traverse_callers(
+                graph, root, fetch_callers,
+                depth=depth, fan_out=TRAVERSAL_FAN_OUT, max_nodes=TRAVERSAL_MAX_NODES,
+                concurrency=TRAVERSAL_CONCURRENCY,
+            )
+
+    return ToolCall("transitive_impact", run, depends_on=["object_details"], timeout=TRAVERSAL_TIMEOUT)
+
+async def _analyze_object(
+    session, catalog: ToolCatalog, app: Dict[str, Any], object_hint: str, depth: int = 1,
+) -> Dict[str, Any]:
+    """
+    Resolve one object, then fetch its transactions, data graphs and
+    cross-app dependencies, each paged up to the configured budget. With
+    `depth` > 1 its callers are also expanded that many levels out.
+    """
+    app_id = normalize_app_id(app)
+    counts: Dict[str, PageStats] = {}
+
+    def about_object(name: str, tool: Optional[str]) -> ToolCall:
+        if not tool:
+            return ToolCall(name, None, depends_on=["object_details"])
+        counts[name] = PageStats()
+        return ToolCall(
+            name,
+            lambda deps: fetch_paged(
+                lambda args: call_tool(session, tool, args),
+                catalog, tool, counts[name], keep_envelope=True,
+                app_id=app_id,
+                object_id=_object_id(deps["object_details"], object_hint),
+            ),
+            depends_on=["object_details"],
+        )
+
+    async def resolve(_) -> Dict[str, Any]:
+        with span("object_resolve"):
+            return await _resolve_object(session, catalog, app, object_hint)
+
+    try:
+        plan = await run_plan([
+            ToolCall("object_details", resolve, required=True),
+            about_object("transactions_using_object", catalog.find("transactions_using_object")),
+            about_object(
+                "data_graphs_involving_object",
+                catalog.find("data_graphs_involving_object") or catalog.find("datagraphs_involving_object"),
+            ),
+            about_object("inter_applications_dependencies", catalog.find("inter_applications_dependencies")),
+            _transitive_impact(session, catalog, app, object_hint, depth),
+        ])
+    except PlanError as e:
+        raise e.cause from e
+
+    return {
+        "object_hint": object_hint,
+        "object_details": plan["object_details"],
+        "transactions_using_object": plan["transactions_using_object"],
+        "data_graphs_involving_object": plan["data_graphs_involving_object"],
+        "inter_applications_dependencies": plan["inter_applications_dependencies"],
+        "transitive_impact": plan["transitive_impact"],
+        "result_counts": {name: stats.to_dict() for name, stats in counts.items() if plan.get(name) is not None},
+        "tool_errors": plan.errors,
+    }
+
+async def fetch_impact_analysis(
+    question: str, object_hint: str, app_hint: Optional[str] = None, depth: int = 1,
+) -> Dict[str, Any]:
+    async with imaging_session() as session:
+        catalog, selected, _ = await _select(session, question, app_hint)
+        analysis = await _analyze_object(session, catalog, selected, object_hint, depth)
 
     return {
         "question": question,
         "selected_application": selected,
-        "object_hint": object_hint,
-        "object_details": obj_details,
-        "transactions_using_object": txu,
-        "data_graphs_involving_object": dgio,
-        "inter_applications_dependencies": iad,
-        "tool_names": tool_names,
+        **analysis,
+        "tool_names": catalog.names,
+    }
+
+def _record_key(record: Any) -> str:
+    if isinstance(record, dict):
+        for key in ("id", "transaction", "name", "entity"):
+            if record.get(key) is not None:
+                return f"{key}:{record[key]}"
+    return json.dumps(record, sort_keys=True, default=str)
+
+def _record_count(analysis: Dict[str, Any], field: str) -> int:
+    """Server-reported total for a paged field, else the number of records fetched."""
+    total = (analysis.get("result_counts") or {}).get(field, {}).get("total")
+    return total if total is not None else len(result_records(analysis.get(field)))
+
+def _merge_shared(analyses: List[Dict[str, Any]], field: str) -> List[Dict[str, Any]]:
+    """Union one per-object field across objects, noting which objects hit each record."""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for analysis in analyses:
+        for record in result_records(analysis.get(field)):
+            entry = merged.setdefault(_record_key(record), {"record": record, "objects": []})
+            if analysis["object_hint"] not in entry["objects"]:
+                entry["objects"].append(analysis["object_hint"])
+    return sorted(merged.values(), key=lambda e: -len(e["objects"]))
+
+async def fetch_impact_batch(
+    question: str,
+    object_hints: List[str],
+    app_hint: Optional[str] = None,
+    concurrency: int = IMPACT_BATCH_CONCURRENCY,
+) -> Dict[str, Any]:
+    """
+    Impact analysis for a change set: the application is selected once, then
+    every object is analyzed on the same session, at most `concurrency` at a
+    time. Shared transactions, data graphs and dependencies are deduplicated.
+    """
+    hints = list(dict.fromkeys(h.strip() for h in object_hints if h and h.strip()))
+    if not hints:
+        raise ValueError("No object hints provided.")
+
+    async with imaging_session() as session:
+        catalog, selected, _ = await _select(session, question, app_hint)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def analyze(hint: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await _analyze_object(session, catalog, selected, hint)
+                except Exception as e:
+                    logger.warning("Impact analysis failed for object '%s': %s", hint, e)
+                    return {"object_hint": hint, "error": str(e)}
+
+        results = await asyncio.gather(*(analyze(h) for h in hints))
+
+    analyses = [r for r in results if "error" not in r]
+    return {
+        "question": question,
+        "selected_application": selected,
+        "objects": analyses,
+        "object_summaries": [
+            {
+                "object": a["object_hint"],
+                "details": a["object_details"],
+                "transactions": _record_count(a, "transactions_using_object"),
+                "data_graphs": _record_count(a, "data_graphs_involving_object"),
+                "cross_app_dependencies": _record_count(a, "inter_applications_dependencies"),
+            }
+            for a in analyses
+        ],
+        "failed_objects": [r for r in results if "error" in r],
+        "transactions": _merge_shared(analyses, "transactions_using_object"),
+        "data_graphs": _merge_shared(analyses, "data_graphs_involving_object"),
+        "inter_applications_dependencies": _merge_shared(analyses, "inter_applications_dependencies"),
+        "tool_names": catalog.names,
+    }
+
+async def complete_object_names(prefix: str, app_hint: Optional[str] = None, limit: int = 10) -> Dict[str, Any]:
+    """
+    Autocomplete object names from the application's local symbol index,
+    without querying the Imaging server for objects. `ready` is False (and
+    `objects` empty) while the index is still being built.
+    """
+    async with imaging_session() as session:
+        _, selected, _ = await _select(session, "", app_hint)
+    index = application_symbols(selected)
+    return {
+        "application": selected,
+        "ready": index is not None,
+        "objects": index.complete(prefix, limit) if index is not None else [],
     }
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+logger = logging.getLogger("cast-imaging-agent.singleflight")
+
+T = TypeVar("T")
+
+class _Call:
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing a key into one in-flight computation.
+
+    Every waiter gets the same result or the same exception. A waiter that is
+    cancelled leaves the computation running for the others; once the last
+    waiter is gone the computation itself is cancelled. Nothing is cached:
+    the key is released as soon as the computation finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, c=call: self._forget(key, c))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            logger.info("%s: joined in-flight computation (%d waiting)", self.name, call.waiters + 1)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                logger.info("%s: every waiter left, cancelling computation", self.name)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Retrieve the outcome so an unobserved failure is not logged as "never retrieved".
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+def normalize_text(value: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of free text, for coalescing keys."""
+    return " ".join((value or "").lower().split())
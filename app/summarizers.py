@@ -1,9 +1,44 @@
-import json
-from typing import Any, Dict, List
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
 import anthropic
 
-from .config import get_anthropic_api_key, get_anthropic_model
+from .config import (
+    get_anthropic_api_key,
+    get_anthropic_model,
+    MAP_CHUNK_TOKENS,
+    MAP_CONCURRENCY,
+    MAP_OUTPUT_TOKENS,
+    MAP_MAX_LEVELS,
+    PROMPT_SECTION_TOKEN_BUDGET,
+    PROMPT_CACHING_ENABLED,
+)
+from .llm_client import get_anthropic_client
+from .compaction import compaction_note, estimate_tokens, render_value
+from .graph_analytics import is_graph_analysis
+from .mapreduce import MAP_REDUCE_SECTIONS, combine_partials, record_count, split_section
+from .paging import paging_note
+from .metrics import (
+    PROMPT_BYTES,
+    PROMPT_TOKENS,
+    LLM_REQUEST_SECONDS,
+    LLM_TIME_TO_FIRST_TOKEN_SECONDS,
+    LLM_TOKENS,
+    record_error,
+)
+from .profiling import record_span, span
+from .singleflight import SingleFlight
+from .summary_cache import request_fingerprint, summary_cache
+
+logger = logging.getLogger("cast-imaging-agent.summarizers")
+
+# Identical prompts generated concurrently share one Anthropic call.
+llm_flight = SingleFlight("llm")
+
+# Map calls of every request share this bound (see map_sections_async).
+map_semaphore = asyncio.Semaphore(max(1, MAP_CONCURRENCY))
 
 def _join_text_blocks(resp) -> str:
     parts: List[str] = []
@@ -12,45 +47,49 @@ def _join_text_blocks(resp) -> str:
             parts.append(block.text)
     return "\n".join(parts) if parts else "(No content returned from LLM)"
 
-def summarize_with_anthropic(payload: Dict[str, Any]) -> str:
-    # Get API key dynamically
-    api_key = get_anthropic_api_key()
-    
-    # Debug: Check if API key is loaded
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY is not set or empty")
-    
-    # Debug: Log API key status (first few chars only for security)
-    import logging
-    import os
-    logger = logging.getLogger("cast-imaging-agent.summarizers")
-    logger.debug(f"ANTHROPIC_API_KEY loaded: {api_key[:10]}..." if api_key else "ANTHROPIC_API_KEY is empty")
-    
-    # Ensure no conflicting environment variables are set for Anthropic
-    # Temporarily clear any auth-related env vars that might confuse the client
-    original_env = {}
-    conflicting_vars = ['X_API_KEY', 'AUTHORIZATION', 'AUTH_TOKEN']
-    for var in conflicting_vars:
-        if var in os.environ:
-            original_env[var] = os.environ[var]
-            del os.environ[var]
-    
-    try:
-        # Initialize client with explicit parameters
-        client = anthropic.Anthropic(
-            api_key=api_key,
-            # Explicitly set other auth methods to None to avoid conflicts
-            auth_token=None
-        )
-    finally:
-        # Restore original environment variables
-        for var, value in original_env.items():
-            os.environ[var] = value
+def _cache_breakpoint() -> Dict[str, Any]:
+    return {"cache_control": {"type": "ephemeral"}} if PROMPT_CACHING_ENABLED else {}
+
+def _request(system_msg: str, instructions: str, context: str, question: Optional[str], max_tokens: int) -> Dict[str, Any]:
+    """
+    `messages.create` arguments laid out as a cacheable prefix: the system
+    message with the report instructions (the same for every call of a kind),
+    then the application data, then the question. Cache breakpoints close the
+    first two blocks, so a follow-up question on the same data only sends the
+    question uncached.
+    """
+    content: List[Dict[str, Any]] = [{"type": "text", "text": context, **_cache_breakpoint()}]
+    if question is not None:
+        content.append({"type": "text", "text": f"Question:\n{question}"})
+    return {
+        "model": get_anthropic_model(),
+        "max_tokens": max_tokens,
+        "temperature": 0.2,
+        "system": [{"type": "text", "text": f"{system_msg}\n\n{instructions}", **_cache_breakpoint()}],
+        "messages": [{"role": "user", "content": content}],
+    }
+
+def _block_text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return "\n".join(b.get("text", "") for b in content or [] if isinstance(b, dict))
+
+def _prompt_text(request: Dict[str, Any]) -> str:
+    """Plain text of a request's system prompt and messages."""
+    return "\n".join([_block_text(request.get("system"))] + [_block_text(m["content"]) for m in request.get("messages", [])])
+
+def _summary_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the `messages.create` arguments for an application summary."""
     system_msg = (
         "You are CAST Imaging Technical Copilot. "
         "Produce an accurate, concise technical summary for the selected application, "
         "grounded ONLY in the provided MCP data. If something is missing, say it's unavailable."
     )
+    instructions = """Instructions:
+1) Start with a 2–3 sentence Overview.
+2) Sections with bullets: Technologies, Architecture, Data Flows, Dependencies, Key Risks/Hotspots, Next Steps.
+3) Reference concrete components where available; be explicit when info is not available.
+"""
 
     app_meta = payload.get("selected_application", {})
     stats = payload.get("stats")
@@ -60,114 +99,320 @@ def summarize_with_anthropic(payload: Dict[str, Any]) -> str:
     tx = payload.get("transactions")
     dg = payload.get("data_graphs")
 
-    user_prompt = f"""
-Question:
-{payload.get("question")}
-
+    context = f"""
 Application (selected):
-{json.dumps(app_meta, indent=2)}
+{render_value(app_meta)}
 
 Key Data:
-- Stats: {json.dumps(stats, indent=2) if stats is not None else "N/A"}
-- Architectural Graph: {json.dumps(arch, indent=2) if arch is not None else "N/A"}
-- Quality Insights: {json.dumps(qinsights, indent=2) if qinsights is not None else "N/A"}
-- Packages / Technologies: {json.dumps(packages, indent=2) if packages is not None else "N/A"}
-- Transactions: {json.dumps(tx, indent=2) if tx is not None else "N/A"}
-- Data Graphs: {json.dumps(dg, indent=2) if dg is not None else "N/A"}
-
-Instructions:
-1) Start with a 2–3 sentence Overview.
-2) Sections with bullets: Technologies, Architecture, Data Flows, Dependencies, Key Risks/Hotspots, Next Steps.
-3) Reference concrete components where available; be explicit when info is not available.
-"""
-    resp = client.messages.create(
-        model=get_anthropic_model(),
-        max_tokens=1200,
-        temperature=0.2,
-        system=system_msg,
-        messages=[{"role": "user", "content": user_prompt}],
-    )
-    return _join_text_blocks(resp)
+- Stats: {render_value(stats) if stats is not None else "N/A"}
+- Packages / Technologies: {render_value(packages) if packages is not None else "N/A"}
+- Architectural Graph{" (metrics and top hotspots by centrality)" if is_graph_analysis(arch) else ""}: {render_value(arch) if arch is not None else "N/A"}
+- Quality Insights: {render_value(qinsights) if qinsights is not None else "N/A"}
+- Transactions: {render_value(tx) if tx is not None else "N/A"}
+- Data Graphs: {render_value(dg) if dg is not None else "N/A"}
+{compaction_note(payload)}{paging_note(payload)}"""
+    return _request(system_msg, instructions, context, payload.get("question"), 1200)
 
-def summarize_impact_with_anthropic(payload: Dict[str, Any]) -> str:
-    # Get API key dynamically
-    api_key = get_anthropic_api_key()
-    
-    # Debug: Check if API key is loaded
-    if not api_key:
-        raise ValueError("ANTHROPIC_API_KEY is not set or empty")
-    
-    # Debug: Log API key status (first few chars only for security)
-    import logging
-    import os
-    logger = logging.getLogger("cast-imaging-agent.summarizers")
-    logger.debug(f"ANTHROPIC_API_KEY loaded: {api_key[:10]}..." if api_key else "ANTHROPIC_API_KEY is empty")
-    
-    # Ensure no conflicting environment variables are set for Anthropic
-    # Temporarily clear any auth-related env vars that might confuse the client
-    original_env = {}
-    conflicting_vars = ['X_API_KEY', 'AUTHORIZATION', 'AUTH_TOKEN']
-    for var in conflicting_vars:
-        if var in os.environ:
-            original_env[var] = os.environ[var]
-            del os.environ[var]
-    
-    try:
-        # Initialize client with explicit parameters
-        client = anthropic.Anthropic(
-            api_key=api_key,
-            # Explicitly set other auth methods to None to avoid conflicts
-            auth_token=None
-        )
-    finally:
-        # Restore original environment variables
-        for var, value in original_env.items():
-            os.environ[var] = value
+def _impact_request(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the `messages.create` arguments for an impact analysis report."""
     system_msg = (
         "You are CAST Imaging Technical Copilot. Create an impact analysis report for a code change. "
         "Ground ONLY in provided MCP data. Be conservative: call out potential breakages, tests to run, and approvals."
     )
+    instructions = """Report format:
+1) Scope: object(s) and application in scope; assumptions.
+2) Direct Impacts: callers/callees, immediate dependencies; transitive callers by rank when provided.
+3) Transaction Risks: user-facing transactions affected and why.
+4) Data Impacts: tables/files/APIs touched and consistency concerns.
+5) Cross-App Impacts: upstream/downstream apps; integration points.
+6) Testing Plan: transactions to exercise; edge cases; data checks.
+7) Controls/Approvals: security, PII, licensing, rollout/rollback suggestions.
+If data is missing, say 'Not available from Imaging data.'
+"""
     app_meta = payload.get("selected_application", {})
     obj = payload.get("object_details")
     txu = payload.get("transactions_using_object")
     dgio = payload.get("data_graphs_involving_object")
     iad = payload.get("inter_applications_dependencies")
-    question = payload.get("question")
-
-    user_prompt = f"""
-Question:
-{question}
+    transitive = payload.get("transitive_impact")
+    transitive_section = "" if transitive is None else f"""
+Transitive Callers (breadth-first; ranked by score = shortest paths to the object / distance):
+{render_value(transitive)}
+"""
 
+    context = f"""
 Application:
-{json.dumps(app_meta, indent=2)}
+{render_value(app_meta)}
 
 Object Details:
-{json.dumps(obj, indent=2)}
+{render_value(obj)}
 
 Transactions Using Object:
-{json.dumps(txu, indent=2) if txu is not None else "N/A"}
+{render_value(txu) if txu is not None else "N/A"}
 
 Data Graphs Involving Object:
-{json.dumps(dgio, indent=2) if dgio is not None else "N/A"}
+{render_value(dgio) if dgio is not None else "N/A"}
 
 Inter-Application Dependencies:
-{json.dumps(iad, indent=2) if iad is not None else "N/A"}
+{render_value(iad) if iad is not None else "N/A"}
+{transitive_section}{compaction_note(payload)}{paging_note(payload)}"""
+    return _request(system_msg, instructions, context, payload.get("question"), 1400)
 
-Report format:
-1) Scope: object(s) and application in scope; assumptions.
-2) Direct Impacts: callers/callees, immediate dependencies.
-3) Transaction Risks: user-facing transactions affected and why.
+def _impact_batch_request(payload: Dict[str, Any], per_object: bool = True) -> Dict[str, Any]:
+    """Build the `messages.create` arguments for a consolidated change-set report."""
+    system_msg = (
+        "You are CAST Imaging Technical Copilot. Create one consolidated impact analysis report for a change set "
+        "touching several objects. Ground ONLY in provided MCP data. Be conservative: call out potential breakages, "
+        "tests to run, and approvals."
+    )
+    per_object_section = (
+        "8) Per-Object Notes: one short subsection per object with its specific risks.\n" if per_object else ""
+    )
+    instructions = f"""Report format:
+1) Scope: objects and application in scope; unresolved objects; assumptions.
+2) Direct Impacts: callers/callees, immediate dependencies, shared hotspots across objects.
+3) Transaction Risks: user-facing transactions affected, prioritizing those reached by several objects.
 4) Data Impacts: tables/files/APIs touched and consistency concerns.
 5) Cross-App Impacts: upstream/downstream apps; integration points.
-6) Testing Plan: transactions to exercise; edge cases; data checks.
+6) Testing Plan: a single deduplicated list of transactions to exercise; edge cases; data checks.
 7) Controls/Approvals: security, PII, licensing, rollout/rollback suggestions.
-If data is missing, say 'Not available from Imaging data.'
+{per_object_section}If data is missing, say 'Not available from Imaging data.'
 """
-    resp = client.messages.create(
-        model=get_anthropic_model(),
-        max_tokens=1400,
-        temperature=0.2,
-        system=system_msg,
-        messages=[{"role": "user", "content": user_prompt}],
+
+    context = f"""
+Application:
+{render_value(payload.get("selected_application", {}))}
+
+Objects in the change set:
+{render_value(payload.get("object_summaries", []))}
+
+Objects that could not be resolved:
+{render_value(payload.get("failed_objects", []))}
+
+Transactions impacted (deduplicated; "objects" lists which changed objects reach each one):
+{render_value(payload.get("transactions", []))}
+
+Data Graphs impacted (deduplicated):
+{render_value(payload.get("data_graphs", []))}
+
+Inter-Application Dependencies (deduplicated):
+{render_value(payload.get("inter_applications_dependencies", []))}
+{compaction_note(payload)}"""
+    return _request(system_msg, instructions, context, payload.get("question"), 2000)
+
+def _map_request(app_meta: Dict[str, Any], section: str, part: int, parts: int, chunk: Any, level: int) -> Dict[str, Any]:
+    """
+    Build the `messages.create` arguments for one map call. The question is
+    deliberately left out so cached partial summaries serve every question
+    about the same data.
+    """
+    label = section.replace("_", " ")
+    system_msg = (
+        "You are CAST Imaging Technical Copilot. You condense one slice of an application's "
+        "MCP data for a later report. Ground ONLY in the provided data."
     )
+    if level == 0:
+        data = f"Part {part} of {parts} of the {label} data:\n{render_value(chunk)}"
+        instructions = (
+            "Summarize the part you are given in at most 250 words. Keep concrete names (components, "
+            "transactions, tables, technologies), counts and anything that looks like a risk or hotspot."
+        )
+    else:
+        data = f"Partial summaries {part} of {parts} of the {label} data:\n" + "\n\n".join(chunk)
+        instructions = (
+            "Merge the partial summaries you are given into one of at most 250 words, keeping concrete "
+            "names, counts and risks, and dropping repetition."
+        )
+    context = f"""
+Application:
+{render_value(app_meta)}
+
+{data}
+"""
+    return _request(system_msg, instructions, context, None, MAP_OUTPUT_TOKENS)
+
+def _sync_client() -> "anthropic.Anthropic":
+    api_key = get_anthropic_api_key()
+    if not api_key:
+        raise ValueError("ANTHROPIC_API_KEY is not set or empty")
+    return anthropic.Anthropic(api_key=api_key)
+
+def summarize_with_anthropic(payload: Dict[str, Any]) -> str:
+    """Blocking variant, kept for scripts; API handlers use the async one."""
+    resp = _sync_client().messages.create(**_summary_request(payload))
+    return _join_text_blocks(resp)
+
+def summarize_impact_with_anthropic(payload: Dict[str, Any]) -> str:
+    """Blocking variant, kept for scripts; API handlers use the async one."""
+    resp = _sync_client().messages.create(**_impact_request(payload))
     return _join_text_blocks(resp)
+
+def _observe_prompt(request: Dict[str, Any], kind: str) -> None:
+    text = _prompt_text(request)
+    PROMPT_BYTES.observe(len(text.encode("utf-8")), kind=kind)
+    PROMPT_TOKENS.observe(estimate_tokens(text), kind=kind)
+
+# usage field -> `direction` label of LLM_TOKENS
+_USAGE_DIRECTIONS = (
+    ("input_tokens", "input"),
+    ("output_tokens", "output"),
+    ("cache_read_input_tokens", "cache_read"),
+    ("cache_creation_input_tokens", "cache_write"),
+)
+
+def _observe_usage(usage: Dict[str, Any], kind: str) -> None:
+    for field, direction in _USAGE_DIRECTIONS:
+        tokens = usage.get(field)
+        if isinstance(tokens, (int, float)):
+            LLM_TOKENS.observe(tokens, kind=kind, direction=direction)
+
+async def _create_cached(request: Dict[str, Any], cache_mode: str, kind: str) -> str:
+    async def produce() -> str:
+        _observe_prompt(request, kind)
+        t0 = time.perf_counter()
+        try:
+            resp = await get_anthropic_client().messages.create(**request)
+        except Exception as e:
+            record_error("llm", e)
+            raise
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - t0, kind=kind, mode="create")
+        record_span("anthropic", t0, kind=kind)
+        _observe_usage(_usage_dict(resp), kind)
+        return _join_text_blocks(resp)
+
+    with span("llm", kind=kind):
+        return await llm_flight.do(
+            (request_fingerprint(request), cache_mode),
+            lambda: summary_cache.get_or_create(request, produce, mode=cache_mode),
+        )
+
+def _build(builder, *args: Any) -> Dict[str, Any]:
+    with span("prompt_build"):
+        return builder(*args)
+
+async def summarize_with_anthropic_async(payload: Dict[str, Any], cache_mode: str = "use") -> str:
+    return await _create_cached(_build(_summary_request, payload), cache_mode, "summary")
+
+async def summarize_impact_with_anthropic_async(payload: Dict[str, Any], cache_mode: str = "use") -> str:
+    return await _create_cached(_build(_impact_request, payload), cache_mode, "impact")
+
+async def summarize_impact_batch_with_anthropic_async(
+    payload: Dict[str, Any], per_object: bool = True, cache_mode: str = "use"
+) -> str:
+    return await _create_cached(_build(_impact_batch_request, payload, per_object), cache_mode, "impact_batch")
+
+async def _map_parts(app_meta: Dict[str, Any], section: str, chunks: List[Any], cache_mode: str, level: int) -> List[str]:
+    async def one(part: int, chunk: Any) -> str:
+        request = _map_request(app_meta, section, part, len(chunks), chunk, level)
+        async with map_semaphore:
+            return await _create_cached(request, cache_mode, "map")
+
+    return list(await asyncio.gather(*(one(i, c) for i, c in enumerate(chunks, 1))))
+
+async def _map_section(app_meta: Dict[str, Any], section: str, value: Any, cache_mode: str) -> Tuple[str, Dict[str, Any]]:
+    chunks = split_section(value, MAP_CHUNK_TOKENS)
+    with span("map", section=section, chunks=len(chunks)):
+        partials = await _map_parts(app_meta, section, chunks, cache_mode, 0)
+        calls, levels = len(chunks), 1
+        while (
+            len(partials) > 1
+            and levels < MAP_MAX_LEVELS
+            and estimate_tokens("\n".join(partials)) > PROMPT_SECTION_TOKEN_BUDGET
+        ):
+            groups = split_section(partials, MAP_CHUNK_TOKENS)
+            if len(groups) == len(partials):
+                groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+            partials = await _map_parts(app_meta, section, groups, cache_mode, levels)
+            calls += len(groups)
+            levels += 1
+    records = record_count(value)
+    return combine_partials(partials, records), {
+        "records": records,
+        "chunks": len(chunks),
+        "levels": levels,
+        "calls": calls,
+    }
+
+async def map_sections_async(
+    payload: Dict[str, Any],
+    cache_mode: str = "use",
+    sections: Sequence[str] = MAP_REDUCE_SECTIONS,
+) -> Dict[str, Any]:
+    """
+    Map step of a map-reduce summary: copy of `payload` where every section
+    larger than one chunk is replaced by its partial summaries, with a
+    `map_reduce` report. The reduce step is the usual summary call on it.
+    """
+    app_meta = payload.get("selected_application", {})
+    large = [
+        s for s in sections
+        if payload.get(s) is not None and estimate_tokens(render_value(payload[s])) > MAP_CHUNK_TOKENS
+    ]
+    mapped = await asyncio.gather(*(_map_section(app_meta, s, payload[s], cache_mode) for s in large))
+    out = dict(payload)
+    report: Dict[str, Any] = {}
+    for name, (text, info) in zip(large, mapped):
+        out[name] = text
+        report[name] = info
+    out["map_reduce"] = {"sections": report, "map_calls": sum(i["calls"] for i in report.values())}
+    return out
+
+def _usage_dict(resp) -> Dict[str, Any]:
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return {}
+    out = {
+        "input_tokens": getattr(usage, "input_tokens", None),
+        "output_tokens": getattr(usage, "output_tokens", None),
+    }
+    # Prompt-cache counters are only reported when caching was in play.
+    for field in ("cache_read_input_tokens", "cache_creation_input_tokens"):
+        value = getattr(usage, field, None)
+        if value is not None:
+            out[field] = value
+    return out
+
+async def _stream_request(request: Dict[str, Any], cache_mode: str = "use", kind: str = "summary") -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream a completion as events: {"type": "delta", "text": ...} for each text
+    chunk, then a single {"type": "usage", ...} once the message is complete.
+    A cached summary is replayed as one delta. Misses are not coalesced
+    through `llm_flight`: each stream needs its own deltas as they arrive.
+    """
+    cached = await summary_cache.lookup(request, cache_mode)
+    if cached is not None:
+        yield {"type": "delta", "text": cached}
+        yield {"type": "usage", "usage": {}, "stop_reason": "cached", "cached": True}
+        return
+
+    parts: List[str] = []
+    _observe_prompt(request, kind)
+    t0 = time.perf_counter()
+    try:
+        async with get_anthropic_client().messages.stream(**request) as stream:
+            async for text in stream.text_stream:
+                if not parts:
+                    LLM_TIME_TO_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - t0, kind=kind)
+                parts.append(text)
+                yield {"type": "delta", "text": text}
+            final = await stream.get_final_message()
+    except Exception as e:
+        record_error("llm", e)
+        raise
+    LLM_REQUEST_SECONDS.observe(time.perf_counter() - t0, kind=kind, mode="stream")
+    usage = _usage_dict(final)
+    _observe_usage(usage, kind)
+    # Cached as the non-streaming path would: text blocks joined by newlines.
+    await summary_cache.save(request, _join_text_blocks(final), cache_mode)
+    yield {
+        "type": "usage",
+        "usage": usage,
+        "stop_reason": getattr(final, "stop_reason", None),
+        "cached": False,
+    }
+
+def stream_summary_with_anthropic(payload: Dict[str, Any], cache_mode: str = "use") -> AsyncIterator[Dict[str, Any]]:
+    return _stream_request(_summary_request(payload), cache_mode, "summary")
+
+def stream_impact_with_anthropic(payload: Dict[str, Any], cache_mode: str = "use") -> AsyncIterator[Dict[str, Any]]:
+    return _stream_request(_impact_request(payload), cache_mode, "impact")
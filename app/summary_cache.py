@@ -0,0 +1,70 @@
+import hashlib
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .cache import LRUCache, SQLiteCache, TieredCache
+from .config import SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_TTL, SUMMARY_CACHE_DB
+
+logger = logging.getLogger("cast-imaging-agent.summary_cache")
+
+# Request-level cache controls: "use" reads and writes, "refresh" skips the
+# read but stores the new summary, "bypass" neither reads nor writes.
+CACHE_MODES = ("use", "bypass", "refresh")
+
+def request_fingerprint(request: Dict[str, Any]) -> str:
+    """
+    Stable hash of the exact `messages.create` arguments: model, system prompt,
+    rendered messages, max_tokens and temperature. Any change in the MCP data
+    that reaches the prompt changes the hash.
+    """
+    raw = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class SummaryCache:
+    """Content-addressed store of generated summaries."""
+
+    def __init__(self, store: TieredCache, ttl: float = 86400.0):
+        self.store = store
+        self.ttl = ttl
+
+    async def lookup(self, request: Dict[str, Any], mode: str = "use") -> Optional[str]:
+        if mode != "use" or self.ttl <= 0:
+            return None
+        return await self.store.get(request_fingerprint(request))
+
+    async def save(self, request: Dict[str, Any], summary: str, mode: str = "use") -> None:
+        if mode == "bypass" or self.ttl <= 0:
+            return
+        await self.store.set(request_fingerprint(request), summary, self.ttl)
+
+    async def get_or_create(
+        self,
+        request: Dict[str, Any],
+        produce: Callable[[], Awaitable[str]],
+        mode: str = "use",
+    ) -> str:
+        cached = await self.lookup(request, mode)
+        if cached is not None:
+            logger.info("Summary cache hit")
+            return cached
+        summary = await produce()
+        await self.save(request, summary, mode)
+        return summary
+
+    async def clear(self) -> None:
+        await self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.store.stats(), "ttl_s": self.ttl}
+
+def create_summary_cache() -> SummaryCache:
+    disk = None
+    if SUMMARY_CACHE_DB:
+        try:
+            disk = SQLiteCache(SUMMARY_CACHE_DB, table="summaries")
+        except Exception as e:
+            logger.warning("Summary disk cache disabled (%s): %s", SUMMARY_CACHE_DB, e)
+    return SummaryCache(TieredCache(LRUCache(SUMMARY_CACHE_MAX_ENTRIES), disk), ttl=SUMMARY_CACHE_TTL)
+
+summary_cache = create_summary_cache()
@@ -0,0 +1,406 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .config import SYMBOL_INDEX_DIR, SYMBOL_INDEX_ENABLED, SYMBOL_INDEX_MAX_OBJECTS
+from .inventory import delivery_timestamp, normalize_app_id
+from .mcp_client import call_tool, imaging_endpoint_key, imaging_session
+from .name_index import trigrams
+from .paging import PageStats, fetch_paged
+from .tool_catalog import get_tool_catalog
+from .tools import application_inventory
+
+logger = logging.getLogger("cast-imaging-agent.symbol_index")
+
+# Object symbols of one application delivery, in a read-only file that is
+# memory-mapped rather than loaded. Layout (little-endian):
+#
+#   header       magic, records R, trigrams G, record blob size, flags
+#   offsets      (R + 1) x u32: start of each record in the blob
+#   gram counts  R x u16: trigrams in each record's key
+#   records      UTF-8 "key\tid\tname\tfull_name\ttype", sorted by key
+#   trigrams     G x (3-byte trigram, pad, u32 first posting, u32 postings)
+#   postings     u32 record numbers, grouped by trigram
+#
+# An object has one record per distinct lookup key (its id, name and full
+# name, casefolded), so exact and prefix matches are binary searches over
+# the keys. Only name keys get trigram postings: ids and qualified names
+# share most of their trigrams across an application, and fuzzy matches are
+# for the names people type.
+
+MAGIC = b"CISYMIX1"
+_HEADER = struct.Struct("<8sIIII")
+_OFFSETS = struct.Struct("<II")
+_GRAM = struct.Struct("<3sxII")
+FLAG_TRUNCATED = 1
+
+# Dice similarity a fuzzy candidate needs to be suggested, and to be taken
+# as the object when it is the single best candidate.
+FUZZY_SUGGEST_CUTOFF = 0.4
+FUZZY_RESOLVE_CUTOFF = 0.8
+
+Symbol = Tuple[str, str, str, str]  # id, name, full name, type
+
+def symbol_key(text: str) -> str:
+    return text.strip().casefold()
+
+def _clean(value: Any) -> str:
+    return "" if value is None else str(value).replace("\t", " ").replace("\n", " ").strip()
+
+def object_symbols(records: Iterable[Any]) -> List[Symbol]:
+    """(id, name, full name, type) of each object record that carries an id."""
+    symbols: List[Symbol] = []
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        object_id = _clean(record.get("id") or record.get("objectId") or record.get("object_id"))
+        if not object_id:
+            continue
+        full_name = _clean(record.get("fullName") or record.get("full_name") or record.get("qualifiedName"))
+        name = _clean(record.get("name")) or full_name or object_id
+        symbols.append((object_id, name, full_name, _clean(record.get("type"))))
+    return symbols
+
+def write_symbol_file(path: str, symbols: Iterable[Symbol], truncated: bool = False) -> int:
+    """Write the index file for `symbols` atomically; returns the number of records."""
+    # (key, record) -> whether the key is the object's short name
+    rows: Dict[Tuple[bytes, bytes], bool] = {}
+    for object_id, name, full_name, kind in symbols:
+        value = "\t".join((object_id, name, full_name, kind)).encode("utf-8")
+        for key in {symbol_key(object_id), symbol_key(name), symbol_key(full_name)} - {""}:
+            row = (key.encode("utf-8"), value)
+            rows[row] = rows.get(row, False) or key == symbol_key(name)
+    ordered = sorted(rows)
+
+    blob = bytearray()
+    offsets = [0]
+    gram_counts: List[int] = []
+    postings: Dict[bytes, List[int]] = {}
+    for n, row in enumerate(ordered):
+        key, value = row
+        blob += key + b"\t" + value
+        offsets.append(len(blob))
+        grams = trigrams(key.decode("utf-8")) if rows[row] else ()
+        gram_counts.append(min(len(grams), 0xFFFF))
+        for gram in grams:
+            postings.setdefault(gram.encode("ascii"), []).append(n)
+
+    directory = bytearray()
+    flat: List[int] = []
+    for gram in sorted(postings):
+        directory += _GRAM.pack(gram, len(flat), len(postings[gram]))
+        flat.extend(postings[gram])
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(ordered), len(postings), len(blob), FLAG_TRUNCATED if truncated else 0))
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write(struct.pack(f"<{len(gram_counts)}H", *gram_counts))
+        f.write(blob)
+        f.write(directory)
+        f.write(struct.pack(f"<{len(flat)}I", *flat))
+    os.replace(tmp, path)
+    return len(ordered)
+
+class _Keys:
+    """Sequence view of the sorted record keys, for `bisect`."""
+
+    def __init__(self, index: "SymbolIndex"):
+        self._index = index
+
+    def __len__(self) -> int:
+        return self._index.records
+
+    def __getitem__(self, n: int) -> bytes:
+        return self._index._key(n)
+
+class _Grams:
+    def __init__(self, index: "SymbolIndex"):
+        self._index = index
+
+    def __len__(self) -> int:
+        return self._index.gram_count
+
+    def __getitem__(self, n: int) -> bytes:
+        return _GRAM.unpack_from(self._index._mm, self._index._grams_at + n * _GRAM.size)[0]
+
+class SymbolIndex:
+    """
+    Read-only view of one symbol file. Lookups page in only the parts of the
+    file they touch; nothing is parsed up front besides the header.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.records, self.gram_count, blob_size, flags = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a symbol index file: {path}")
+        self.truncated = bool(flags & FLAG_TRUNCATED)
+        self._offsets_at = _HEADER.size
+        self._gram_counts_at = self._offsets_at + 4 * (self.records + 1)
+        self._records_at = self._gram_counts_at + 2 * self.records
+        self._grams_at = self._records_at + blob_size
+        self._postings_at = self._grams_at + _GRAM.size * self.gram_count
+        self._keys = _Keys(self)
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _record(self, n: int) -> bytes:
+        start, end = _OFFSETS.unpack_from(self._mm, self._offsets_at + 4 * n)
+        return self._mm[self._records_at + start:self._records_at + end]
+
+    def _key(self, n: int) -> bytes:
+        return self._record(n).split(b"\t", 1)[0]
+
+    def _object(self, n: int) -> Dict[str, str]:
+        _, object_id, name, full_name, kind = self._record(n).decode("utf-8").split("\t")
+        return {"id": object_id, "name": name, "fullName": full_name, "type": kind}
+
+    def _distinct(self, rows: Iterable[int], limit: int) -> List[Dict[str, str]]:
+        objects: Dict[str, Dict[str, str]] = {}
+        for n in rows:
+            obj = self._object(n)
+            objects.setdefault(obj["id"], obj)
+            if len(objects) >= limit:
+                break
+        return list(objects.values())
+
+    def exact(self, text: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Objects whose id, name or full name is `text`, ignoring case."""
+        key = symbol_key(text).encode("utf-8")
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_right(self._keys, key, lo=lo)
+        return self._distinct(range(lo, hi), limit)
+
+    def prefix(self, text: str, limit: int = 10) -> List[Dict[str, str]]:
+        """Objects whose id, name or full name starts with `text`, in key order."""
+        key = symbol_key(text).encode("utf-8")
+        if not key:
+            return []
+
+        def rows():
+            n = bisect.bisect_left(self._keys, key)
+            while n < self.records and self._key(n).startswith(key):
+                yield n
+                n += 1
+
+        return self._distinct(rows(), limit)
+
+    def fuzzy(self, text: str, limit: int = 10, cutoff: float = FUZZY_SUGGEST_CUTOFF) -> List[Dict[str, Any]]:
+        """Objects ranked by trigram (Dice) similarity of a key to `text`, with their score."""
+        wanted = trigrams(symbol_key(text))
+        if not wanted:
+            return []
+        grams = _Grams(self)
+        shared: Counter = Counter()
+        for gram in wanted:
+            encoded = gram.encode("ascii")
+            at = bisect.bisect_left(grams, encoded)
+            if at < self.gram_count and grams[at] == encoded:
+                _, first, count = _GRAM.unpack_from(self._mm, self._grams_at + at * _GRAM.size)
+                shared.update(struct.unpack_from(f"<{count}I", self._mm, self._postings_at + 4 * first))
+
+        scored = []
+        for n, count in shared.items():
+            (size,) = struct.unpack_from("<H", self._mm, self._gram_counts_at + 2 * n)
+            score = 2 * count / (len(wanted) + size)
+            if score >= cutoff:
+                scored.append((score, n))
+        scored.sort(key=lambda s: (-s[0], s[1]))
+
+        objects: Dict[str, Dict[str, Any]] = {}
+        for score, n in scored:
+            obj = self._object(n)
+            if obj["id"] not in objects:
+                objects[obj["id"]] = {**obj, "score": round(score, 4)}
+                if len(objects) >= limit:
+                    break
+        return list(objects.values())
+
+    def lookup(self, hint: str, limit: int = 5) -> Dict[str, Any]:
+        """
+        Resolve an object hint: an exact match, else a unique prefix match,
+        else a fuzzy match that is both close and clearly the best. `object`
+        is the resolved object or None; `candidates` are the "did you mean"
+        suggestions when the hint is ambiguous or unknown.
+        """
+        for match, found in (("exact", self.exact(hint, limit + 1)), ("prefix", self.prefix(hint, limit + 1))):
+            if len(found) == 1:
+                return {"match": match, "object": found[0], "candidates": []}
+            if found:
+                return {"match": "ambiguous", "object": None, "candidates": found[:limit]}
+
+        found = self.fuzzy(hint, limit)
+        if found and found[0]["score"] >= FUZZY_RESOLVE_CUTOFF and (len(found) == 1 or found[1]["score"] < found[0]["score"]):
+            return {"match": "fuzzy", "object": found[0], "candidates": found[1:]}
+        return {"match": "none", "object": None, "candidates": found}
+
+    def complete(self, text: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Autocomplete: prefix matches first, topped up with fuzzy ones."""
+        found = self.prefix(text, limit)
+        if len(found) < limit:
+            seen = {obj["id"] for obj in found}
+            found += [obj for obj in self.fuzzy(text, limit) if obj["id"] not in seen][:limit - len(found)]
+        return found
+
+def objects_tool(catalog) -> Optional[str]:
+    """The tool listing an application's objects, if the server has one."""
+    return catalog.resolve("objects")
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+class SymbolIndexStore:
+    """
+    Symbol indexes keyed by MCP endpoint and application, one file per
+    delivery under `directory`. A missing index is built in the background
+    from the server's `objects` tool; until then callers resolve objects
+    remotely as before. A re-delivered application gets a new file.
+    """
+
+    def __init__(self, directory: str, enabled: bool = True, max_objects: int = 200_000, retry_after: float = 300.0):
+        self.directory = directory
+        self.enabled = enabled
+        self.max_objects = max_objects
+        self.retry_after = retry_after
+        self._indexes: Dict[Tuple[str, str], Tuple[Optional[str], SymbolIndex]] = {}
+        self._building: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._failed: Dict[Tuple[str, str, Optional[str]], float] = {}
+        self.builds = 0
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, endpoint: str, app_id: Any, delivery: Optional[str]) -> str:
+        return os.path.join(self.directory, f"{_digest(endpoint, app_id)}-{_digest(delivery)}.symidx")
+
+    def get(self, app_id: Any, delivery: Optional[str], endpoint: Optional[str] = None) -> Optional[SymbolIndex]:
+        """The index of this delivery if it is built (in memory or on disk), else None."""
+        if not self.enabled:
+            return None
+        endpoint = endpoint or imaging_endpoint_key()
+        key = (endpoint, str(app_id))
+        entry = self._indexes.get(key)
+        if entry is not None and entry[0] == delivery:
+            self.hits += 1
+            return entry[1]
+        path = self.path_for(endpoint, app_id, delivery)
+        if os.path.exists(path):
+            try:
+                index = self._install(key, delivery, path)
+                self.hits += 1
+                return index
+            except (OSError, ValueError) as e:
+                logger.warning("Discarding unreadable symbol index %s: %s", path, e)
+        self.misses += 1
+        return None
+
+    def _install(self, key: Tuple[str, str], delivery: Optional[str], path: str) -> SymbolIndex:
+        index = SymbolIndex(path)
+        previous = self._indexes.get(key)
+        self._indexes[key] = (delivery, index)
+        if previous is not None:
+            previous[1].close()
+        return index
+
+    async def build(self, app_id: Any, delivery: Optional[str], records: List[Any], truncated: bool = False, endpoint: Optional[str] = None) -> SymbolIndex:
+        """Write and open the index of this delivery from object records."""
+        endpoint = endpoint or imaging_endpoint_key()
+        path = self.path_for(endpoint, app_id, delivery)
+        t0 = time.perf_counter()
+        # Extracting symbols from up to SYMBOL_INDEX_MAX_OBJECTS records is part of the thread's work.
+        count = await asyncio.to_thread(lambda: write_symbol_file(path, object_symbols(records), truncated))
+        self.builds += 1
+        logger.info("Symbol index for %s built: %d keys in %.2fs", app_id, count, time.perf_counter() - t0)
+        return self._install((endpoint, str(app_id)), delivery, path)
+
+    def schedule_build(self, app_id: Any, delivery: Optional[str], endpoint: Optional[str] = None) -> None:
+        """Start a background build of this delivery's index unless one is running or recently failed."""
+        if not self.enabled:
+            return
+        endpoint = endpoint or imaging_endpoint_key()
+        key = (endpoint, str(app_id))
+        failed_at = self._failed.get((*key, delivery))
+        if key in self._building or (failed_at is not None and time.monotonic() - failed_at < self.retry_after):
+            return
+        task = asyncio.create_task(self._background_build(app_id, delivery, endpoint))
+        self._building[key] = task
+        task.add_done_callback(lambda _: self._building.pop(key, None))
+
+    async def _background_build(self, app_id: Any, delivery: Optional[str], endpoint: str) -> None:
+        try:
+            async with imaging_session() as session:
+                catalog = await get_tool_catalog(session)
+                tool = objects_tool(catalog)
+                if not tool:
+                    raise RuntimeError("Imaging MCP: 'objects' tool not found.")
+                stats = PageStats()
+                records = await fetch_paged(
+                    lambda args: call_tool(session, tool, args),
+                    catalog, tool, stats,
+                    max_items=self.max_objects, max_tokens=None,
+                    app_id=app_id,
+                )
+            await self.build(app_id, delivery, records, truncated=stats.truncated, endpoint=endpoint)
+        except Exception as e:
+            self._failed[(endpoint, str(app_id), delivery)] = time.monotonic()
+            logger.warning("Symbol index build failed for %s: %s", app_id, e)
+
+    def invalidate_applications(self, endpoint: str, app_ids: Set[Any]) -> None:
+        """Drop the indexes of re-delivered applications, in memory and on disk."""
+        for app_id in app_ids:
+            entry = self._indexes.pop((endpoint, str(app_id)), None)
+            if entry is not None:
+                entry[1].close()
+            prefix = _digest(endpoint, app_id) + "-"
+            try:
+                stale = [f for f in os.listdir(self.directory) if f.startswith(prefix)]
+            except OSError:
+                continue
+            for name in stale:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def clear(self) -> None:
+        for _, index in self._indexes.values():
+            index.close()
+        self._indexes.clear()
+        self._failed.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "directory": self.directory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "builds": self.builds,
+            "building": len(self._building),
+            "applications": {
+                f"{endpoint}#{app_id}": {"delivery": delivery, "keys": index.records, "truncated": index.truncated}
+                for (endpoint, app_id), (delivery, index) in self._indexes.items()
+            },
+        }
+
+symbol_index_store = SymbolIndexStore(SYMBOL_INDEX_DIR, enabled=SYMBOL_INDEX_ENABLED, max_objects=SYMBOL_INDEX_MAX_OBJECTS)
+application_inventory.add_listener(symbol_index_store.invalidate_applications)
+
+def application_symbols(app: Dict[str, Any]) -> Optional[SymbolIndex]:
+    """The built symbol index of `app`'s current delivery, scheduling a build when there is none."""
+    app_id, delivery = normalize_app_id(app), delivery_timestamp(app)
+    index = symbol_index_store.get(app_id, delivery)
+    if index is None:
+        symbol_index_store.schedule_build(app_id, delivery)
+    return index
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("cast-imaging-agent.tool_args")
+
+# Parameter names the services use, with the spellings Imaging servers have
+# been seen to accept for them, most preferred first.
+ARG_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "app_id": ("app_id", "application_id", "application", "app_name", "app"),
+    "object_id": ("object_id", "objectId", "id"),
+    "limit": ("limit", "max_results", "page_size"),
+    "offset": ("offset", "start", "skip"),
+    "page": ("page", "page_number"),
+    "granularity": ("granularity", "level"),
+}
+
+# Ways to hand an object hint to object_details, in the order the service
+# historically tried them.
+OBJECT_HINT_KEYS = ("object_id", "objectId", "name", "object_name", "query", "object", "search")
+
+def schema_properties(schema: Any) -> Optional[Dict[str, Any]]:
+    """Property map of a JSON `inputSchema`, or None when the tool has no usable schema."""
+    if not isinstance(schema, dict):
+        return None
+    props = schema.get("properties")
+    if not isinstance(props, dict):
+        return None
+    return props
+
+def arg_mapping(schema: Any) -> Optional[Dict[str, str]]:
+    """
+    Service parameter name -> the tool's own parameter name, for the names in
+    ARG_ALIASES the tool accepts. None means "no schema": pass names through.
+    """
+    props = schema_properties(schema)
+    if props is None:
+        return None
+    mapping: Dict[str, str] = {}
+    for name, aliases in ARG_ALIASES.items():
+        for alias in aliases:
+            if alias in props:
+                mapping[name] = alias
+                break
+    return mapping
+
+def build_args(mapping: Optional[Dict[str, str]], schema: Any, values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Arguments for one call: service names are renamed to the tool's names and
+    parameters the tool does not declare are dropped. Without a schema the
+    values are passed unchanged.
+    """
+    if mapping is None:
+        return dict(values)
+    props = schema_properties(schema) or {}
+    args: Dict[str, Any] = {}
+    for name, value in values.items():
+        if name in mapping:
+            args[mapping[name]] = value
+        elif name in props:
+            args[name] = value
+    return args
+
+def paging_style(schema: Any) -> Optional[str]:
+    """How a list tool pages: "offset", "page" (1-based), or None when it cannot."""
+    mapping = arg_mapping(schema) or {}
+    if "offset" in mapping:
+        return "offset"
+    if "page" in mapping:
+        return "page"
+    return None
+
+def object_hint_keys(schema: Any) -> List[str]:
+    """Candidate keys for an object hint: those the schema declares, else all of them."""
+    props = schema_properties(schema)
+    if props is None:
+        return list(OBJECT_HINT_KEYS)
+    declared = [k for k in OBJECT_HINT_KEYS if k in props]
+    return declared or list(OBJECT_HINT_KEYS)
+
+class ShapeMemory:
+    """Which argument shape last worked for a tool, per MCP endpoint."""
+
+    def __init__(self):
+        self._shapes: Dict[Tuple[str, str], str] = {}
+
+    def get(self, endpoint: str, tool: str) -> Optional[str]:
+        return self._shapes.get((endpoint, tool))
+
+    def remember(self, endpoint: str, tool: str, shape: str) -> None:
+        if self._shapes.get((endpoint, tool)) != shape:
+            logger.info("Remembering '%s' as the working argument for %s on %s", shape, tool, endpoint)
+        self._shapes[(endpoint, tool)] = shape
+
+    def clear(self) -> None:
+        self._shapes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {f"{endpoint}#{tool}": shape for (endpoint, tool), shape in self._shapes.items()}
+
+shape_memory = ShapeMemory()
+
+async def first_success(
+    attempts: Sequence[Tuple[str, Callable[[], Awaitable[Any]]]],
+) -> Tuple[Optional[str], Any, Optional[Exception]]:
+    """
+    Run every attempt concurrently and return (label, result, None) for the
+    first one producing a truthy result, cancelling the rest. When none does,
+    returns (None, None, last_error).
+    """
+    tasks = {asyncio.ensure_future(fn()): label for label, fn in attempts}
+    last_err: Optional[Exception] = None
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Prefer the earliest-listed attempt when several finish together.
+            for task in sorted(done, key=lambda t: list(tasks).index(t)):
+                if task.cancelled():
+                    continue
+                error = task.exception()
+                if error is not None:
+                    last_err = error
+                elif task.result():
+                    return tasks[task], task.result(), None
+        return None, None, last_err
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import TOOL_CATALOG_TTL
+from .mcp_client import list_tool_specs, imaging_endpoint_key
+from .metrics import set_tool_labels
+from .profiling import span
+from .tool_args import arg_mapping, build_args, paging_style
+from .tools import match_tool_name
+
+logger = logging.getLogger("cast-imaging-agent.tool_catalog")
+
+# Base tool names the services ask for; resolved once per catalog refresh.
+KNOWN_TOOL_BASES = (
+    "applications",
+    "stats",
+    "architectural_graph",
+    "quality_insights",
+    "packages",
+    "applications_transactions",
+    "applications_data_graphs",
+    "object_details",
+    "transactions_using_object",
+    "data_graphs_involving_object",
+    "datagraphs_involving_object",
+    "inter_applications_dependencies",
+)
+
+# Optional tools whose name is close to another one: matched exactly or by
+# suffix only (a fuzzy "objects" would land on "object_details").
+STRICT_TOOL_BASES = (
+    "objects",
+    "object_callers",
+)
+
+class ToolCatalog:
+    """
+    Snapshot of the server's tool list with a precomputed base-name ->
+    concrete-name map, so lookups on the hot path are plain dict reads.
+    Input schemas are kept alongside, and each tool's argument mapping is
+    derived once per snapshot.
+    """
+
+    def __init__(self, names: List[str], schemas: Optional[Dict[str, Any]] = None):
+        self.names = list(names)
+        self.schemas: Dict[str, Any] = dict(schemas or {})
+        self._arg_maps: Dict[str, Optional[Dict[str, str]]] = {
+            name: arg_mapping(self.schemas.get(name)) for name in self.names
+        }
+        self.fetched_at = time.monotonic()
+        self._resolved: Dict[str, Optional[str]] = {
+            base: self._match(base) for base in KNOWN_TOOL_BASES + STRICT_TOOL_BASES
+        }
+        self._bases: Dict[str, str] = {}
+        for base, concrete in self._resolved.items():
+            # Several bases may fuzzy-match one tool; the first listed wins.
+            if concrete:
+                self._bases.setdefault(concrete, base)
+        set_tool_labels(self._bases)
+
+    def _match(self, base: str) -> Optional[str]:
+        return match_tool_name(self.names, base, fuzzy=base not in STRICT_TOOL_BASES)
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def resolve(self, base: str) -> Optional[str]:
+        """Concrete tool name for `base`, or None if the server lacks it."""
+        if base not in self._resolved:
+            concrete = self._match(base)
+            self._resolved[base] = concrete
+            if concrete and concrete not in self._bases:
+                self._bases[concrete] = base
+                set_tool_labels({concrete: base})
+        return self._resolved[base]
+
+    def find(self, base: str) -> Optional[str]:
+        t = self.resolve(base)
+        if not t:
+            logger.info("Tool '%s' not found; continuing without it.", base)
+        return t
+
+    def base_name(self, concrete: str) -> str:
+        """Inverse of `resolve`, for labelling calls by their base tool name."""
+        return self._bases.get(concrete, concrete)
+
+    def schema(self, concrete: str) -> Optional[Dict[str, Any]]:
+        return self.schemas.get(concrete)
+
+    def args(self, concrete: str, **values: Any) -> Dict[str, Any]:
+        """Arguments for `concrete`, shaped by its input schema when it has one."""
+        return build_args(self._arg_maps.get(concrete), self.schemas.get(concrete), values)
+
+    def paging(self, concrete: str) -> Optional[str]:
+        """"offset" or "page" when `concrete` declares a paging parameter, else None."""
+        return paging_style(self.schemas.get(concrete))
+
+class ToolCatalogCache:
+    """Tool catalogs keyed by MCP endpoint, refreshed after `ttl` seconds."""
+
+    def __init__(self, ttl: float = 600.0):
+        self.ttl = ttl
+        self._entries: Dict[str, ToolCatalog] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, session, key: Optional[str] = None) -> ToolCatalog:
+        key = key or imaging_endpoint_key()
+        catalog = self._entries.get(key)
+        if catalog is not None and catalog.age < self.ttl:
+            self.hits += 1
+            return catalog
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another request may have refreshed it while we waited.
+            catalog = self._entries.get(key)
+            if catalog is not None and catalog.age < self.ttl:
+                self.hits += 1
+                return catalog
+            self.misses += 1
+            specs = await list_tool_specs(session)
+            if not specs:
+                raise ValueError("No tools available from imaging service")
+            names = [spec["name"] for spec in specs]
+            catalog = ToolCatalog(
+                names,
+                {spec["name"]: spec["input_schema"] for spec in specs if spec["input_schema"]},
+            )
+            self._entries[key] = catalog
+            logger.info("Tool catalog refreshed for %s: %d tools", key, len(names))
+            return catalog
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "ttl_s": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "endpoints": {
+                key: {"age_s": round(c.age, 1), "tools": len(c.names), "with_schema": len(c.schemas)}
+                for key, c in self._entries.items()
+            },
+        }
+
+tool_catalog_cache = ToolCatalogCache(ttl=TOOL_CATALOG_TTL)
+
+async def get_tool_catalog(session) -> ToolCatalog:
+    with span("list_tools"):
+        return await tool_catalog_cache.get(session)
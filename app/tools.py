@@ -2,10 +2,20 @@ import difflib
 import logging
 from typing import Any, Dict, List, Optional, Tuple
 
+from .config import APP_INVENTORY_TTL, APP_INVENTORY_MAX_STALE
+from .inventory import ApplicationInventoryCache, normalize_app_id
 from .mcp_client import call_tool
+from .metrics import APP_SELECTION_SECONDS
+from .name_index import NameIndex
+from .profiling import span
 
 logger = logging.getLogger("cast-imaging-agent.tools")
 
+# Minimum trigram similarity of an application name to the hint, and minimum
+# share of its trigrams found in the question when there is no hint.
+APP_HINT_CUTOFF = 0.4
+APP_MENTION_CUTOFF = 0.6
+
 def parse_applications_string(apps_str: str) -> List[Dict[str, Any]]:
     """
     Parse the string format returned by the MCP server for applications.
@@ -55,31 +65,31 @@ def parse_applications_string(apps_str: str) -> List[Dict[str, Any]]:
     
     return applications
 
-def match_tool_name(available_names: List[str], desired_base: str) -> Optional[str]:
-    """Find a tool by exact name, suffix, or fuzzy match."""
+def match_tool_name(available_names: List[str], desired_base: str, fuzzy: bool = True) -> Optional[str]:
+    """
+    Find a tool by exact name, suffix, or fuzzy match. Pass `fuzzy=False` for
+    optional tools whose name is close to another one (a fuzzy "objects"
+    would land on "object_details").
+    """
     if desired_base in available_names:
         return desired_base
     candidates = [n for n in available_names if n.endswith(desired_base)]
     if candidates:
         candidates.sort(key=len)
         return candidates[0]
+    if not fuzzy:
+        return None
     close = difflib.get_close_matches(desired_base, available_names, n=1)
     return close[0] if close else None
 
-async def select_application(session, tool_names: List[str], question: str, app_hint: Optional[str]) -> Tuple[Dict[str, Any], str]:
-    """ALWAYS call `applications` to enumerate and select the app."""
-    applications_tool = match_tool_name(tool_names, "applications")
-    if not applications_tool:
-        raise RuntimeError("Imaging MCP: 'applications' tool not found.")
-
-    # Debug: Log the input parameters
-    logger.info(f"select_application called with question='{question}', app_hint='{app_hint}'")
+async def fetch_applications(session, applications_tool: str) -> List[Dict[str, Any]]:
+    """Call `applications` and normalize whatever shape it returns into dicts."""
     logger.info(f"Using applications tool: {applications_tool}")
 
     apps = await call_tool(session, applications_tool, {})
     
     # Debug: Log the raw response from MCP server
-    logger.info(f"Raw MCP response - type: {type(apps)}, value: {apps}")
+    logger.debug(f"Raw MCP response - type: {type(apps)}, value: {apps}")
     
     # Extract the application list from the processed data
     if isinstance(apps, dict):
@@ -100,24 +110,13 @@ async def select_application(session, tool_names: List[str], question: str, app_
     if not app_list:
         raise RuntimeError("No applications returned by Imaging MCP.")
 
-    # Debug: Log the structure of app_list to understand what we're getting
-    logger.debug(f"app_list type: {type(app_list)}, length: {len(app_list) if hasattr(app_list, '__len__') else 'unknown'}")
-    if app_list and hasattr(app_list, '__getitem__'):
-        try:
-            logger.debug(f"First item type: {type(app_list[0])}, value: {app_list[0]}")
-        except (IndexError, TypeError):
-            logger.debug("Could not access first item in app_list")
-
     # Handle different data structures that might be returned
     processed_apps = []
-    names = []
     
     for i, item in enumerate(app_list):
         if isinstance(item, dict):
             # Standard dictionary case
             processed_apps.append(item)
-            name = str(item.get("name") or item.get("application") or item.get("id") or f"app_{i}")
-            names.append(name)
         elif isinstance(item, (tuple, list)) and len(item) >= 2:
             # Handle tuple/list case - assume (id, name) or similar structure
             app_dict = {
@@ -128,34 +127,41 @@ async def select_application(session, tool_names: List[str], question: str, app_
             if len(item) > 2:
                 app_dict["application"] = str(item[2])
             processed_apps.append(app_dict)
-            names.append(app_dict["name"])
         elif isinstance(item, str):
             # Handle string case - use as both id and name
-            app_dict = {"id": item, "name": item}
-            processed_apps.append(app_dict)
-            names.append(item)
+            processed_apps.append({"id": item, "name": item})
         else:
             # Fallback for unknown types
             logger.warning(f"Unknown application item type: {type(item)}, value: {item}")
-            app_dict = {"id": f"app_{i}", "name": str(item)}
-            processed_apps.append(app_dict)
-            names.append(str(item))
+            processed_apps.append({"id": f"app_{i}", "name": str(item)})
 
     if not processed_apps:
         raise RuntimeError("No valid applications could be processed from Imaging MCP response.")
 
-    # Debug: Log processed applications
-    logger.info(f"Processed {len(processed_apps)} applications:")
-    for i, app in enumerate(processed_apps[:5]):  # Log first 5 apps
-        logger.info(f"  App {i}: {app}")
-    logger.info(f"Available names: {names[:10]}")  # Log first 10 names
+    logger.info(f"Fetched {len(processed_apps)} applications")
+    return processed_apps
 
-    # Select the best matching application
-    guess = (app_hint or "").strip() or (max(question.split(), key=len) if question.split() else "")
-    logger.info(f"Matching guess: '{guess}' against available names")
-    
-    best = difflib.get_close_matches(guess, names, n=1, cutoff=0.4)
-    selected_name = best[0] if best else names[0]
+def choose_application(
+    processed_apps: List[Dict[str, Any]],
+    names: List[str],
+    question: str,
+    app_hint: Optional[str],
+    index: Optional[NameIndex] = None,
+) -> Dict[str, Any]:
+    """
+    Pick the application whose name best matches the hint or, without a hint,
+    the name best mentioned anywhere in the question. `index` is the trigram
+    index of `names` (built here when not given).
+    """
+    index = index if index is not None else NameIndex(names)
+    hint = (app_hint or "").strip()
+    if hint:
+        logger.info(f"Matching hint: '{hint}' against {len(index)} application names")
+        best = index.search(hint, limit=1, cutoff=APP_HINT_CUTOFF)
+    else:
+        logger.info(f"Matching question against {len(index)} application names")
+        best = index.search(question, limit=1, cutoff=APP_MENTION_CUTOFF, containment=True)
+    selected_name = best[0][0] if best else names[0]
     
     logger.info(f"Best match result: {best}, selected_name: '{selected_name}'")
     
@@ -171,7 +177,32 @@ async def select_application(session, tool_names: List[str], question: str, app_
         logger.warning(f"No exact match found for '{selected_name}', using fallback: {selected}")
     
     logger.info(f"Final selected application: {selected}")
-    
+    return selected
+
+application_inventory = ApplicationInventoryCache(
+    fetch_applications, ttl=APP_INVENTORY_TTL, max_stale=APP_INVENTORY_MAX_STALE,
+)
+
+async def select_application(
+    session,
+    tool_names: List[str],
+    question: str,
+    app_hint: Optional[str],
+    applications_tool: Optional[str] = None,
+) -> Tuple[Dict[str, Any], str]:
+    """
+    Select the app from the shared application inventory. The inventory is
+    filled by the `applications` tool and served stale while it refreshes.
+    """
+    applications_tool = applications_tool or match_tool_name(tool_names, "applications")
+    if not applications_tool:
+        raise RuntimeError("Imaging MCP: 'applications' tool not found.")
+
+    logger.info(f"select_application called with question='{question}', app_hint='{app_hint}'")
+
+    with APP_SELECTION_SECONDS.time(), span("select_app"):
+        inventory = await application_inventory.get(session, applications_tool)
+        selected = choose_application(inventory.apps, inventory.names, question, app_hint, inventory.index)
     return selected, applications_tool
 
 def find_tool(available: List[str], base: str) -> Optional[str]:
@@ -180,5 +211,17 @@ def find_tool(available: List[str], base: str) -> Optional[str]:
         logger.info("Tool '%s' not found; continuing without it.", base)
     return t
 
-def normalize_app_id(app: Dict[str, Any]) -> Any:
-    return app.get("id") or app.get("applicationId") or app.get("name")
+# Keys under which list tools return their records, in lookup order.
+RECORD_LIST_KEYS = ("items", "data", "results", "transactions", "data_graphs")
+
+def result_records(value: Any) -> List[Any]:
+    """List view of a tool result (list, {"items": [...]}-style dict, or scalar)."""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        for key in RECORD_LIST_KEYS:
+            if isinstance(value.get(key), list):
+                return value[key]
+    return [value]
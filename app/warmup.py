@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("cast-imaging-agent.warmup")
+
+WarmupStep = Tuple[str, Callable[[], Awaitable[Any]]]
+
+class Warmup:
+    """
+    Startup warm-up run in the background by the FastAPI lifespan.
+
+    Steps run in order (later ones reuse what earlier ones opened). A failing
+    step is recorded and the next one still runs. The service reports ready
+    once every step has finished or `timeout` seconds have passed, whichever
+    comes first.
+    """
+
+    def __init__(self, timeout: float = 90.0):
+        self.timeout = timeout
+        self.status = "pending"
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("ready", "degraded", "timed_out", "disabled")
+
+    def disable(self) -> None:
+        self.status = "disabled"
+
+    def start(self, steps: Sequence[WarmupStep]) -> "asyncio.Task[None]":
+        self._task = asyncio.ensure_future(self.run(steps))
+        return self._task
+
+    async def run(self, steps: Sequence[WarmupStep]) -> None:
+        self.status = "running"
+        self.started_at = time.monotonic()
+        self.steps = {name: {"status": "pending"} for name, _ in steps}
+        try:
+            await asyncio.wait_for(self._run_steps(steps), timeout=self.timeout)
+            failed = [n for n, s in self.steps.items() if s["status"] == "error"]
+            self.status = "degraded" if failed else "ready"
+        except asyncio.TimeoutError:
+            self.status = "timed_out"
+            logger.warning("Warm-up timed out after %.0fs; serving anyway", self.timeout)
+        finally:
+            self.finished_at = time.monotonic()
+        logger.info("Warm-up %s in %.2fs", self.status, self.finished_at - self.started_at)
+
+    async def _run_steps(self, steps: Sequence[WarmupStep]) -> None:
+        for name, fn in steps:
+            step = self.steps[name]
+            step["status"] = "running"
+            t0 = time.perf_counter()
+            try:
+                result = await fn()
+                step["status"] = "ok"
+                if result is not None:
+                    step["result"] = result
+            except asyncio.CancelledError:
+                step["status"] = "cancelled"
+                raise
+            except Exception as e:
+                step["status"] = "error"
+                step["error"] = str(e) or type(e).__name__
+                logger.warning("Warm-up step '%s' failed: %s", name, e)
+            finally:
+                step["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            end = self.finished_at if self.finished_at is not None else time.monotonic()
+            elapsed = round(end - self.started_at, 2)
+        return {"status": self.status, "ready": self.ready, "elapsed_s": elapsed, "steps": self.steps}
+
+async def prefetch_all(names: List[str], prefetch: Callable[[str], Awaitable[Any]]) -> Dict[str, str]:
+    """Run `prefetch` for every name concurrently; returns name -> "ok" or the error."""
+    async def one(name: str) -> str:
+        try:
+            await prefetch(name)
+            return "ok"
+        except Exception as e:
+            logger.warning("Warm-up prefetch failed for '%s': %s", name, e)
+            return f"error: {e}"
+
+    outcomes = await asyncio.gather(*(one(n) for n in names))
+    failed = [n for n, o in zip(names, outcomes) if o != "ok"]
+    if failed and len(failed) == len(names):
+        raise RuntimeError(f"every prefetch failed ({', '.join(failed)})")
+    return dict(zip(names, outcomes))
@@ -0,0 +1,185 @@
+"""
+Fake Anthropic Messages API for load tests: answers POST /v1/messages, plain or
+streamed (SSE), after a configurable time to first token and at a configurable
+token rate. Prompt caching is simulated: a prefix ending at a `cache_control`
+breakpoint that was seen before is reported as a cache read and shortens the
+time to first token. Point the agent at it with ANTHROPIC_BASE_URL=http://localhost:8299.
+
+    python -m perf.fake_anthropic --port 8299 --ttft-ms 400 --tokens-per-second 80 --output-tokens 600
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+logger = logging.getLogger("cast-imaging-agent.fake-anthropic")
+
+_WORDS = ("architecture", "transaction", "dependency", "service", "risk", "module", "data", "flow",
+          "component", "quality", "change", "impact", "database", "interface", "test", "review")
+
+class StreamingModel:
+    """Timing and size of the fake completions."""
+
+    def __init__(
+        self,
+        ttft_ms: float = 400.0,
+        tokens_per_second: float = 80.0,
+        output_tokens: int = 600,
+        chunk_tokens: int = 4,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        cached_ttft_factor: float = 0.3,
+    ):
+        self.ttft = ttft_ms / 1000.0
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.cached_ttft_factor = cached_ttft_factor
+        self.prompt_cache: set = set()
+
+    def ttft_for(self, input_tokens: int, cache_read: int) -> float:
+        """TTFT shrinks with the share of the prompt read from the cache."""
+        if not input_tokens:
+            return self.ttft
+        cached_share = min(1.0, cache_read / input_tokens)
+        return self.ttft * (1 - cached_share * (1 - self.cached_ttft_factor))
+
+    def tokens_for(self, body: Dict[str, Any]) -> int:
+        return max(1, min(int(body.get("max_tokens") or self.output_tokens), self.output_tokens))
+
+    def chunk_delay(self) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return self.chunk_tokens / self.tokens_per_second
+
+    def text_chunks(self, tokens: int) -> List[str]:
+        words = [self.rng.choice(_WORDS) + " " for _ in range(tokens)]
+        return ["".join(words[i:i + self.chunk_tokens]) for i in range(0, tokens, self.chunk_tokens)]
+
+# Shortest prefix the API caches (Sonnet-class models)
+MIN_CACHEABLE_TOKENS = 1024
+
+def _blocks(content: Any) -> List[Dict[str, Any]]:
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return [b for b in content or [] if isinstance(b, dict)]
+
+def _prompt_blocks(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    blocks = _blocks(body.get("system"))
+    for message in body.get("messages", []):
+        blocks += _blocks(message.get("content"))
+    return blocks
+
+def _input_tokens(body: Dict[str, Any]) -> int:
+    return max(1, sum(len(json.dumps(b.get("text", ""))) for b in _prompt_blocks(body)) // 4)
+
+def _cache_usage(model: "StreamingModel", body: Dict[str, Any]) -> Dict[str, int]:
+    """Prompt-cache read and write tokens for `body`, remembering its breakpoints."""
+    digest = hashlib.sha256()
+    tokens = read = written = 0
+    for block in _prompt_blocks(body):
+        text = block.get("text", "")
+        digest.update(text.encode("utf-8"))
+        tokens += len(json.dumps(text)) // 4
+        if not block.get("cache_control") or tokens < MIN_CACHEABLE_TOKENS:
+            continue
+        key = digest.hexdigest()
+        if key in model.prompt_cache:
+            read, written = tokens, 0
+        else:
+            model.prompt_cache.add(key)
+            written = tokens - read
+    return {"cache_read_input_tokens": read, "cache_creation_input_tokens": written}
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def create_app(model: StreamingModel):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI(title="Fake Anthropic Messages API")
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        if model.error_rate and model.rng.random() < model.error_rate:
+            return JSONResponse(
+                {"type": "error", "error": {"type": "overloaded_error", "message": "Injected overload"}},
+                status_code=529,
+            )
+        prompt_tokens = _input_tokens(body)
+        cache = _cache_usage(model, body)
+        input_tokens = max(0, prompt_tokens - cache["cache_read_input_tokens"] - cache["cache_creation_input_tokens"])
+        ttft = model.ttft_for(prompt_tokens, cache["cache_read_input_tokens"])
+        output_tokens = model.tokens_for(body)
+        chunks = model.text_chunks(output_tokens)
+        message_id = f"msg_fake_{uuid.uuid4().hex[:12]}"
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, **cache}
+
+        if not body.get("stream"):
+            await asyncio.sleep(ttft + model.chunk_delay() * len(chunks))
+            return {
+                "id": message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": body.get("model", "fake"),
+                "content": [{"type": "text", "text": "".join(chunks)}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": usage,
+            }
+
+        async def events() -> AsyncIterator[str]:
+            yield _sse("message_start", {"type": "message_start", "message": {
+                "id": message_id, "type": "message", "role": "assistant", "model": body.get("model", "fake"),
+                "content": [], "stop_reason": None, "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": 1, **cache},
+            }})
+            yield _sse("content_block_start", {"type": "content_block_start", "index": 0,
+                                               "content_block": {"type": "text", "text": ""}})
+            await asyncio.sleep(ttft)
+            for i, chunk in enumerate(chunks):
+                if i:
+                    await asyncio.sleep(model.chunk_delay())
+                yield _sse("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                   "delta": {"type": "text_delta", "text": chunk}})
+            yield _sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+            yield _sse("message_delta", {"type": "message_delta",
+                                         "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                         "usage": {"output_tokens": output_tokens}})
+            yield _sse("message_stop", {"type": "message_stop"})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fake Anthropic Messages API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8299)
+    parser.add_argument("--ttft-ms", type=float, default=400.0, help="delay before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="streaming speed (0 = instant)")
+    parser.add_argument("--output-tokens", type=int, default=600, help="tokens per completion (capped by max_tokens)")
+    parser.add_argument("--chunk-tokens", type=int, default=4, help="tokens per streamed delta")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 529")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cached-ttft-factor", type=float, default=0.3,
+                        help="TTFT multiplier for the cached share of a prompt")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    model = StreamingModel(args.ttft_ms, args.tokens_per_second, args.output_tokens,
+                           args.chunk_tokens, args.error_rate, args.seed, args.cached_ttft_factor)
+    uvicorn.run(create_app(model), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""
+Standalone fake CAST Imaging MCP server for load tests and benchmarks.
+
+Serves the Imaging tool names over Streamable HTTP (FastMCP) from a synthetic,
+deterministic portfolio, with configurable portfolio and payload sizes,
+per-tool latency distributions and error rates. Runs fully offline.
+
+    python -m perf.fake_imaging_mcp --port 8282 --apps 500 --graph-nodes 10000 \\
+        --latency "default=20:150,architectural_graph=400:2500" --error-rate "default=0.01"
+
+Then point the agent at it with MCP_IMAGING_URL=http://localhost:8282/mcp/.
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import math
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("cast-imaging-agent.fake-mcp")
+
+TOOL_BASES = (
+    "applications",
+    "stats",
+    "architectural_graph",
+    "quality_insights",
+    "packages",
+    "applications_transactions",
+    "applications_data_graphs",
+    "objects",
+    "object_details",
+    "object_callers",
+    "transactions_using_object",
+    "data_graphs_involving_object",
+    "inter_applications_dependencies",
+)
+
+_DOMAINS = ("Payments", "Billing", "Shopizer", "Onboarding", "Claims", "Ledger", "Inventory",
+            "Booking", "Loyalty", "Pricing", "Risk", "Portal", "Catalog", "Shipping", "Identity")
+_LAYERS = ("web", "service", "domain", "repository", "integration", "batch")
+_CLASS_NOUNS = ("Order", "Payment", "Customer", "Invoice", "Account", "Cart", "Product", "Policy",
+                "Claim", "Shipment", "Ledger", "Price", "Session", "Report", "Audit")
+_CLASS_ROLES = ("Service", "Controller", "Repository", "Mapper", "Gateway", "Validator", "Job", "Client")
+_TECHNOLOGIES = (("Java", "17"), ("Spring", "5.3"), ("Hibernate", "5.6"), ("Angular", "15"),
+                 ("JavaScript", "ES2020"), ("SQL", "PostgreSQL 14"), ("COBOL", "ENTERPRISE 6"),
+                 (".NET", "6.0"), ("Python", "3.11"), ("Kafka", "3.4"))
+_RULES = ("CyclicDependency", "AvoidSQLInLoop", "EmptyCatchBlock", "HighCyclomaticComplexity",
+          "UnclosedResource", "HardcodedCredentials", "DeadCode", "MissingIndex")
+
+def _parse_spec(spec: str) -> Dict[str, str]:
+    """Parse "name=value,name=value"; a bare value applies to every tool ("default")."""
+    out: Dict[str, str] = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, sep, value = item.partition("=")
+        if sep:
+            out[name.strip()] = value.strip()
+        else:
+            out["default"] = item
+    return out
+
+class LatencyModel:
+    """
+    Per-tool latency as a log-normal fitted to a median and a p99, in ms
+    ("default=20:150,architectural_graph=400:2500"; "stats=5" means fixed 5 ms).
+    """
+
+    def __init__(self, spec: str = "", rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+        self.params: Dict[str, Tuple[float, float]] = {}
+        for name, value in _parse_spec(spec).items():
+            median, _, p99 = value.partition(":")
+            m = max(0.0, float(median))
+            p = float(p99) if p99 else m
+            # z(0.99) = 2.326: sigma such that median * e^(2.326 sigma) = p99.
+            sigma = math.log(p / m) / 2.326 if m > 0 and p > m else 0.0
+            self.params[name] = (m, sigma)
+
+    def sample(self, tool: str) -> float:
+        """Seconds to wait before answering `tool`."""
+        median, sigma = self.params.get(tool, self.params.get("default", (0.0, 0.0)))
+        if median <= 0:
+            return 0.0
+        return median * math.exp(sigma * self.rng.gauss(0, 1)) / 1000.0
+
+class ErrorModel:
+    """Per-tool probability of failing a call ("default=0.01,object_details=0.1")."""
+
+    def __init__(self, spec: str = "", rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
+        self.rates = {name: float(value) for name, value in _parse_spec(spec).items()}
+
+    def should_fail(self, tool: str) -> bool:
+        rate = self.rates.get(tool, self.rates.get("default", 0.0))
+        return rate > 0 and self.rng.random() < rate
+
+class Portfolio:
+    """
+    Synthetic application portfolio. Everything is derived from `seed` and the
+    application index, so every run (and every server process) sees the same data.
+    """
+
+    def __init__(
+        self,
+        apps: int = 50,
+        graph_nodes: int = 200,
+        transactions: int = 100,
+        data_graphs: int = 50,
+        objects: int = 500,
+        pad_bytes: int = 0,
+        seed: int = 7,
+    ):
+        self.app_count = apps
+        self.graph_nodes = graph_nodes
+        self.transaction_count = transactions
+        self.data_graph_count = data_graphs
+        self.object_count = objects
+        self.pad = "x" * pad_bytes
+        self.seed = seed
+        self.apps = [self._make_app(i) for i in range(apps)]
+        self._by_key = {}
+        for i, app in enumerate(self.apps):
+            self._by_key[app["name"].lower()] = i
+            self._by_key[str(app["id"]).lower()] = i
+
+    def _rng(self, *parts: Any) -> random.Random:
+        return random.Random("|".join(str(p) for p in (self.seed,) + parts))
+
+    def _make_app(self, i: int) -> Dict[str, Any]:
+        rng = self._rng("app", i)
+        name = f"{_DOMAINS[i % len(_DOMAINS)]}_{i:03d}"
+        day = rng.randint(1, 28)
+        month = rng.randint(1, 12)
+        return {
+            "id": name,
+            "name": name,
+            "delivery": f"[dateTime: 2025-{month:02d}-{day:02d}T{rng.randint(0, 23):02d}:00:00, name: Onboarding-2025{month:02d}{day:02d}](",
+        }
+
+    def _padded(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        if self.pad:
+            record["description"] = self.pad
+        return record
+
+    def index(self, app_id: Any) -> int:
+        key = str(app_id).strip().lower()
+        if key not in self._by_key:
+            raise ValueError(f"Unknown application '{app_id}'")
+        return self._by_key[key]
+
+    def applications_text(self) -> str:
+        """The text listing the real Imaging server returns."""
+        blocks = [f"Available applications:\nShowing items 1-{len(self.apps)} of {len(self.apps)} total\n"]
+        for app in self.apps:
+            blocks.append(f"delivery: {app['delivery']}\nname: {app['name']}\n")
+        return "---\n".join(blocks)
+
+    @functools.lru_cache(maxsize=256)
+    def objects(self, i: int) -> List[Dict[str, Any]]:
+        rng = self._rng("objects", i)
+        app = self.apps[i]["name"].lower()
+        out = []
+        for n in range(self.object_count):
+            noun = _CLASS_NOUNS[n % len(_CLASS_NOUNS)]
+            role = _CLASS_ROLES[(n // len(_CLASS_NOUNS)) % len(_CLASS_ROLES)]
+            suffix = "" if n < len(_CLASS_NOUNS) * len(_CLASS_ROLES) else str(n)
+            layer = rng.choice(_LAYERS)
+            name = f"{noun}{role}{suffix}"
+            out.append({
+                "id": f"{app}-obj-{n}",
+                "name": name,
+                "fullName": f"com.acme.{app}.{layer}.{name}",
+                "type": "Java Class",
+                "layer": layer,
+            })
+        return out
+
+    def find_object(self, i: int, hint: str, by_id: bool) -> Optional[Dict[str, Any]]:
+        key = hint.strip().lower()
+        for obj in self.objects(i):
+            if by_id:
+                if obj["id"].lower() == key:
+                    return obj
+            elif key in (obj["name"].lower(), obj["fullName"].lower()) or obj["fullName"].lower().endswith("." + key):
+                return obj
+        return None
+
+    def stats(self, i: int) -> Dict[str, Any]:
+        rng = self._rng("stats", i)
+        return {
+            "application": self.apps[i]["name"],
+            "loc": rng.randint(20_000, 2_000_000),
+            "objects": self.object_count,
+            "files": rng.randint(200, 20_000),
+            "technologies": len(self.packages(i)["packages"]),
+        }
+
+    @functools.lru_cache(maxsize=64)
+    def architectural_graph(self, i: int, granularity: str = "components") -> Dict[str, Any]:
+        rng = self._rng("graph", i, granularity)
+        nodes = [
+            self._padded({"id": f"n{n}", "name": f"{_CLASS_NOUNS[n % len(_CLASS_NOUNS)]}{granularity[:4].title()}{n}",
+                          "type": rng.choice(_LAYERS)})
+            for n in range(self.graph_nodes)
+        ]
+        edges = []
+        if self.graph_nodes > 1:
+            for n in range(self.graph_nodes):
+                for _ in range(2):
+                    target = rng.randrange(self.graph_nodes)
+                    if target != n:
+                        edges.append({"from": f"n{n}", "to": f"n{target}", "type": "calls"})
+        return {"granularity": granularity, "nodes": nodes, "edges": edges}
+
+    def quality_insights(self, i: int) -> Dict[str, Any]:
+        rng = self._rng("quality", i)
+        return {"issues": [
+            self._padded({"rule": rule, "count": rng.randint(0, 400), "severity": rng.choice(("critical", "high", "medium"))})
+            for rule in _RULES
+        ]}
+
+    def packages(self, i: int) -> Dict[str, Any]:
+        rng = self._rng("packages", i)
+        picked = rng.sample(_TECHNOLOGIES, k=rng.randint(3, len(_TECHNOLOGIES)))
+        return {"packages": [{"name": name, "version": version} for name, version in picked]}
+
+    def transactions(self, i: int, limit: int) -> List[Dict[str, Any]]:
+        rng = self._rng("transactions", i)
+        out = []
+        for n in range(min(limit, self.transaction_count)):
+            noun = _CLASS_NOUNS[n % len(_CLASS_NOUNS)]
+            out.append(self._padded({
+                "id": f"tx-{n}",
+                "name": f"{noun}Flow{n}",
+                "entry": f"/{noun.lower()}/{n}",
+                "objects": rng.randint(5, 400),
+            }))
+        return out
+
+    def data_graphs(self, i: int, limit: int) -> List[Dict[str, Any]]:
+        rng = self._rng("data_graphs", i)
+        out = []
+        for n in range(min(limit, self.data_graph_count)):
+            noun = _CLASS_NOUNS[n % len(_CLASS_NOUNS)].lower()
+            out.append(self._padded({
+                "id": f"dg-{n}",
+                "entity": f"{noun}s_{n}",
+                "rels": [f"{rng.choice(_CLASS_NOUNS).lower()}_items" for _ in range(rng.randint(1, 4))],
+            }))
+        return out
+
+    def object_callers(self, i: int, object_id: str) -> List[Dict[str, Any]]:
+        rng = self._rng("callers", i, object_id)
+        objects = self.objects(i)
+        picks = rng.sample(range(len(objects)), k=min(len(objects), rng.randint(0, 6)))
+        return [{k: objects[n][k] for k in ("id", "name", "fullName", "type")}
+                for n in sorted(picks) if objects[n]["id"] != object_id]
+
+    def transactions_using_object(self, i: int, object_id: str, limit: int) -> List[Dict[str, Any]]:
+        rng = self._rng("txu", i, object_id)
+        count = min(limit, rng.randint(0, max(1, self.transaction_count // 5)))
+        picks = sorted(rng.sample(range(self.transaction_count), k=min(count, self.transaction_count)))
+        return [self._padded({"id": f"tx-{n}", "transaction": f"{_CLASS_NOUNS[n % len(_CLASS_NOUNS)]}Flow{n}"}) for n in picks]
+
+    def data_graphs_involving_object(self, i: int, object_id: str, limit: int) -> List[Dict[str, Any]]:
+        rng = self._rng("dgio", i, object_id)
+        count = min(limit, rng.randint(0, max(1, self.data_graph_count // 5)))
+        picks = sorted(rng.sample(range(self.data_graph_count), k=min(count, self.data_graph_count)))
+        return [self._padded({"id": f"dg-{n}", "entity": f"{_CLASS_NOUNS[n % len(_CLASS_NOUNS)].lower()}s_{n}"}) for n in picks]
+
+    def inter_applications_dependencies(self, i: int, object_id: str, limit: int) -> List[Dict[str, Any]]:
+        rng = self._rng("iad", i, object_id)
+        if self.app_count < 2:
+            return []
+        others = [n for n in range(self.app_count) if n != i]
+        picks = rng.sample(others, k=min(limit, len(others), rng.randint(0, 4)))
+        return [{"from": self.apps[i]["name"], "to": self.apps[n]["name"], "via": rng.choice(("REST", "MQ", "DB link"))} for n in picks]
+
+def build_server(
+    portfolio: Portfolio,
+    latency: LatencyModel,
+    errors: ErrorModel,
+    host: str = "127.0.0.1",
+    port: int = 8282,
+    prefix: str = "",
+    applications_format: str = "text",
+):
+    """FastMCP server exposing the Imaging tools (named `prefix + base`)."""
+    from mcp.server.fastmcp import FastMCP
+
+    server = FastMCP("fake-imaging", host=host, port=port, streamable_http_path="/mcp")
+
+    async def behave(tool: str) -> None:
+        delay = latency.sample(tool)
+        if delay:
+            await asyncio.sleep(delay)
+        if errors.should_fail(tool):
+            raise RuntimeError(f"Injected failure in {tool}")
+
+    def dump(value: Any) -> str:
+        # One JSON text block per answer, like the real server.
+        return json.dumps(value, separators=(",", ":"))
+
+    def page(records: List[Dict[str, Any]], offset: int, limit: int) -> str:
+        # List tools page with offset/limit and report the full count.
+        offset = max(0, offset)
+        return dump({"total": len(records), "offset": offset, "items": records[offset:offset + max(0, limit)]})
+
+    async def applications() -> str:
+        """List the applications of the portfolio."""
+        await behave("applications")
+        if applications_format == "json":
+            return dump({"items": portfolio.apps})
+        return portfolio.applications_text()
+
+    async def stats(app_id: str) -> str:
+        """Size and technology statistics of an application."""
+        await behave("stats")
+        return dump(portfolio.stats(portfolio.index(app_id)))
+
+    async def architectural_graph(app_id: str, granularity: str = "components") -> str:
+        """Architecture graph of an application at the given granularity."""
+        await behave("architectural_graph")
+        return dump(portfolio.architectural_graph(portfolio.index(app_id), granularity))
+
+    async def quality_insights(app_id: str) -> str:
+        """Quality rule violations of an application."""
+        await behave("quality_insights")
+        return dump(portfolio.quality_insights(portfolio.index(app_id)))
+
+    async def packages(app_id: str) -> str:
+        """Technologies and packages used by an application."""
+        await behave("packages")
+        return dump(portfolio.packages(portfolio.index(app_id)))
+
+    async def applications_transactions(app_id: str, limit: int = 50, offset: int = 0) -> str:
+        """Transactions of an application."""
+        await behave("applications_transactions")
+        return page(portfolio.transactions(portfolio.index(app_id), portfolio.transaction_count), offset, limit)
+
+    async def applications_data_graphs(app_id: str, limit: int = 50, offset: int = 0) -> str:
+        """Data graphs of an application."""
+        await behave("applications_data_graphs")
+        return page(portfolio.data_graphs(portfolio.index(app_id), portfolio.data_graph_count), offset, limit)
+
+    async def objects(app_id: str, limit: int = 50, offset: int = 0) -> str:
+        """Objects of an application."""
+        await behave("objects")
+        return page(portfolio.objects(portfolio.index(app_id)), offset, limit)
+
+    async def object_details(app_id: str, object_id: Optional[str] = None, name: Optional[str] = None) -> str:
+        """Details of one object, looked up by id or by (qualified) name."""
+        await behave("object_details")
+        i = portfolio.index(app_id)
+        obj = None
+        if object_id:
+            obj = portfolio.find_object(i, object_id, by_id=True)
+        if obj is None and name:
+            obj = portfolio.find_object(i, name, by_id=False)
+        if obj is None:
+            raise ValueError(f"Object not found: {object_id or name}")
+        return dump(obj)
+
+    async def object_callers(app_id: str, object_id: str, limit: int = 50, offset: int = 0) -> str:
+        """Objects calling an object."""
+        await behave("object_callers")
+        return page(portfolio.object_callers(portfolio.index(app_id), object_id), offset, limit)
+
+    async def transactions_using_object(app_id: str, object_id: str, limit: int = 50, offset: int = 0) -> str:
+        """Transactions that go through an object."""
+        await behave("transactions_using_object")
+        i = portfolio.index(app_id)
+        return page(portfolio.transactions_using_object(i, object_id, portfolio.transaction_count), offset, limit)
+
+    async def data_graphs_involving_object(app_id: str, object_id: str, limit: int = 50, offset: int = 0) -> str:
+        """Data graphs an object reads or writes."""
+        await behave("data_graphs_involving_object")
+        i = portfolio.index(app_id)
+        return page(portfolio.data_graphs_involving_object(i, object_id, portfolio.data_graph_count), offset, limit)
+
+    async def inter_applications_dependencies(app_id: str, object_id: str, limit: int = 50, offset: int = 0) -> str:
+        """Dependencies from an object to other applications."""
+        await behave("inter_applications_dependencies")
+        i = portfolio.index(app_id)
+        return page(portfolio.inter_applications_dependencies(i, object_id, portfolio.app_count), offset, limit)
+
+    for fn in (applications, stats, architectural_graph, quality_insights, packages,
+               applications_transactions, applications_data_graphs, objects, object_details,
+               object_callers, transactions_using_object, data_graphs_involving_object, inter_applications_dependencies):
+        server.add_tool(fn, name=prefix + fn.__name__)
+    return server
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Fake CAST Imaging MCP server (Streamable HTTP).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8282)
+    parser.add_argument("--apps", type=int, default=50, help="applications in the portfolio")
+    parser.add_argument("--graph-nodes", type=int, default=200, help="nodes per architectural graph")
+    parser.add_argument("--transactions", type=int, default=100, help="transactions per application")
+    parser.add_argument("--data-graphs", type=int, default=50, help="data graphs per application")
+    parser.add_argument("--objects", type=int, default=500, help="objects per application")
+    parser.add_argument("--pad-bytes", type=int, default=0, help="filler bytes added to each record")
+    parser.add_argument("--latency", default="", help='per-tool median[:p99] ms, e.g. "default=20:150,stats=5"')
+    parser.add_argument("--error-rate", default="", help='per-tool failure probability, e.g. "default=0.01"')
+    parser.add_argument("--tool-prefix", default="", help="prefix for tool names, e.g. bb7_")
+    parser.add_argument("--applications-format", choices=("text", "json"), default="text")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    rng = random.Random(args.seed)
+    portfolio = Portfolio(
+        apps=args.apps,
+        graph_nodes=args.graph_nodes,
+        transactions=args.transactions,
+        data_graphs=args.data_graphs,
+        objects=args.objects,
+        pad_bytes=args.pad_bytes,
+        seed=args.seed,
+    )
+    server = build_server(
+        portfolio,
+        LatencyModel(args.latency, rng),
+        ErrorModel(args.error_rate, rng),
+        host=args.host,
+        port=args.port,
+        prefix=args.tool_prefix,
+        applications_format=args.applications_format,
+    )
+    logger.info("Fake Imaging MCP on http://%s:%d/mcp/ with %d applications", args.host, args.port, args.apps)
+    server.run(transport="streamable-http")
+
+if __name__ == "__main__":
+    main()
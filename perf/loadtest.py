@@ -0,0 +1,418 @@
+"""
+End-to-end load test for the agent API.
+
+By default it starts the whole stack locally: the fake Imaging MCP server, the
+fake Anthropic endpoint and the agent (uvicorn) wired to both, waits for
+/readyz, then drives /query, /impact and /healthz either with a fixed number
+of concurrent clients (closed loop) or at a fixed arrival rate (open loop,
+Poisson). The report (latency percentiles, throughput, error rates and
+event-loop lag of both the agent and the generator) is written as JSON and
+can be checked against a baseline from a previous release.
+
+    python -m perf.loadtest --concurrency 16 --duration 30 --out perf/results/latest.json
+    python -m perf.loadtest --rate 25 --duration 60 --baseline perf/results/baseline.json
+    python -m perf.loadtest --target http://staging:8000 --concurrency 8   # existing deployment
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from .fake_imaging_mcp import Portfolio
+
+logger = logging.getLogger("cast-imaging-agent.loadtest")
+
+LAG_METRIC = "imaging_agent_event_loop_lag_seconds"
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def latency_summary(values_ms: List[float]) -> Dict[str, Optional[float]]:
+    ordered = sorted(values_ms)
+    def r(v: Optional[float]) -> Optional[float]:
+        return round(v, 2) if v is not None else None
+    return {
+        "p50": r(percentile(ordered, 50)),
+        "p95": r(percentile(ordered, 95)),
+        "p99": r(percentile(ordered, 99)),
+        "max": r(ordered[-1] if ordered else None),
+        "mean": r(sum(ordered) / len(ordered) if ordered else None),
+    }
+
+def parse_histogram(text: str, name: str) -> Tuple[List[Tuple[float, float]], float, float]:
+    """Cumulative (le, count) buckets, sum and count of an unlabelled histogram in exposition text."""
+    buckets: List[Tuple[float, float]] = []
+    total = count = 0.0
+    bucket_re = re.compile(rf'^{name}_bucket\{{le="([^"]+)"\}} (\S+)$')
+    for line in text.splitlines():
+        m = bucket_re.match(line)
+        if m:
+            le = float("inf") if m.group(1) == "+Inf" else float(m.group(1))
+            buckets.append((le, float(m.group(2))))
+        elif line.startswith(f"{name}_sum "):
+            total = float(line.split()[1])
+        elif line.startswith(f"{name}_count "):
+            count = float(line.split()[1])
+    return buckets, total, count
+
+def histogram_delta_summary(before: str, after: str, name: str) -> Dict[str, Optional[float]]:
+    """p50/p99 (bucket upper bounds) and mean, in ms, of observations made between two scrapes."""
+    b0, s0, c0 = parse_histogram(before, name)
+    b1, s1, c1 = parse_histogram(after, name)
+    start = dict(b0)
+    deltas = [(le, n - start.get(le, 0.0)) for le, n in b1]
+    observed = c1 - c0
+    if observed <= 0:
+        return {"samples": 0, "p50": None, "p99": None, "mean": None}
+
+    def quantile(q: float) -> Optional[float]:
+        target = q * observed
+        for le, n in deltas:
+            if n >= target:
+                return None if math.isinf(le) else round(le * 1000, 2)
+        return None
+
+    return {
+        "samples": int(observed),
+        "p50": quantile(0.5),
+        "p99": quantile(0.99),
+        "mean": round((s1 - s0) / observed * 1000, 3),
+    }
+
+class LoopLagProbe:
+    """Event-loop lag of the load generator itself, to tell when it is the bottleneck."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.samples_ms: List[float] = []
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def _run(self) -> None:
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples_ms.append(max(0.0, (time.perf_counter() - t0 - self.interval) * 1000))
+
+    def start(self) -> None:
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+class Workload:
+    """Builds requests for a weighted endpoint mix against the fake portfolio."""
+
+    def __init__(self, mix: Dict[str, float], portfolio: Portfolio, cache_mode: str, rng: random.Random):
+        unknown = set(mix) - {"query", "impact", "healthz"}
+        if unknown:
+            raise ValueError(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+        self.endpoints = [e for e, w in mix.items() if w > 0]
+        self.weights = [mix[e] for e in self.endpoints]
+        self.app_names = [a["name"] for a in portfolio.apps]
+        self.object_names = [o["name"] for o in portfolio.objects(0)[:50]]
+        self.cache_mode = cache_mode
+        self.rng = rng
+
+    def next(self) -> Tuple[str, str, str, Optional[Dict[str, Any]]]:
+        """(endpoint label, method, path, JSON body)"""
+        endpoint = self.rng.choices(self.endpoints, self.weights)[0]
+        app = self.rng.choice(self.app_names)
+        if endpoint == "query":
+            return endpoint, "POST", "/query", {
+                "question": f"Summarize the architecture of {app}",
+                "application_hint": app,
+                "cache_mode": self.cache_mode,
+            }
+        if endpoint == "impact":
+            return endpoint, "POST", "/impact", {
+                "question": "What breaks if we change this?",
+                "object_hint": self.rng.choice(self.object_names),
+                "application_hint": app,
+                "cache_mode": self.cache_mode,
+            }
+        return endpoint, "GET", "/healthz", None
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, int] = {}
+        self.dropped = 0
+
+    def record(self, endpoint: str, latency_ms: float, status: str, ok: bool) -> None:
+        self.latencies.setdefault(endpoint, []).append(latency_ms)
+        codes = self.statuses.setdefault(endpoint, {})
+        codes[status] = codes.get(status, 0) + 1
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+async def _send(client: httpx.AsyncClient, workload: Workload, recorder: Recorder) -> None:
+    endpoint, method, path, body = workload.next()
+    t0 = time.perf_counter()
+    try:
+        resp = await client.request(method, path, json=body)
+        status, ok = str(resp.status_code), resp.status_code < 400
+    except httpx.HTTPError as e:
+        status, ok = type(e).__name__, False
+    recorder.record(endpoint, (time.perf_counter() - t0) * 1000, status, ok)
+
+async def run_closed_loop(client, workload, recorder, concurrency: int, duration: float) -> None:
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            await _send(client, workload, recorder)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+async def run_open_loop(client, workload, recorder, rate: float, duration: float, max_in_flight: int) -> None:
+    """Poisson arrivals at `rate`/s; arrivals beyond `max_in_flight` are counted as dropped."""
+    deadline = time.perf_counter() + duration
+    in_flight: set = set()
+    rng = random.Random(workload.rng.random())
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(rng.expovariate(rate))
+        if len(in_flight) >= max_in_flight:
+            recorder.dropped += 1
+            continue
+        task = asyncio.ensure_future(_send(client, workload, recorder))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+def build_report(args: argparse.Namespace, recorder: Recorder, elapsed: float,
+                 generator_lag_ms: List[float], agent_lag: Dict[str, Any]) -> Dict[str, Any]:
+    endpoints = {}
+    all_latencies: List[float] = []
+    total_errors = 0
+    for endpoint, values in sorted(recorder.latencies.items()):
+        errors = recorder.errors.get(endpoint, 0)
+        total_errors += errors
+        all_latencies.extend(values)
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / elapsed, 3),
+            "errors": errors,
+            "error_rate": round(errors / len(values), 4),
+            "status_codes": recorder.statuses.get(endpoint, {}),
+            "latency_ms": latency_summary(values),
+        }
+    total = len(all_latencies)
+    return {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - elapsed)),
+        "config": {
+            "target": args.target or "local stack",
+            "mode": "open" if args.rate else "closed",
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "cache_mode": args.cache_mode,
+            "fake_mcp": None if args.target else args.mcp_opts,
+            "fake_anthropic": None if args.target else args.anthropic_opts,
+        },
+        "elapsed_s": round(elapsed, 3),
+        "overall": {
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 3) if elapsed else None,
+            "errors": total_errors,
+            "error_rate": round(total_errors / total, 4) if total else None,
+            "dropped": recorder.dropped,
+            "latency_ms": latency_summary(all_latencies),
+        },
+        "endpoints": endpoints,
+        "event_loop_lag_ms": {
+            "agent": agent_lag,
+            "generator": latency_summary(generator_lag_ms),
+        },
+    }
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of p95 latency, throughput or error rate beyond `tolerance`."""
+    problems = []
+    sections = [("overall", report["overall"], baseline.get("overall", {}))]
+    sections += [(name, data, baseline.get("endpoints", {}).get(name, {})) for name, data in report["endpoints"].items()]
+    for name, now, before in sections:
+        if not before:
+            continue
+        p95, base_p95 = now["latency_ms"]["p95"], (before.get("latency_ms") or {}).get("p95")
+        if p95 is not None and base_p95 and p95 > base_p95 * (1 + tolerance):
+            problems.append(f"{name}: p95 {p95:.1f} ms vs baseline {base_p95:.1f} ms")
+        rps, base_rps = now["throughput_rps"], before.get("throughput_rps")
+        if rps is not None and base_rps and rps < base_rps * (1 - tolerance):
+            problems.append(f"{name}: throughput {rps:.2f} rps vs baseline {base_rps:.2f} rps")
+        err, base_err = now["error_rate"] or 0.0, before.get("error_rate") or 0.0
+        if err > base_err + 0.01:
+            problems.append(f"{name}: error rate {err:.2%} vs baseline {base_err:.2%}")
+    return problems
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@contextmanager
+def local_stack(args: argparse.Namespace) -> Iterator[str]:
+    """Start fake MCP, fake Anthropic and the agent as subprocesses; yield the agent URL."""
+    mcp_port, llm_port, agent_port = _free_port(), _free_port(), _free_port()
+    env = dict(os.environ)
+    env.update({
+        "MCP_IMAGING_URL": f"http://127.0.0.1:{mcp_port}/mcp/",
+        "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{llm_port}",
+        "ANTHROPIC_API_KEY": "fake-key",
+        "PYTHONUNBUFFERED": "1",
+    })
+    for item in args.agent_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    log_dir = os.path.dirname(os.path.abspath(args.out)) if args.out else "."
+    os.makedirs(log_dir, exist_ok=True)
+    commands = [
+        ("fake_mcp", [sys.executable, "-m", "perf.fake_imaging_mcp", "--port", str(mcp_port),
+                      "--apps", str(args.apps), "--seed", str(args.portfolio_seed)] + args.mcp_opts.split()),
+        ("fake_anthropic", [sys.executable, "-m", "perf.fake_anthropic", "--port", str(llm_port)] + args.anthropic_opts.split()),
+        ("agent", [sys.executable, "-m", "uvicorn", "app.api.main:app", "--port", str(agent_port),
+                   "--log-level", "warning"]),
+    ]
+    procs = []
+    try:
+        for name, cmd in commands:
+            log = open(os.path.join(log_dir, f"loadtest-{name}.log"), "w")
+            procs.append((subprocess.Popen(cmd, env=env, stdout=log, stderr=subprocess.STDOUT), log))
+            if name == "fake_mcp":
+                # The agent warms up against the MCP server as soon as it starts.
+                time.sleep(1.0)
+        yield f"http://127.0.0.1:{agent_port}"
+    finally:
+        for proc, log in reversed(procs):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            log.close()
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    last = "no answer"
+    while time.perf_counter() < deadline:
+        try:
+            resp = await client.get("/readyz")
+            if resp.status_code == 200:
+                return
+            last = f"HTTP {resp.status_code}"
+        except httpx.HTTPError as e:
+            last = type(e).__name__
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"Agent not ready after {timeout:.0f}s ({last})")
+
+async def _scrape(client: httpx.AsyncClient) -> str:
+    try:
+        resp = await client.get("/metrics")
+        return resp.text if resp.status_code == 200 else ""
+    except httpx.HTTPError:
+        return ""
+
+async def run(args: argparse.Namespace, target: str) -> Dict[str, Any]:
+    mix = {k: float(v) for k, v in (item.split("=") for item in args.mix.split(",") if item)}
+    rng = random.Random(args.seed)
+    workload = Workload(mix, Portfolio(apps=args.apps, seed=args.portfolio_seed), args.cache_mode, rng)
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_in_flight) + 8)
+    async with httpx.AsyncClient(base_url=target, timeout=args.request_timeout, limits=limits) as client:
+        await wait_ready(client, args.ready_timeout)
+        if args.warmup > 0:
+            await run_closed_loop(client, workload, Recorder(), min(args.concurrency, 4), args.warmup)
+        before = await _scrape(client)
+        probe = LoopLagProbe()
+        probe.start()
+        t0 = time.perf_counter()
+        if args.rate:
+            await run_open_loop(client, workload, recorder, args.rate, args.duration, args.max_in_flight)
+        else:
+            await run_closed_loop(client, workload, recorder, args.concurrency, args.duration)
+        elapsed = time.perf_counter() - t0
+        await probe.stop()
+        after = await _scrape(client)
+    agent_lag = histogram_delta_summary(before, after, LAG_METRIC) if before and after else {}
+    return build_report(args, recorder, elapsed, probe.samples_ms, agent_lag)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test /query, /impact and /healthz.")
+    parser.add_argument("--target", default="", help="agent base URL; empty starts a local stack with fakes")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed-loop clients")
+    parser.add_argument("--rate", type=float, default=0.0, help="open-loop arrivals per second (overrides --concurrency)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="open loop: cap before arrivals are dropped")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unmeasured seconds before the run")
+    parser.add_argument("--mix", default="query=6,impact=3,healthz=1", help="endpoint weights")
+    parser.add_argument("--cache-mode", choices=("use", "bypass", "refresh"), default="bypass",
+                        help="summary cache mode sent with /query and /impact")
+    parser.add_argument("--apps", type=int, default=50, help="applications in the fake portfolio")
+    parser.add_argument("--portfolio-seed", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=1, help="workload seed")
+    parser.add_argument("--mcp-opts", default="--latency default=15:120",
+                        help="extra options for perf.fake_imaging_mcp")
+    parser.add_argument("--anthropic-opts", default="--ttft-ms 300 --tokens-per-second 200 --output-tokens 300",
+                        help="extra options for perf.fake_anthropic")
+    parser.add_argument("--agent-env", action="append", default=[], help="KEY=VALUE for the local agent, repeatable")
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--ready-timeout", type=float, default=60.0)
+    parser.add_argument("--out", default="perf/results/latest.json", help="where to write the JSON report")
+    parser.add_argument("--baseline", default="", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.target:
+        report = asyncio.run(run(args, args.target))
+    else:
+        with local_stack(args) as target:
+            report = asyncio.run(run(args, target))
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info("Report written to %s", args.out)
+
+    overall = report["overall"]
+    logger.info(
+        "%d requests, %.2f rps, p50 %s ms, p95 %s ms, p99 %s ms, error rate %s",
+        overall["requests"], overall["throughput_rps"] or 0, overall["latency_ms"]["p50"],
+        overall["latency_ms"]["p95"], overall["latency_ms"]["p99"], overall["error_rate"],
+    )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare_to_baseline(report, json.load(f), args.tolerance)
+        for problem in problems:
+            logger.error("Regression: %s", problem)
+        if problems:
+            return 1
+        logger.info("No regression against %s (tolerance %.0f%%)", args.baseline, args.tolerance * 100)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+"""
+Micro-benchmarks for the pure hot-path functions, on generated inputs at
+portfolio sizes of 10 / 1k / 50k applications and tool payloads of
+1KB / 1MB / 20MB. Each case records median and fastest time per call and
+peak traced memory; the run fails when a case regresses past the tolerance against a
+stored baseline, or when time grows much faster than input size between two
+sizes of the same function (accidental quadratic behaviour).
+
+    python -m perf.microbench                                   # full sizes, compare to the baseline
+    python -m perf.microbench --sizes quick --only parse        # 10 / 1k apps, 1KB / 1MB payloads
+    python -m perf.microbench --update-baseline                 # record a new baseline
+"""
+import argparse
+import functools
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from mcp.types import CallToolResult, TextContent
+
+from app.compaction import SUMMARY_SECTIONS, compact_payload
+from app.graph_analytics import ArchitectureGraph, analyze_graph
+from app.mcp_client import decode_tool_result
+from app.summarizers import _summary_request
+from app.name_index import NameIndex
+from app.tools import choose_application, match_tool_name, parse_applications_string
+
+from .fake_imaging_mcp import Portfolio
+
+logger = logging.getLogger("cast-imaging-agent.microbench")
+
+DEFAULT_BASELINE = "perf/results/microbench_baseline.json"
+
+APP_SIZES = {"10": 10, "1k": 1_000, "50k": 50_000}
+PAYLOAD_SIZES = {"1KB": 1 << 10, "1MB": 1 << 20, "20MB": 20 << 20}
+PRESETS = {
+    "quick": (("10", "1k"), ("1KB", "1MB")),
+    "full": (tuple(APP_SIZES), tuple(PAYLOAD_SIZES)),
+}
+
+_LAYERS = ("web", "service", "domain", "repository", "integration")
+
+class Case:
+    """One function at one input size. `setup` builds the arguments once; `fn(*args)` is timed."""
+
+    def __init__(self, function: str, size: str, n: int, setup: Callable[[], Tuple[Any, ...]], fn: Callable[..., Any]):
+        self.function = function
+        self.size = size
+        self.n = n
+        self.setup = setup
+        self.fn = fn
+
+    @property
+    def name(self) -> str:
+        return f"{self.function}[{self.size}]"
+
+@functools.lru_cache(maxsize=None)
+def applications_text(apps: int) -> str:
+    return Portfolio(apps=apps).applications_text()
+
+@functools.lru_cache(maxsize=None)
+def parsed_applications(apps: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+    parsed = parse_applications_string(applications_text(apps))
+    return parsed, [a["name"] for a in parsed]
+
+@functools.lru_cache(maxsize=None)
+def application_index(apps: int) -> NameIndex:
+    return NameIndex(parsed_applications(apps)[1])
+
+@functools.lru_cache(maxsize=None)
+def architectural_graph(nodes: int) -> Dict[str, Any]:
+    return Portfolio(apps=1, graph_nodes=nodes).architectural_graph(0)
+
+def analyze_architectural_graph(graph: Dict[str, Any]) -> Dict[str, Any]:
+    return analyze_graph(ArchitectureGraph.from_payload(graph))
+
+def _record(rng: random.Random, i: int) -> Dict[str, Any]:
+    layer = rng.choice(_LAYERS)
+    return {
+        "id": f"obj-{i}",
+        "name": f"Component{i}",
+        "fullName": f"com.acme.portfolio.{layer}.Component{i}",
+        "type": "Java Class",
+        "layer": layer,
+        "calls": [f"obj-{rng.randrange(i + 1)}" for _ in range(3)],
+    }
+
+@functools.lru_cache(maxsize=None)
+def summary_payload(target_bytes: int, seed: int = 7) -> Dict[str, Any]:
+    """Summary payload whose tool sections add up to about `target_bytes` of JSON."""
+    rng = random.Random(seed)
+    sections: Dict[str, List[Dict[str, Any]]] = {"nodes": [], "transactions": [], "data_graphs": []}
+    keys = list(sections)
+    size = i = 0
+    while size < target_bytes:
+        record = _record(rng, i)
+        sections[keys[i % len(keys)]].append(record)
+        size += len(json.dumps(record, separators=(",", ":"))) + 1
+        i += 1
+    return {
+        "question": "Summarize the architecture",
+        "selected_application": {"id": "Payments_000", "name": "Payments_000"},
+        "stats": {"objects": i, "layers": len(_LAYERS)},
+        "architectural_graph": {"nodes": sections["nodes"]},
+        "quality_insights": None,
+        "packages": None,
+        "transactions": sections["transactions"],
+        "data_graphs": sections["data_graphs"],
+    }
+
+@functools.lru_cache(maxsize=None)
+def tool_result(target_bytes: int) -> CallToolResult:
+    text = json.dumps(summary_payload(target_bytes)["architectural_graph"])
+    return CallToolResult(content=[TextContent(type="text", text=text)])
+
+def _render_compacted(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return _summary_request(compact_payload(payload, SUMMARY_SECTIONS))
+
+def build_cases(app_sizes: Sequence[str], payload_sizes: Sequence[str]) -> List[Case]:
+    cases: List[Case] = []
+    for label in app_sizes:
+        n = APP_SIZES[label]
+        cases += [
+            Case("parse_applications_string", label, n,
+                 lambda n=n: (applications_text(n),), parse_applications_string),
+            # Fuzzy path: no exact or suffix match among n names.
+            Case("match_tool_name", label, n,
+                 lambda n=n: (parsed_applications(n)[1], "Paymnts_00x"), match_tool_name),
+            Case("choose_application", label, n,
+                 lambda n=n: (*parsed_applications(n), "Summarize the architecture", "Billing_0x16", application_index(n)),
+                 choose_application),
+            Case("choose_application_question", label, n,
+                 lambda n=n: (*parsed_applications(n), "What are the main risks in Billing_0x16 today?", None,
+                              application_index(n)),
+                 choose_application),
+            Case("name_index_build", label, n, lambda n=n: (parsed_applications(n)[1],), NameIndex),
+            # An architectural graph of n components, two outgoing edges each.
+            Case("graph_analytics", label, n, lambda n=n: (architectural_graph(n),), analyze_architectural_graph),
+        ]
+    for label in payload_sizes:
+        n = PAYLOAD_SIZES[label]
+        cases += [
+            Case("decode_tool_result", label, n, lambda n=n: (tool_result(n),), decode_tool_result),
+            Case("summary_prompt", label, n, lambda n=n: (summary_payload(n),), _summary_request),
+            Case("summary_prompt_compacted", label, n, lambda n=n: (summary_payload(n),), _render_compacted),
+        ]
+    return cases
+
+def _timed(fn: Callable[..., Any], args: Tuple[Any, ...], loops: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(loops):
+        fn(*args)
+    return time.perf_counter() - t0
+
+def measure_time(fn: Callable[..., Any], args: Tuple[Any, ...], repeat: int, min_time: float) -> Dict[str, Any]:
+    """Median and min seconds per call; loops per sample grow until a sample takes `min_time`."""
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        loops = 1
+        elapsed = _timed(fn, args, loops)
+        while elapsed < min_time and loops < 1 << 20:
+            loops *= 2 if elapsed * 10 > min_time else 10
+            elapsed = _timed(fn, args, loops)
+        samples = [elapsed / loops] + [_timed(fn, args, loops) / loops for _ in range(repeat - 1)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    samples.sort()
+    return {"median_s": samples[len(samples) // 2], "min_s": samples[0], "loops": loops, "repeat": repeat}
+
+def measure_peak_memory(fn: Callable[..., Any], args: Tuple[Any, ...]) -> int:
+    """Peak bytes allocated by one call (tracemalloc), including the returned value."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        result = fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return max(0, peak - start)
+
+def run_cases(cases: Sequence[Case], repeat: int = 5, min_time: float = 0.05) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for case in cases:
+        args = case.setup()
+        timing = measure_time(case.fn, args, repeat, min_time)
+        peak = measure_peak_memory(case.fn, args)
+        results[case.name] = {
+            "function": case.function,
+            "size": case.size,
+            "n": case.n,
+            "median_ms": round(timing["median_s"] * 1000, 6),
+            "min_ms": round(timing["min_s"] * 1000, 6),
+            "loops": timing["loops"],
+            "repeat": timing["repeat"],
+            "peak_kb": round(peak / 1024, 1),
+        }
+        logger.info("%-40s %12.4f ms %12.1f KB", case.name, results[case.name]["median_ms"], results[case.name]["peak_kb"])
+    return results
+
+def scaling_problems(results: Dict[str, Dict[str, Any]], max_exponent: float, min_ms: float = 1.0) -> List[str]:
+    """
+    Cases whose time grows faster than n**max_exponent between two consecutive
+    sizes of the same function. Timings under `min_ms` are too noisy to judge.
+    """
+    by_function: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results.values():
+        by_function.setdefault(result["function"], []).append(result)
+    problems = []
+    for function, runs in sorted(by_function.items()):
+        runs.sort(key=lambda r: r["n"])
+        for small, large in zip(runs, runs[1:]):
+            if large["median_ms"] < min_ms or small["median_ms"] <= 0 or large["n"] <= small["n"]:
+                continue
+            exponent = math.log(large["median_ms"] / small["median_ms"]) / math.log(large["n"] / small["n"])
+            if exponent > max_exponent:
+                problems.append(
+                    f"{function}: time grows ~n^{exponent:.2f} from {small['size']} to {large['size']} "
+                    f"({small['median_ms']:.3f} -> {large['median_ms']:.3f} ms)"
+                )
+    return problems
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    time_tolerance: float,
+    memory_tolerance: float,
+    min_delta_ms: float = 0.05,
+    min_delta_kb: float = 64.0,
+) -> List[str]:
+    """
+    Cases slower or hungrier than the baseline by more than the tolerances
+    (and absolute floors). Time is compared on the fastest sample, which
+    moves far less between runs than the median does.
+    """
+    problems = []
+    for name, now in sorted(results.items()):
+        before = baseline.get(name)
+        if not before:
+            continue
+        t, bt = now.get("min_ms", now["median_ms"]), before.get("min_ms", before["median_ms"])
+        if t > bt * (1 + time_tolerance) and t - bt > min_delta_ms:
+            problems.append(f"{name}: {t:.3f} ms vs baseline {bt:.3f} ms (+{(t / bt - 1) * 100 if bt else math.inf:.0f}%)")
+        m, bm = now["peak_kb"], before["peak_kb"]
+        if m > bm * (1 + memory_tolerance) and m - bm > min_delta_kb:
+            problems.append(f"{name}: peak {m:.0f} KB vs baseline {bm:.0f} KB")
+    return problems
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for hot-path functions.")
+    parser.add_argument("--sizes", choices=sorted(PRESETS), default="full")
+    parser.add_argument("--only", default="", help="comma-separated substrings of function names to run")
+    parser.add_argument("--repeat", type=int, default=5, help="timed samples per case")
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per sample")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=1.0,
+                        help="allowed relative slowdown of the fastest sample")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="allowed relative peak-memory growth")
+    parser.add_argument("--max-exponent", type=float, default=1.5, help="allowed growth exponent between sizes")
+    parser.add_argument("--out", default="", help="also write the JSON report here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    # The benchmarked functions log per call; keep that out of the output, not out of the timings.
+    for name in ("cast-imaging-agent.tools", "cast-imaging-agent.compaction"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    app_sizes, payload_sizes = PRESETS[args.sizes]
+    cases = build_cases(app_sizes, payload_sizes)
+    if args.only:
+        wanted = [w.strip() for w in args.only.split(",") if w.strip()]
+        cases = [c for c in cases if any(w in c.function for w in wanted)]
+    results = run_cases(cases, repeat=args.repeat, min_time=args.min_time)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "results": results,
+    }
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    problems = scaling_problems(results, args.max_exponent)
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f).get("results", {})
+        baseline.update(results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({**report, "results": dict(sorted(baseline.items()))}, f, indent=2)
+        logger.info("Baseline written to %s", args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+        problems += compare_to_baseline(results, baseline, args.time_tolerance, args.memory_tolerance)
+    else:
+        logger.warning("No baseline at %s; only checking scaling", args.baseline)
+
+    for problem in problems:
+        logger.error("Regression: %s", problem)
+    if not problems:
+        logger.info("%d cases, no regression", len(results))
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
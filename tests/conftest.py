@@ -7,6 +7,7 @@ class FakeSession:
             SimpleNamespace(name="applications"),
             SimpleNamespace(name="stats"),
             SimpleNamespace(name="object_details"),
+            SimpleNamespace(name="object_callers"),
             SimpleNamespace(name="transactions_using_object"),
             SimpleNamespace(name="data_graphs_involving_object"),
             SimpleNamespace(name="inter_applications_dependencies"),
@@ -22,12 +23,21 @@ class FakeSession:
     async def call_tool(self, tool_name, args):
         return fake_call_tool(self, tool_name, args)
 
+# Callers of the impact object: two direct callers, both called by a gateway.
+FAKE_CALLERS = {
+    "obj-123": [{"id": "obj-a", "name": "CheckoutController"}, {"id": "obj-b", "name": "RefundJob"}],
+    "obj-a": [{"id": "obj-c", "name": "ApiGateway"}],
+    "obj-b": [{"id": "obj-c", "name": "ApiGateway"}],
+}
+
 def fake_call_tool(session, tool_name, args):
     # Impact service tools
     if tool_name.endswith("applications"):
         return {"items": [{"id": "app1", "name": "Payments"}]}
     if tool_name.endswith("object_details"):
         return {"id": "obj-123", "name": args.get("name") or args.get("object") or args.get("object_id")}
+    if tool_name.endswith("object_callers"):
+        return FAKE_CALLERS.get(args.get("object_id"), [])
     if tool_name.endswith("transactions_using_object"):
         return [{"transaction": "Checkout", "calls": ["OrderService.place"]}]
     if tool_name.endswith("data_graphs_involving_object"):
@@ -66,7 +76,21 @@ def fake_imaging_session():
 def mock_mcp_client():
     """Mock MCP client globally for all tests"""
     from app import mcp_client
+    from app.tool_catalog import tool_catalog_cache
+    from app.tools import application_inventory
+    from app.result_cache import tool_result_cache
+    from app.summary_cache import summary_cache
+    from app.tool_args import shape_memory
+    from app.call_graph import call_graph_store
     
+    tool_catalog_cache.invalidate()
+    shape_memory.clear()
+    application_inventory.invalidate()
+    # Tests run without the SQLite tiers, so dropping the memory tier clears them.
+    tool_result_cache.store.memory.clear()
+    summary_cache.store.memory.clear()
+    call_graph_store.clear()
+
     # Set the test implementation hook
     mcp_client.imaging_session._test_implementation = fake_imaging_session
     
@@ -1,3 +1,4 @@
+import json
 import pytest
 import httpx
 from types import SimpleNamespace
@@ -15,8 +16,15 @@ pytestmark = pytest.mark.asyncio
 def patch_llm_summarizers(monkeypatch):
     # Patch LLM summarizers imported in the API module
     import app.api.main as api_main
-    monkeypatch.setattr(api_main, "summarize_with_anthropic", lambda payload: "SUMMARY OK")
-    monkeypatch.setattr(api_main, "summarize_impact_with_anthropic", lambda payload: "IMPACT OK")
+
+    async def fake_summary(payload, **kwargs):
+        return "SUMMARY OK"
+
+    async def fake_impact(payload, **kwargs):
+        return "IMPACT OK"
+
+    monkeypatch.setattr(api_main, "summarize_with_anthropic_async", fake_summary)
+    monkeypatch.setattr(api_main, "summarize_impact_with_anthropic_async", fake_impact)
     yield
 
 # --------------------------
@@ -51,3 +59,157 @@ async def test_impact_route_ok():
         assert data["application"]["name"] == "Payments"
         assert data["object"]["id"] == "obj-123"
         assert data["summary"] == "IMPACT OK"
+
+def _parse_sse(text):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+async def test_query_stream_route_emits_metadata_deltas_done(monkeypatch):
+    import app.api.main as api_main
+
+    async def fake_stream(payload, **kwargs):
+        for chunk in ["SUMMARY ", "OK"]:
+            yield {"type": "delta", "text": chunk}
+        yield {"type": "usage", "usage": {"input_tokens": 10, "output_tokens": 2}, "stop_reason": "end_turn"}
+
+    monkeypatch.setattr(api_main, "stream_summary_with_anthropic", fake_stream)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post("/query/stream", json={"question": "Summarize", "application_hint": "Payments"})
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = _parse_sse(resp.text)
+    assert [e for e, _ in events] == ["metadata", "delta", "delta", "done"]
+    assert events[0][1]["application"]["name"] == "Payments"
+    assert "".join(d["text"] for e, d in events if e == "delta") == "SUMMARY OK"
+    assert events[-1][1]["usage"]["output_tokens"] == 2
+    assert events[-1][1]["timings"]["ttft_ms"] is not None
+
+async def test_impact_stream_route_reports_llm_error(monkeypatch):
+    import app.api.main as api_main
+
+    async def failing_stream(payload, **kwargs):
+        raise RuntimeError("rate limited")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(api_main, "stream_impact_with_anthropic", failing_stream)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post("/impact/stream", json={"object_hint": "OrderService", "application_hint": "Payments"})
+        events = _parse_sse(resp.text)
+    assert events[0][0] == "metadata"
+    assert events[0][1]["object"]["id"] == "obj-123"
+    assert events[-1] == ("error", {"phase": "llm", "error": "rate limited", "error_type": "RuntimeError"})
+
+async def test_impact_stream_metadata_carries_the_uncompacted_object(monkeypatch):
+    import app.api.main as api_main
+
+    async def fake_stream(payload, **kwargs):
+        assert payload["object_details"] == "(trimmed)"
+        yield {"type": "delta", "text": "OK"}
+
+    def trimming(payload, sections):
+        return {**payload, "object_details": "(trimmed)", "compaction": {"trimmed": ["object_details"]}}
+
+    monkeypatch.setattr(api_main, "stream_impact_with_anthropic", fake_stream)
+    monkeypatch.setattr(api_main, "compact_payload", trimming)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post("/impact/stream", json={"object_hint": "OrderService", "application_hint": "Payments"})
+        events = _parse_sse(resp.text)
+    assert events[0][1]["object"]["id"] == "obj-123"
+    assert events[0][1]["compaction"] == {"trimmed": ["object_details"]}
+    assert events[0][1]["transitive_impact"] is None
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post(
+            "/impact/stream", json={"object_hint": "OrderService", "application_hint": "Payments", "depth": 2}
+        )
+        events = _parse_sse(resp.text)
+    impacted = events[0][1]["transitive_impact"]["impacted"]
+    assert [e["name"] for e in impacted] == ["CheckoutController", "RefundJob", "ApiGateway"]
+
+async def test_identical_concurrent_queries_share_one_mcp_fetch(monkeypatch):
+    import asyncio
+    import app.api.main as api_main
+    calls = []
+
+    async def slow_fetch(question, app_hint=None):
+        calls.append(question)
+        await asyncio.sleep(0.05)
+        return {"selected_application": {"name": "Payments"}}
+
+    monkeypatch.setattr(api_main, "fetch_application_summary", slow_fetch)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = await asyncio.gather(
+            client.post("/query", json={"question": "Summarize Payments", "application_hint": "Payments"}),
+            client.post("/query", json={"question": "summarize  payments", "application_hint": "payments"}),
+        )
+    assert [r.status_code for r in responses] == [200, 200]
+    assert len(calls) == 1
+
+async def test_impact_batch_route_ok(monkeypatch):
+    import app.api.main as api_main
+    seen = {}
+
+    async def fake_batch_summary(payload, per_object=True, **kwargs):
+        seen["per_object"] = per_object
+        return "BATCH OK"
+
+    monkeypatch.setattr(api_main, "summarize_impact_batch_with_anthropic_async", fake_batch_summary)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post(
+            "/impact/batch",
+            json={"object_hints": ["OrderService", "PaymentService"], "application_hint": "Payments", "include_per_object": False},
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+    assert data["summary"] == "BATCH OK"
+    assert [o["object_hint"] for o in data["objects"]] == ["OrderService", "PaymentService"]
+    assert seen["per_object"] is False
+
+async def test_query_route_map_reduce_mode(monkeypatch):
+    import app.api.main as api_main
+    seen = []
+
+    async def fake_map(payload, cache_mode="use"):
+        seen.append(cache_mode)
+        return {**payload, "transactions": "(Summarized from 2 records in 1 part.)", "map_reduce": {"map_calls": 1}}
+
+    monkeypatch.setattr(api_main, "map_sections_async", fake_map)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post("/query", json={"question": "Summarize", "application_hint": "Payments"})
+        assert resp.json()["map_reduce"] is None  # small data stays on one prompt in "auto" mode
+        resp = await client.post(
+            "/query",
+            json={"question": "Summarize", "application_hint": "Payments", "summary_mode": "map_reduce", "cache_mode": "bypass"},
+        )
+    assert resp.status_code == 200
+    assert resp.json()["map_reduce"] == {"map_calls": 1}
+    assert seen == ["bypass"]
+
+async def test_objects_complete_route(monkeypatch, tmp_path):
+    from app.services import impact_service
+    from app.symbol_index import SymbolIndexStore, symbol_index_store
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        monkeypatch.setattr(symbol_index_store, "enabled", False)
+        assert (await client.get("/objects/complete", params={"prefix": "Ord"})).status_code == 404
+
+        monkeypatch.setattr(symbol_index_store, "enabled", True)
+        store = SymbolIndexStore(str(tmp_path))
+        index = await store.build("app1", None, [{"id": "obj-1", "name": "OrderService"}], endpoint="e")
+        monkeypatch.setattr(impact_service, "application_symbols", lambda app: index)
+        resp = await client.get("/objects/complete", params={"prefix": "Ord", "application": "Payments"})
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["ready"] is True and body["application"]["name"] == "Payments"
+        assert [o["name"] for o in body["objects"]] == ["OrderService"]
+        store.clear()
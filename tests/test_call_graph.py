@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from app.call_graph import CallGraph, CallGraphStore, traverse_callers
+
+pytestmark = pytest.mark.asyncio
+
+# root <- a, b; a <- c, d; b <- c; c <- e; d <- root (a cycle back to the root)
+CALLERS = {
+    "root": ["a", "b"],
+    "a": ["c", "d"],
+    "b": ["c"],
+    "c": ["e"],
+    "d": ["root"],
+}
+
+class Fetcher:
+    def __init__(self, callers=CALLERS, delay=0.0):
+        self.callers = callers
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, object_id):
+        self.calls.append(object_id)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return [{"id": c, "name": c.upper()} for c in self.callers.get(object_id, [])], False
+
+async def _traverse(graph, fetcher, store, **limits):
+    options = {"depth": 4, "fan_out": 50, "max_nodes": 500, "concurrency": 8, **limits}
+    return await traverse_callers(graph, {"id": "root", "name": "Root"}, fetcher, store=store, **options)
+
+async def test_breadth_first_ranking_counts_shortest_paths():
+    result = await _traverse(CallGraph(), Fetcher(), CallGraphStore())
+
+    by_id = {e["id"]: e for e in result["impacted"]}
+    assert set(by_id) == {"a", "b", "c", "d", "e"}  # the root is not reported, even through the cycle
+    assert (by_id["c"]["distance"], by_id["c"]["paths"], by_id["c"]["score"]) == (2, 2, 1.0)
+    assert (by_id["e"]["distance"], by_id["e"]["paths"]) == (3, 2)
+    assert by_id["d"]["via"] == "a" and by_id["d"]["name"] == "D"
+    assert [e["id"] for e in result["impacted"]] == ["a", "b", "c", "e", "d"]
+    assert [lvl["reached"] for lvl in result["levels"]] == [2, 2, 1, 0]
+    assert not result["truncated"]
+
+async def test_depth_fan_out_and_node_caps():
+    store = CallGraphStore()
+    shallow = await _traverse(CallGraph(), Fetcher(), store, depth=1)
+    assert [e["id"] for e in shallow["impacted"]] == ["a", "b"]
+
+    # One caller expanded per level: b is reached but not expanded, so c has a single path.
+    fanned = await _traverse(CallGraph(), Fetcher(), store, fan_out=1)
+    assert fanned["truncated"] and fanned["levels"][0]["truncated"]
+    assert {e["id"]: e["paths"] for e in fanned["impacted"]}["c"] == 1
+
+    capped = await _traverse(CallGraph(), Fetcher(), store, max_nodes=3)
+    assert len(capped["impacted"]) == 3 and capped["truncated"]
+
+async def test_cached_edges_are_not_fetched_again():
+    store = CallGraphStore()
+    graph = store.graph("http://imaging", "app1", "2025-01-01")
+    fetcher = Fetcher()
+    first = await _traverse(graph, fetcher, store)
+    fetched = len(fetcher.calls)
+    assert fetched == 6 and store.fetched == 6
+
+    second = await _traverse(graph, fetcher, store)
+    assert len(fetcher.calls) == fetched
+    assert second["impacted"] == first["impacted"]
+    assert store.stats()["graphs"]["http://imaging#app1"] == {"delivery": "2025-01-01", "objects": 6, "edges": 7}
+
+    # A new delivery is a new graph; invalidation drops the application's graphs.
+    assert store.graph("http://imaging", "app1", "2025-02-01") is not graph
+    store.invalidate_applications("http://imaging", {"app1"})
+    assert store.stats()["graphs"] == {}
+
+async def test_concurrent_traversals_share_fetches_under_the_bound():
+    store = CallGraphStore()
+    graph = CallGraph()
+    wide = {"root": [f"n{i}" for i in range(20)]}
+    fetcher = Fetcher(wide, delay=0.01)
+    results = await asyncio.gather(*(_traverse(graph, fetcher, store, depth=2, concurrency=4) for _ in range(3)))
+
+    assert all(len(r["impacted"]) == 20 for r in results)
+    assert sorted(fetcher.calls) == sorted(["root"] + wide["root"])
+    assert fetcher.max_in_flight <= 4
+
+async def test_a_graph_replacing_an_evicted_one_fetches_on_its_own():
+    store = CallGraphStore(max_graphs=1)
+    old = store.graph("http://imaging", "app1", "2025-01-01")
+    new = store.graph("http://imaging", "app1", "2025-02-01")  # evicts the old graph
+    assert (new.app_id, new.version) == ("app1", old.version + 1)
+
+    fetcher = Fetcher(delay=0.01)
+    await asyncio.gather(*(store.expand(g, g.intern("root"), fetcher) for g in (old, new)))
+    assert fetcher.calls == ["root", "root"]
+    assert new.callers(0) is not None and old.callers(0) is not None
+
+async def test_failed_fetches_are_reported_and_skipped():
+    store = CallGraphStore()
+
+    async def flaky(object_id):
+        if object_id == "a":
+            raise RuntimeError("boom")
+        return await Fetcher()(object_id)
+
+    result = await _traverse(CallGraph(), flaky, store)
+    assert result["truncated"]
+    assert result["levels"][1]["failed"] == 1
+    assert "d" not in {e["id"] for e in result["impacted"]}  # only reachable through a
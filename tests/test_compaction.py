@@ -0,0 +1,61 @@
+from app.compaction import (
+    compact_payload,
+    compact_section,
+    compaction_note,
+    drop_empty,
+    hoist_common_fields,
+    render_value,
+)
+
+def test_render_value_is_minified_and_keeps_strings():
+    assert render_value({"a": [1, 2]}) == '{"a":[1,2]}'
+    assert render_value("plain text") == "plain text"
+
+def test_drop_empty_and_hoist_common_fields_are_lossless():
+    assert drop_empty({"a": None, "b": "", "c": [], "d": {"e": {}}, "f": 0}) == {"f": 0}
+
+    rows = [{"app": "shop", "type": "Java", "id": i} for i in range(3)]
+    hoisted = hoist_common_fields(rows)
+    assert hoisted["_common"] == {"app": "shop", "type": "Java"}
+    assert hoisted["_records"] == [{"id": 0}, {"id": 1}, {"id": 2}]
+
+def test_small_section_is_only_minified():
+    value, report = compact_section({"name": "A", "empty": None}, budget=100)
+    assert value == {"name": "A"}
+    assert report["strategy"] == "minified"
+
+def test_long_lists_are_sampled_with_their_count():
+    records = [{"id": i, "name": f"transaction-{i}"} for i in range(500)]
+    value, report = compact_section(records, budget=300)
+    assert value["_count"] == 500
+    assert len(value["_sample"]) < 500
+    assert report["strategy"].startswith("sampled:")
+    assert report["compacted_tokens"] <= 300
+
+def test_unsampleable_section_is_truncated():
+    value, report = compact_section("x" * 10000, budget=50)
+    assert report["strategy"] == "truncated"
+    assert value.endswith("…[truncated to fit prompt budget]")
+    assert report["compacted_tokens"] <= 50
+
+def test_lowest_priority_sections_are_degraded_first():
+    big = [{"id": i, "label": f"node-{i}"} for i in range(400)]
+    payload = {"question": "q", "stats": {"objects": 10}, "transactions": big, "data_graphs": big}
+    out = compact_payload(payload, ("stats", "transactions", "data_graphs"), section_budget=4000, total_budget=3500)
+
+    sections = out["compaction"]["sections"]
+    assert sections["data_graphs"].get("degraded")
+    assert "degraded" not in sections["stats"]
+    assert sections["data_graphs"]["compacted_tokens"] < sections["transactions"]["compacted_tokens"]
+    assert "degraded" not in sections["transactions"]
+    assert out["compaction"]["compacted_tokens"] <= 3500
+    assert out["compaction"]["lossy"]
+    assert "_count" in compaction_note(out)
+    # The input payload is left untouched.
+    assert payload["transactions"] is big and "compaction" not in payload
+
+def test_missing_sections_are_skipped():
+    out = compact_payload({"stats": {"a": 1}}, ("stats", "packages"))
+    assert set(out["compaction"]["sections"]) == {"stats"}
+    assert not out["compaction"]["lossy"]
+    assert compaction_note(out) == ""
@@ -0,0 +1,72 @@
+import pytest
+
+# Bound at import: conftest swaps call_tool for an in-process fake.
+from app.mcp_client import MCPToolError, call_tool, list_tool_specs
+from app.paging import PageStats, fetch_paged
+from app.symbol_index import objects_tool
+from app.tool_catalog import ToolCatalog
+from app.tools import parse_applications_string
+from perf.fake_imaging_mcp import ErrorModel, LatencyModel, Portfolio, build_server
+
+def test_portfolio_is_deterministic_and_sized():
+    a = Portfolio(apps=30, graph_nodes=100, objects=50, seed=3)
+    b = Portfolio(apps=30, graph_nodes=100, objects=50, seed=3)
+    assert a.apps == b.apps
+    assert a.architectural_graph(4) == b.architectural_graph(4)
+    assert len(a.architectural_graph(4)["nodes"]) == 100
+    assert len(a.transactions(0, limit=20)) == 20
+
+    # The text listing parses with the agent's own parser.
+    parsed = parse_applications_string(a.applications_text())
+    assert [p["name"] for p in parsed] == [app["name"] for app in a.apps]
+
+    obj = a.find_object(0, "OrderService", by_id=False)
+    assert a.find_object(0, obj["id"], by_id=True) == obj
+    assert a.find_object(0, "OrderService", by_id=True) is None
+
+def test_latency_and_error_models():
+    latency = LatencyModel("default=10:100,stats=5")
+    assert latency.sample("stats") == pytest.approx(0.005)
+    samples = [latency.sample("packages") for _ in range(2000)]
+    assert 0.007 < sorted(samples)[1000] < 0.013
+    assert ErrorModel("object_details=1").should_fail("object_details")
+    assert not ErrorModel("object_details=1").should_fail("stats")
+
+@pytest.mark.asyncio
+async def test_agent_talks_to_the_fake_server_in_memory():
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    server = build_server(Portfolio(apps=5, objects=40), LatencyModel(), ErrorModel(), prefix="bb7_")
+    async with create_connected_server_and_client_session(server._mcp_server) as session:
+        specs = await list_tool_specs(session)
+        catalog = ToolCatalog([s["name"] for s in specs], {s["name"]: s["input_schema"] for s in specs})
+        od_tool = catalog.resolve("object_details")
+        assert od_tool == "bb7_object_details"
+        assert catalog.args(od_tool, app_id="Payments_000", limit=5) == {"app_id": "Payments_000"}
+
+        obj = await call_tool(session, od_tool, {"app_id": "Payments_000", "name": "OrderService"})
+        assert obj["name"] == "OrderService"
+
+        # List tools page by offset and report their total.
+        tx_tool = catalog.resolve("applications_transactions")
+        assert catalog.paging(tx_tool) == "offset"
+        stats = PageStats()
+        items = await fetch_paged(lambda args: call_tool(session, tx_tool, args), catalog, tx_tool, stats, app_id="Payments_000")
+        assert [t["id"] for t in items] == [f"tx-{n}" for n in range(100)]
+        assert (stats.total, stats.pages, stats.truncated) == (100, 2, False)
+
+        # The objects list feeds the local symbol index.
+        objects = objects_tool(catalog)
+        assert objects == "bb7_objects"
+        records = await fetch_paged(lambda args: call_tool(session, objects, args), catalog, objects,
+                                    max_items=1000, max_tokens=None, app_id="Payments_000")
+        assert len(records) == 40 and records[0]["fullName"].endswith(records[0]["name"])
+
+        callers_tool = catalog.resolve("object_callers")
+        callers = await fetch_paged(lambda args: call_tool(session, callers_tool, args), catalog, callers_tool,
+                                    app_id="Payments_000", object_id=records[0]["id"])
+        assert all(c["id"] != records[0]["id"] and c["id"].startswith("payments_000-obj-") for c in callers)
+
+        # Tool errors come back with isError set and are raised, not returned as text.
+        with pytest.raises(MCPToolError, match="Object not found"):
+            await call_tool(session, od_tool, {"app_id": "Payments_000", "name": "Nope"})
@@ -0,0 +1,78 @@
+from app.graph_analytics import (
+    ArchitectureGraph,
+    analyze_graph,
+    is_graph_analysis,
+    pagerank,
+    parse_layer_order,
+    strongly_connected_components,
+    with_graph_analytics,
+)
+from app.summarizers import _prompt_text, _summary_request
+
+LAYERS = parse_layer_order("web|ui,service,repository|dao")
+
+def _graph():
+    # ui -> svc1, svc2 -> repo; svc1 <-> svc2 form a cycle; repo -> ui breaks layering.
+    nodes = [
+        {"id": "ui", "name": "OrderUI", "type": "Web"},
+        {"id": "s1", "name": "OrderService", "type": "service"},
+        {"id": "s2", "name": "PaymentService", "type": "Service"},
+        {"id": "db", "name": "OrderDao", "type": "dao"},
+        {"id": "x", "name": "Orphan", "type": "batch"},
+    ]
+    edges = [
+        {"from": "ui", "to": "s1"}, {"from": "ui", "to": "s1"},  # parallel edges merge
+        {"from": "s1", "to": "s2"}, {"from": "s2", "to": "s1"},
+        {"source": "s1", "target": "db"}, {"from": "s2", "to": "db"},
+        {"from": "db", "to": "ui"}, {"from": "db", "to": "db"}, {"from": "s1", "to": "gone"},
+    ]
+    return {"granularity": "components", "nodes": nodes, "edges": edges}
+
+def test_csr_holds_merged_edges_both_ways():
+    g = ArchitectureGraph.from_payload(_graph())
+    assert len(g) == 5 and g.edge_count == 6
+    assert (g.self_loops, g.dangling) == (1, 1)
+    assert list(g.targets(1)) == [2, 3]
+    assert [g.fan_in(v) for v in range(5)] == [1, 2, 1, 2, 0]
+    assert ArchitectureGraph.from_payload({"issues": []}) is None
+    assert ArchitectureGraph.from_payload("text") is None
+
+def test_cycles_and_centrality():
+    g = ArchitectureGraph.from_payload(_graph())
+    assert [sorted(c) for c in strongly_connected_components(g)] == [[0, 1, 2, 3]]
+    chain = ArchitectureGraph([{"id": i} for i in range(4)], [(0, 1), (1, 2), (2, 3)])
+    assert strongly_connected_components(chain) == []
+    rank = pagerank(chain)
+    assert abs(sum(rank) - 1.0) < 1e-9
+    assert rank == sorted(rank)  # the deepest callee ranks highest
+
+def test_analysis_reports_metrics_hotspots_and_layering():
+    a = analyze_graph(ArchitectureGraph.from_payload(_graph()), top_k=2, layer_order=LAYERS)
+    assert (a["nodes"], a["edges"], a["isolated_nodes"], a["max_fan_in"]) == (5, 6, 1, 2)
+    assert a["cycles"]["count"] == 1 and a["cycles"]["largest_size"] == 4
+    assert a["layering"]["violations"] == 1
+    assert a["layering"]["examples"] == [
+        {"from": "OrderDao", "to": "OrderUI", "from_layer": "repository", "to_layer": "web"}
+    ]
+    assert len(a["hotspots"]) == 2
+    assert a["hotspots"][0]["name"] == "OrderService" and a["hotspots"][0]["cycle_size"] == 4
+
+def test_summary_prompt_gets_the_analysis_instead_of_the_graph():
+    payload = {"question": "q", "selected_application": {"name": "Payments"}, "architectural_graph": _graph()}
+    analyzed = with_graph_analytics(payload, top_k=3)
+    arch = analyzed["architectural_graph"]
+    assert is_graph_analysis(arch) and arch["granularity"] == "components"
+    assert payload["architectural_graph"] == _graph()
+
+    prompt = _prompt_text(_summary_request(analyzed))
+    assert "Architectural Graph (metrics and top hotspots by centrality)" in prompt
+    assert "Orphan" not in prompt
+
+    # Anything that is not a node/edge graph goes to the prompt unchanged.
+    other = {**payload, "architectural_graph": "graph unavailable"}
+    assert with_graph_analytics(other) is other
+
+def test_pagerank_stops_at_the_iteration_cap():
+    chain = ArchitectureGraph([{"id": i} for i in range(4)], [(0, 1), (1, 2), (2, 3)])
+    assert pagerank(chain, iterations=1) != pagerank(chain)
+    assert pagerank(chain, iterations=0) == [0.25] * 4
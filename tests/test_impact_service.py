@@ -19,3 +19,34 @@ async def test_fetch_impact_analysis_happy_path():
     assert payload["transactions_using_object"][0]["transaction"] == "Checkout"
     assert payload["data_graphs_involving_object"][0]["entity"] == "orders"
     assert payload["inter_applications_dependencies"][0]["to"] == "billing"
+
+async def test_fetch_impact_batch_dedupes_shared_records():
+    from app.services.impact_service import fetch_impact_batch
+
+    payload = await fetch_impact_batch(
+        "What breaks?",
+        object_hints=["OrderService", "PaymentService", "OrderService"],
+        app_hint="Payments",
+    )
+    assert payload["selected_application"]["name"] == "Payments"
+    assert [o["object_hint"] for o in payload["objects"]] == ["OrderService", "PaymentService"]
+    assert payload["failed_objects"] == []
+    # Both objects reach the same Checkout transaction: reported once, attributed twice.
+    assert len(payload["transactions"]) == 1
+    assert payload["transactions"][0]["objects"] == ["OrderService", "PaymentService"]
+    assert payload["transactions"][0]["record"]["transaction"] == "Checkout"
+
+async def test_fetch_impact_analysis_follows_callers_with_depth():
+    from app.call_graph import call_graph_store
+
+    shallow = await fetch_impact_analysis("What breaks?", object_hint="OrderService", app_hint="Payments")
+    assert shallow["transitive_impact"] is None
+
+    payload = await fetch_impact_analysis("What breaks?", object_hint="OrderService", app_hint="Payments", depth=3)
+    impacted = payload["transitive_impact"]["impacted"]
+    assert [e["name"] for e in impacted] == ["CheckoutController", "RefundJob", "ApiGateway"]
+    assert impacted[2]["distance"] == 2 and impacted[2]["paths"] == 2
+
+    fetched = call_graph_store.fetched
+    await fetch_impact_analysis("What else?", object_hint="OrderService", app_hint="Payments", depth=3)
+    assert call_graph_store.fetched == fetched
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+
+from app.inventory import ApplicationInventoryCache, delivery_timestamp
+
+pytestmark = pytest.mark.asyncio
+
+def make_loader(deliveries):
+    calls = []
+
+    async def loader(session, tool):
+        calls.append(tool)
+        return [{"id": name, "name": name, "delivery": f"[dateTime: {dt}, name: Onboarding](" }
+                for name, dt in deliveries.items()]
+
+    return loader, calls
+
+async def test_delivery_timestamp_from_parsed_string():
+    app = {"name": "Shopizer", "delivery": "[dateTime: 2025-06-19T14:51:00, name: Onboarding-202506191451]("}
+    assert delivery_timestamp(app) == "2025-06-19T14:51:00"
+    assert delivery_timestamp({"delivery": {"dateTime": "2025-01-01"}}) == "2025-01-01"
+    assert delivery_timestamp({"name": "x"}) is None
+
+async def test_fresh_inventory_is_served_without_refetch():
+    loader, calls = make_loader({"Payments": "2025-01-01"})
+    cache = ApplicationInventoryCache(loader, ttl=60)
+    first = await cache.get(None, "applications", key="k")
+    second = await cache.get(None, "applications", key="k")
+    assert first is second
+    assert calls == ["applications"]
+    assert first.names == ["Payments"]
+
+async def test_stale_inventory_is_served_while_refreshing(monkeypatch):
+    deliveries = {"Payments": "2025-01-01"}
+    loader, calls = make_loader(deliveries)
+    cache = ApplicationInventoryCache(loader, ttl=0, max_stale=60)
+    changes = []
+    cache.add_listener(lambda key, changed: changes.append(changed))
+    old = await cache.get(None, "applications", key="k")
+
+    deliveries["Payments"] = "2025-02-01"
+    served = await cache.get(None, "applications", key="k")
+    assert served is old  # returned immediately, refresh runs in background
+    await asyncio.gather(*cache._refreshing.values())
+
+    assert cache.peek("k") is not old
+    assert cache.peek("k").deliveries["Payments"] == "2025-02-01"
+    assert changes == [{"Payments"}]
+    assert cache.stats()["stale_hits"] == 1
+
+async def test_refresh_updates_the_name_index_in_place():
+    deliveries = {"Payments": "2025-01-01", "Billing": "2025-01-01"}
+    loader, _ = make_loader(deliveries)
+    cache = ApplicationInventoryCache(loader, ttl=60)
+    first = await cache.refresh(None, "applications", key="k")
+    del deliveries["Billing"]
+    deliveries["Claims"] = "2025-02-01"
+    second = await cache.refresh(None, "applications", key="k")
+    assert second.index is first.index
+    assert second.index.search("claims", limit=1)[0][0] == "Claims"
+    assert "Billing" not in second.index
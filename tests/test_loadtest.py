@@ -0,0 +1,84 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.metrics import EVENT_LOOP_LAG_SECONDS, registry, watch_event_loop_lag
+from perf.fake_anthropic import StreamingModel, create_app
+from perf.loadtest import LAG_METRIC, compare_to_baseline, histogram_delta_summary, latency_summary, percentile
+
+def test_percentiles_use_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+    summary = latency_summary([3.0, 1.0, 2.0])
+    assert summary["p50"] == 2.0 and summary["max"] == 3.0 and summary["mean"] == 2.0
+
+def _report(p95: float, rps: float, error_rate: float):
+    section = {"latency_ms": {"p95": p95}, "throughput_rps": rps, "error_rate": error_rate}
+    return {"overall": section, "endpoints": {"query": dict(section)}}
+
+def test_baseline_comparison_flags_regressions_only():
+    baseline = _report(p95=100.0, rps=50.0, error_rate=0.0)
+    assert compare_to_baseline(_report(115.0, 45.0, 0.005), baseline, tolerance=0.2) == []
+
+    problems = compare_to_baseline(_report(130.0, 30.0, 0.05), baseline, tolerance=0.2)
+    assert any("overall: p95" in p for p in problems)
+    assert any("query: throughput" in p for p in problems)
+    assert any("error rate" in p for p in problems)
+
+@pytest.mark.asyncio
+async def test_event_loop_lag_probe_feeds_the_histogram():
+    before = registry.render()
+    task = asyncio.ensure_future(watch_event_loop_lag(0.01))
+    await asyncio.sleep(0.06)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    lag = histogram_delta_summary(before, registry.render(), LAG_METRIC)
+    assert LAG_METRIC == EVENT_LOOP_LAG_SECONDS.name
+    assert lag["samples"] >= 2
+    assert lag["mean"] is not None
+
+@pytest.mark.asyncio
+async def test_fake_anthropic_answers_plain_and_streamed():
+    app = create_app(StreamingModel(ttft_ms=0, tokens_per_second=0, output_tokens=10, chunk_tokens=4, seed=1))
+    body = {"model": "fake", "max_tokens": 8, "messages": [{"role": "user", "content": "hi"}]}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://fake") as client:
+        plain = (await client.post("/v1/messages", json=body)).json()
+        assert plain["type"] == "message"
+        assert plain["usage"]["output_tokens"] == 8
+        assert len(plain["content"][0]["text"].split()) == 8
+
+        resp = await client.post("/v1/messages", json={**body, "stream": True})
+        events = [line[len("event: "):] for line in resp.text.splitlines() if line.startswith("event: ")]
+        assert events[0] == "message_start" and events[-1] == "message_stop"
+        assert events.count("content_block_delta") == 2
+        data = [json.loads(line[len("data: "):]) for line in resp.text.splitlines() if line.startswith("data: ")]
+        streamed = "".join(d["delta"]["text"] for d in data if d["type"] == "content_block_delta")
+        assert len(streamed.split()) == 8
+
+    overloaded = create_app(StreamingModel(error_rate=1.0))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=overloaded), base_url="http://fake") as client:
+        resp = await client.post("/v1/messages", json=body)
+        assert resp.status_code == 529
+        assert resp.json()["error"]["type"] == "overloaded_error"
+
+@pytest.mark.asyncio
+async def test_fake_anthropic_simulates_prompt_caching():
+    app = create_app(StreamingModel(ttft_ms=0, tokens_per_second=0, output_tokens=4, seed=1))
+    context = {"type": "text", "text": "record " * 1000, "cache_control": {"type": "ephemeral"}}
+
+    def body(question):
+        content = [context, {"type": "text", "text": question}]
+        return {"model": "fake", "max_tokens": 4, "messages": [{"role": "user", "content": content}]}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://fake") as client:
+        first = (await client.post("/v1/messages", json=body("first?"))).json()["usage"]
+        second = (await client.post("/v1/messages", json=body("second?"))).json()["usage"]
+    assert first["cache_creation_input_tokens"] > 1024 and first["cache_read_input_tokens"] == 0
+    assert second["cache_read_input_tokens"] == first["cache_creation_input_tokens"]
+    assert second["input_tokens"] < 10
+    assert StreamingModel(ttft_ms=100).ttft_for(1000, 1000) < StreamingModel(ttft_ms=100).ttft_for(1000, 0)
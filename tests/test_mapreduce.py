@@ -0,0 +1,102 @@
+import asyncio
+import types
+
+import pytest
+
+from app import summarizers
+from app.compaction import SUMMARY_SECTIONS, compact_payload, estimate_tokens, render_value
+from app.mapreduce import combine_partials, needs_map_reduce, record_count, split_section
+
+def _records(n):
+    return [{"id": f"tx-{i}", "name": f"OrderFlow{i}", "entry": f"/orders/{i}"} for i in range(n)]
+
+def test_split_section_keeps_shape_and_budget():
+    chunks = split_section(_records(100), max_tokens=200)
+    assert sum(len(c) for c in chunks) == 100
+    assert all(estimate_tokens(render_value(c)) <= 220 for c in chunks)
+
+    graph = {"granularity": "components", "nodes": _records(60), "links": _records(40)}
+    parts = split_section(graph, max_tokens=300)
+    assert parts[0]["granularity"] == "components"
+    assert all("granularity" not in p for p in parts[1:])
+    assert sum(len(p.get("nodes", [])) + len(p.get("links", [])) for p in parts) == 100
+    assert record_count(graph) == 100
+
+    text = "\n".join(f"line {i}" for i in range(500))
+    assert "\n".join(split_section(text, max_tokens=100)) == text
+
+def test_needs_map_reduce_and_combine():
+    payload = {"transactions": _records(1000), "stats": {"loc": 1}}
+    assert needs_map_reduce(payload, threshold=1000)
+    assert not needs_map_reduce({"stats": {"loc": 1}}, threshold=1000)
+    assert combine_partials(["a", "b"], 10) == "(Summarized from 10 records in 2 parts.)\n[1/2] a\n[2/2] b"
+
+class FakeLLM:
+    """Async messages API answering map calls with short fixed summaries, tracking concurrency."""
+
+    def __init__(self):
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.005)
+        self.in_flight -= 1
+        prompt = summarizers._prompt_text(kwargs)
+        text = "merged summary" if "Partial summaries" in prompt else "partial summary " * 5
+        return types.SimpleNamespace(content=[types.SimpleNamespace(type="text", text=text)], usage=None)
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = FakeLLM()
+    monkeypatch.setattr(summarizers, "get_anthropic_client", lambda: types.SimpleNamespace(messages=fake))
+    monkeypatch.setattr(summarizers, "MAP_CHUNK_TOKENS", 400)
+    monkeypatch.setattr(summarizers, "map_semaphore", asyncio.Semaphore(2))
+    return fake
+
+def _payload(question):
+    return {
+        "question": question,
+        "selected_application": {"id": "Payments_000", "name": "Payments_000"},
+        "stats": {"loc": 100},
+        "transactions": _records(200),
+        "data_graphs": _records(5),
+    }
+
+@pytest.mark.asyncio
+async def test_map_step_chunks_large_sections_under_the_concurrency_bound(llm):
+    mapped = await summarizers.map_sections_async(_payload("What does it do?"))
+
+    report = mapped["map_reduce"]["sections"]
+    assert list(report) == ["transactions"]  # data_graphs fits in one chunk and stays verbatim
+    assert report["transactions"]["records"] == 200
+    assert report["transactions"]["chunks"] == len(llm.calls) > 1
+    assert llm.max_in_flight == 2
+    assert mapped["transactions"].startswith("(Summarized from 200 records in")
+    assert mapped["data_graphs"] == _records(5)
+    assert all("What does it do?" not in summarizers._prompt_text(c) for c in llm.calls)
+
+    # The reduce step is the usual summary prompt, over the partial summaries.
+    prompt = summarizers._prompt_text(summarizers._summary_request(compact_payload(mapped, SUMMARY_SECTIONS)))
+    assert "[1/" in prompt and "tx-150" not in prompt
+
+@pytest.mark.asyncio
+async def test_chunk_summaries_are_reused_across_questions(llm):
+    await summarizers.map_sections_async(_payload("What does it do?"))
+    first = len(llm.calls)
+    mapped = await summarizers.map_sections_async(_payload("Where are the risks?"))
+    assert len(llm.calls) == first
+    assert mapped["map_reduce"]["map_calls"] == first
+
+@pytest.mark.asyncio
+async def test_partial_summaries_are_merged_until_they_fit(llm, monkeypatch):
+    monkeypatch.setattr(summarizers, "PROMPT_SECTION_TOKEN_BUDGET", 60)
+    monkeypatch.setattr(summarizers, "MAP_CHUNK_TOKENS", 100)
+    mapped = await summarizers.map_sections_async(_payload("q"))
+    info = mapped["map_reduce"]["sections"]["transactions"]
+    assert info["levels"] >= 2
+    assert info["calls"] > info["chunks"]
+    assert "merged summary" in mapped["transactions"]
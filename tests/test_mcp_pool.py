@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+
+from app.mcp_pool import MCPSessionPool
+
+pytestmark = pytest.mark.asyncio
+
+class CountingSession:
+    def __init__(self, n):
+        self.n = n
+        self.inflight = 0
+        self.peak = 0
+        self.ping_ok = True
+
+    async def call_tool(self, name, args):
+        self.inflight += 1
+        self.peak = max(self.peak, self.inflight)
+        await asyncio.sleep(0.01)
+        self.inflight -= 1
+        return {"session": self.n}
+
+    async def send_ping(self):
+        if not self.ping_ok:
+            raise ConnectionError("gone")
+
+def make_factory():
+    opened = []
+
+    @asynccontextmanager
+    async def factory():
+        sess = CountingSession(len(opened))
+        opened.append(sess)
+        yield sess
+
+    return factory, opened
+
+async def test_pool_reuses_warm_session():
+    factory, opened = make_factory()
+    pool = MCPSessionPool(factory, min_size=1, max_size=2)
+    await pool.start()
+    for _ in range(5):
+        async with pool.acquire() as s:
+            assert (await s.call_tool("stats", {}))["session"] == 0
+    assert len(opened) == 1
+    await pool.close()
+
+async def test_pool_caps_inflight_calls_per_session():
+    factory, opened = make_factory()
+    pool = MCPSessionPool(factory, min_size=1, max_size=1, max_inflight=2)
+    await pool.start()
+
+    async def borrow():
+        async with pool.acquire() as s:
+            await asyncio.gather(*(s.call_tool("stats", {}) for _ in range(4)))
+
+    await asyncio.gather(*(borrow() for _ in range(3)))
+    assert len(opened) == 1
+    assert opened[0].peak <= 2
+    await pool.close()
+
+async def test_pool_reopens_session_after_transport_error():
+    factory, opened = make_factory()
+    pool = MCPSessionPool(factory, min_size=1, max_size=2)
+    await pool.start()
+    with pytest.raises(ConnectionError):
+        async with pool.acquire():
+            raise ConnectionError("dropped")
+    async with pool.acquire() as s:
+        assert (await s.call_tool("stats", {}))["session"] == 1
+    await pool.close()
+
+async def test_pool_health_check_replaces_dead_session():
+    factory, opened = make_factory()
+    pool = MCPSessionPool(factory, min_size=1, max_size=2, healthcheck_interval=0)
+    await pool.start()
+    opened[0].ping_ok = False
+    async with pool.acquire() as s:
+        assert (await s.call_tool("stats", {}))["session"] == 1
+    await pool.close()
+
+async def test_pool_discards_session_after_wrapped_or_swallowed_transport_error():
+    factory, opened = make_factory()
+    pool = MCPSessionPool(factory, min_size=1, max_size=2)
+    await pool.start()
+    with pytest.raises(RuntimeError):
+        async with pool.acquire():
+            try:
+                raise ConnectionError("dropped")
+            except ConnectionError as e:
+                raise RuntimeError("fetch failed") from e
+    async with pool.acquire() as s:
+        assert (await s.call_tool("stats", {}))["session"] == 1
+
+    async def failing_call(name, args):
+        raise ConnectionError("dropped")
+
+    opened[1].call_tool = failing_call
+    async with pool.acquire() as s:
+        try:
+            await s.call_tool("stats", {})
+        except ConnectionError:
+            pass  # e.g. an optional plan step recorded in plan.errors
+    async with pool.acquire() as s:
+        assert (await s.call_tool("stats", {}))["session"] == 2
+
+    # Other errors leave the session in the pool.
+    with pytest.raises(RuntimeError):
+        async with pool.acquire():
+            raise RuntimeError("bad arguments")
+    async with pool.acquire() as s:
+        assert (await s.call_tool("stats", {}))["session"] == 2
+    await pool.close()
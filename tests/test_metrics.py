@@ -0,0 +1,65 @@
+import httpx
+import pytest
+
+from app.metrics import Registry
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    hist = registry.histogram("demo_seconds", "Demo.", ["tool"], buckets=(0.1, 1))
+    hist.observe(0.05, tool="stats")
+    hist.observe(0.5, tool="stats")
+    hist.observe(5, tool="stats")
+
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{tool="stats",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{tool="stats",le="1"} 2' in text
+    assert 'demo_seconds_bucket{tool="stats",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{tool="stats"} 3' in text
+    assert 'demo_seconds_sum{tool="stats"} 5.55' in text
+
+def test_counters_gauges_and_collectors():
+    registry = Registry()
+    errors = registry.counter("demo_errors_total", "Errors.", ["type"])
+    errors.inc(type='Bad"Value')
+    errors.inc(2, type='Bad"Value')
+    gauge = registry.gauge("demo_in_flight", "In flight.")
+    gauge.inc()
+    gauge.dec()
+    registry.add_collector(lambda: [("demo_hits_total", "counter", "Hits.", [({"cache": "x"}, 4)])])
+
+    text = registry.render()
+    assert 'demo_errors_total{type="Bad\\"Value"} 3' in text
+    assert "demo_in_flight 0" in text
+    assert 'demo_hits_total{cache="x"} 4' in text
+
+    with pytest.raises(ValueError):
+        errors.inc(wrong="label")
+    with pytest.raises(ValueError):
+        registry.counter("demo_errors_total", "Duplicate.")
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_request_phases(monkeypatch):
+    import app.api.main as api_main
+    from app.metrics import MCP_TOOL_CALL_SECONDS, APP_SELECTION_SECONDS
+
+    async def fake_summary(payload, **kwargs):
+        return "SUMMARY OK"
+
+    monkeypatch.setattr(api_main, "summarize_with_anthropic_async", fake_summary)
+    calls_before = MCP_TOOL_CALL_SECONDS.count(tool="stats", outcome="ok")
+    selections_before = APP_SELECTION_SECONDS.count()
+
+    transport = httpx.ASGITransport(app=api_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        resp = await client.post("/query", json={"question": "Summarize", "application_hint": "Payments"})
+        assert resp.status_code == 200
+        metrics = await client.get("/metrics")
+
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    assert MCP_TOOL_CALL_SECONDS.count(tool="stats", outcome="ok") == calls_before + 1
+    assert APP_SELECTION_SECONDS.count() == selections_before + 1
+    text = metrics.text
+    assert 'imaging_agent_http_request_seconds_count{route="/query",method="POST",status="200"}' in text
+    assert 'imaging_agent_cache_misses_total{cache="tool_catalog"}' in text
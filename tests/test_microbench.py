@@ -0,0 +1,47 @@
+from mcp.types import CallToolResult, TextContent
+
+from app.mcp_client import decode_tool_result
+from perf.microbench import build_cases, compare_to_baseline, run_cases, scaling_problems, summary_payload
+
+def test_decode_tool_result_shapes():
+    assert decode_tool_result(CallToolResult(content=[TextContent(type="text", text='{"a": 1}')])) == {"a": 1}
+    assert decode_tool_result(CallToolResult(content=[TextContent(type="text", text="plain")])) == "plain"
+    empty = CallToolResult(content=[])
+    assert decode_tool_result(empty) is empty
+
+def test_smallest_cases_run_and_report_time_and_memory():
+    results = run_cases(build_cases(["10"], ["1KB"]), repeat=1, min_time=0.001)
+    assert set(results) == {
+        "parse_applications_string[10]", "match_tool_name[10]", "choose_application[10]",
+        "choose_application_question[10]", "name_index_build[10]", "graph_analytics[10]",
+        "decode_tool_result[1KB]", "summary_prompt[1KB]", "summary_prompt_compacted[1KB]",
+    }
+    for result in results.values():
+        assert result["median_ms"] > 0
+        assert result["peak_kb"] >= 0
+    assert 1024 <= len(str(summary_payload(1024))) < 4096
+
+def _result(function, size, n, ms, kb=10.0):
+    return {"function": function, "size": size, "n": n, "median_ms": ms, "peak_kb": kb}
+
+def test_baseline_comparison_uses_tolerances_and_floors():
+    baseline = {"f[1k]": _result("f", "1k", 1000, 10.0, kb=1000.0), "g[10]": _result("g", "10", 10, 0.01)}
+    ok = {"f[1k]": _result("f", "1k", 1000, 14.0, kb=1200.0), "g[10]": _result("g", "10", 10, 0.05)}
+    assert compare_to_baseline(ok, baseline, time_tolerance=0.5, memory_tolerance=0.25) == []
+
+    bad = {"f[1k]": _result("f", "1k", 1000, 16.0, kb=1400.0)}
+    problems = compare_to_baseline(bad, baseline, time_tolerance=0.5, memory_tolerance=0.25)
+    assert len(problems) == 2
+
+def test_baseline_comparison_uses_the_fastest_sample():
+    baseline = {"f[1k]": {**_result("f", "1k", 1000, 10.0), "min_ms": 9.0}}
+    noisy = {"f[1k]": {**_result("f", "1k", 1000, 18.0), "min_ms": 10.0}}
+    assert compare_to_baseline(noisy, baseline, time_tolerance=0.5, memory_tolerance=0.25) == []
+    slower = {"f[1k]": {**_result("f", "1k", 1000, 18.0), "min_ms": 15.0}}
+    assert len(compare_to_baseline(slower, baseline, time_tolerance=0.5, memory_tolerance=0.25)) == 1
+
+def test_scaling_check_flags_quadratic_growth():
+    linear = {"a": _result("f", "1k", 1000, 2.0), "b": _result("f", "50k", 50000, 100.0)}
+    quadratic = {"a": _result("f", "1k", 1000, 2.0), "b": _result("f", "50k", 50000, 5000.0)}
+    assert scaling_problems(linear, max_exponent=1.5) == []
+    assert "n^2.00" in scaling_problems(quadratic, max_exponent=1.5)[0]
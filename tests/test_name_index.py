@@ -0,0 +1,34 @@
+from app.name_index import NameIndex, trigrams
+from app.tools import choose_application
+
+APPS = ["Payments_000", "Billing_001", "Billing_016", "Shopizer_115", "CAAS_ADE"]
+
+def test_trigrams_are_padded_per_token():
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+    assert trigrams("Shopizer_115") == trigrams("shopizer 115")
+    assert trigrams("--") == set()
+
+def test_search_ranks_by_similarity_and_containment():
+    index = NameIndex(APPS)
+    assert index.search("Billing_016", limit=1) == [("Billing_016", 1.0)]
+    assert [name for name, _ in index.search("billing 16", limit=2)] == ["Billing_016", "Billing_001"]
+    assert index.search("zzz") == []
+
+    question = "What are the main risks of shopizer 115 before the release?"
+    assert index.search(question, limit=1)[0][1] < 0.5  # the question is much longer than the name
+    assert index.search(question, limit=1, containment=True) == [("Shopizer_115", 1.0)]
+
+def test_update_applies_only_the_difference():
+    index = NameIndex(APPS)
+    assert index.update(APPS[1:] + ["Claims_004"]) == (1, 1)
+    assert "Payments_000" not in index and "Claims_004" in index and len(index) == 5
+    assert index.search("payments") == []
+    assert index.update(APPS[1:] + ["Claims_004"]) == (0, 0)
+
+def test_choose_application_uses_hint_then_question():
+    apps = [{"id": n, "name": n} for n in APPS]
+    index = NameIndex(APPS)
+    assert choose_application(apps, APPS, "Summarize it", "billing_16", index)["id"] == "Billing_016"
+    assert choose_application(apps, APPS, "Summarize CAAS ADE please", None, index)["id"] == "CAAS_ADE"
+    # Nothing close enough: first application, as before.
+    assert choose_application(apps, APPS, "Summarize the architecture", None)["id"] == "Payments_000"
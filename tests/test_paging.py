@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from app.paging import PageStats, fetch_paged, iter_pages, paging_note, result_total
+from app.tool_catalog import ToolCatalog
+
+pytestmark = pytest.mark.asyncio
+
+class FakeListTool:
+    """Serves `count` records by offset, optionally reporting the total; tracks concurrency."""
+
+    def __init__(self, count: int, report_total: bool = True, delay: float = 0.01, fail_at=None):
+        self.count = count
+        self.report_total = report_total
+        self.delay = delay
+        self.fail_at = fail_at
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    async def __call__(self, offset: int, limit: int):
+        self.calls.append((offset, limit))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if offset == self.fail_at:
+                raise RuntimeError("page failed")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        items = [{"id": f"tx-{n}"} for n in range(offset, min(self.count, offset + limit))]
+        return {"items": items, "total": self.count} if self.report_total else items
+
+async def _collect(tool, **kwargs):
+    stats = PageStats()
+    pages = [page async for page in iter_pages(tool, stats=stats, **kwargs)]
+    return [r for page in pages for r in page], pages, stats
+
+async def test_pages_are_fetched_in_order_within_the_window():
+    tool = FakeListTool(230)
+    records, pages, stats = await _collect(tool, page_size=50, window=3, max_items=1000, max_tokens=None)
+    assert [r["id"] for r in records] == [f"tx-{n}" for n in range(230)]
+    assert [len(p) for p in pages] == [50, 50, 50, 50, 30]
+    assert tool.max_in_flight == 3
+    assert stats.to_dict() == {"total": 230, "fetched": 230, "pages": 5, "truncated": False, "stopped": "complete"}
+
+async def test_unknown_total_stops_on_a_short_page_and_cancels_the_rest():
+    tool = FakeListTool(120, report_total=False)
+    records, _, stats = await _collect(tool, page_size=50, window=4, max_items=1000, max_tokens=None)
+    assert len(records) == 120
+    assert stats.stopped == "complete" and stats.total is None and not stats.truncated
+    assert max(offset for offset, _ in tool.calls) <= 50 * 5
+    assert tool.in_flight == 0
+
+async def test_text_pages_count_the_items_they_list():
+    calls = []
+
+    async def text_tool(offset, limit):
+        calls.append(offset)
+        end = min(300, offset + limit)
+        lines = "\n".join(f"name: Flow{n}" for n in range(offset, end))
+        return f"showing {offset + 1}-{end} of 300 total\n{lines}"
+
+    records, _, stats = await _collect(text_tool, page_size=50, window=2, max_items=1000, max_tokens=None)
+    assert calls == [0, 50, 100, 150, 200, 250]
+    assert len(records) == 6 and records[-1].endswith("Flow299")
+    assert stats.to_dict() == {"total": 300, "fetched": 300, "pages": 6, "truncated": False, "stopped": "complete"}
+
+    # A budget cuts between text pages, never inside one.
+    _, _, stats = await _collect(text_tool, page_size=50, window=2, max_items=120, max_tokens=None)
+    assert (stats.fetched, stats.stopped, stats.truncated) == (150, "item_budget", True)
+
+    # Without a range, a text page counts its non-empty lines.
+    async def lines_tool(offset, limit):
+        return "\n".join(f"Flow{n}\n" for n in range(offset, min(120, offset + limit)))
+
+    _, pages, stats = await _collect(lines_tool, page_size=50, window=2, max_items=1000, max_tokens=None)
+    assert (len(pages), stats.fetched, stats.stopped, stats.truncated) == (3, 120, "complete", False)
+
+async def test_item_and_token_budgets_truncate():
+    records, _, stats = await _collect(FakeListTool(1000), page_size=50, window=4, max_items=120, max_tokens=None)
+    assert len(records) == 120
+    assert stats.to_dict()["truncated"] and stats.stopped == "item_budget" and stats.total == 1000
+
+    # Each {"id":"tx-N"} record is ~4 estimated tokens.
+    records, _, stats = await _collect(FakeListTool(1000), page_size=50, window=2, max_items=1000, max_tokens=100)
+    assert 20 <= len(records) < 30
+    assert stats.stopped == "token_budget" and stats.truncated
+
+async def test_consumer_breaking_early_cancels_in_flight_pages():
+    tool = FakeListTool(1000, delay=0.05)
+    pages = iter_pages(tool, page_size=50, window=4, max_items=1000, max_tokens=None)
+    async for _ in pages:
+        await asyncio.sleep(0)  # the next pages are already in flight
+        break
+    await pages.aclose()
+    assert tool.in_flight == 0 and tool.cancelled >= 1
+
+async def test_later_page_failure_keeps_what_was_fetched():
+    records, _, stats = await _collect(FakeListTool(300, fail_at=100), page_size=50, window=1, max_items=1000, max_tokens=None)
+    assert len(records) == 100
+    assert stats.stopped == "error" and stats.truncated
+
+    with pytest.raises(RuntimeError, match="page failed"):
+        await _collect(FakeListTool(300, fail_at=0), page_size=50, window=1, max_items=1000, max_tokens=None)
+
+async def test_unpaged_tools_get_one_call_with_the_item_budget():
+    tool = FakeListTool(1000, report_total=False)
+    records, _, stats = await _collect(tool, paged=False, page_size=50, max_items=300, max_tokens=None)
+    assert tool.calls == [(0, 300)]
+    assert len(records) == 300 and stats.stopped == "unpaged"
+
+async def test_fetch_paged_uses_the_paging_style_of_the_schema():
+    def schema(*params):
+        return {"type": "object", "properties": {p: {"type": "string"} for p in ("application", *params)}}
+
+    catalog = ToolCatalog(
+        ["by_offset", "by_page", "unpaged"],
+        {"by_offset": schema("max_results", "skip"), "by_page": schema("page_size", "page_number"), "unpaged": schema("limit")},
+    )
+    seen = {}
+
+    def call(tool):
+        async def run(args):
+            seen.setdefault(tool, []).append(args)
+            return {"items": [1] * 3, "total": 3}
+        return run
+
+    for tool in ("by_offset", "by_page", "unpaged"):
+        assert await fetch_paged(call(tool), catalog, tool, app_id="A") == [1, 1, 1]
+    assert seen["by_offset"][0] == {"application": "A", "max_results": 50, "skip": 0}
+    assert seen["by_page"][0] == {"application": "A", "page_size": 50, "page_number": 1}
+    assert seen["unpaged"][0] == {"application": "A", "limit": 500}
+
+async def test_fetch_paged_can_keep_the_result_envelope():
+    catalog = ToolCatalog(
+        ["graphs"], {"graphs": {"type": "object", "properties": {"app_id": {}, "limit": {}, "offset": {}}}}
+    )
+
+    async def call(args):
+        items = [{"id": f"dg-{n}"} for n in range(args["offset"], min(120, args["offset"] + args["limit"]))]
+        return {"granularity": "tables", "total": 120, "offset": args["offset"], "items": items}
+
+    kept = await fetch_paged(call, catalog, "graphs", keep_envelope=True, app_id="A")
+    assert {k: v for k, v in kept.items() if k != "items"} == {"granularity": "tables"}
+    assert len(kept["items"]) == 120
+    assert len(await fetch_paged(call, catalog, "graphs", app_id="A")) == 120
+
+    async def bare(args):
+        return {"items": [], "total": 0}
+
+    assert await fetch_paged(bare, catalog, "graphs", keep_envelope=True, app_id="A") == []
+
+async def test_totals_and_prompt_note():
+    assert result_total({"totalCount": 12, "items": []}) == 12
+    assert result_total("Showing items 1-50 of 1532 total") == 1532
+    assert result_total([1, 2]) is None
+
+    note = paging_note({"result_counts": {
+        "transactions": {"total": 1532, "fetched": 500, "truncated": True},
+        "data_graphs": {"total": 10, "fetched": 10, "truncated": False},
+    }})
+    assert note == "Note: partial result sets: transactions (500 of 1532 fetched).\n"
+    assert paging_note({}) == ""
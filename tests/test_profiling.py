@@ -0,0 +1,61 @@
+import asyncio
+import httpx
+import pytest
+
+import app.api.main as api_main
+from app.profiling import profiled, record_span, span
+
+pytestmark = pytest.mark.asyncio
+
+async def test_spans_nest_across_spawned_tasks():
+    async def tool(name):
+        with span(f"tool_{name}"):
+            await asyncio.sleep(0.01)
+
+    with profiled() as prof:
+        with span("mcp"):
+            await asyncio.gather(tool("a"), tool("b"), tool("a"))
+        with span("llm"):
+            pass
+
+    tree = prof.to_dict()
+    assert [c["name"] for c in tree["children"]] == ["mcp", "llm"]
+    assert sorted(c["name"] for c in tree["children"][0]["children"]) == ["tool_a", "tool_a", "tool_b"]
+
+    header = prof.server_timing()
+    assert header.startswith("mcp;dur=")
+    assert 'tool_a;dur=' in header and 'desc="x2"' in header
+    assert "total;dur=" in header
+
+async def test_spans_are_noops_outside_a_profile():
+    with span("ignored"):
+        record_span("ignored_too", 0.0)
+    with profiled() as prof:
+        pass
+    assert prof.to_dict().get("children") is None
+
+async def test_impact_route_sends_server_timing_and_optional_profile():
+    async def fake_impact(payload, **kwargs):
+        return "IMPACT OK"
+
+    original = api_main.summarize_impact_with_anthropic_async
+    api_main.summarize_impact_with_anthropic_async = fake_impact
+    try:
+        transport = httpx.ASGITransport(app=api_main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {"question": "What breaks?", "object_hint": "OrderService", "application_hint": "Payments"}
+            plain = await client.post("/impact", json=body)
+            detailed = await client.post("/impact?profile=1", json=body)
+    finally:
+        api_main.summarize_impact_with_anthropic_async = original
+
+    assert plain.status_code == 200
+    timing = plain.headers["server-timing"]
+    for phase in ("mcp", "list_tools", "select_app", "object_resolve",
+                  "tool_object_details", "tool_transactions_using_object", "compact", "total"):
+        assert f"{phase};dur=" in timing
+    assert plain.json()["profile"] is None
+
+    tree = detailed.json()["profile"]
+    mcp = next(c for c in tree["children"] if c["name"] == "mcp")
+    assert {c["name"] for c in mcp["children"]} >= {"list_tools", "select_app", "object_resolve"}
@@ -0,0 +1,81 @@
+import pytest
+
+from app.cache import LRUCache, SQLiteCache, TieredCache
+from app.result_cache import ToolResultCache
+
+pytestmark = pytest.mark.asyncio
+
+class CountingSession:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, args):
+        self.calls.append(name)
+        return {"tool": name, "n": len(self.calls)}
+
+APP_V1 = {"id": "app1", "name": "Payments", "delivery": "[dateTime: 2025-01-01T00:00:00, name: d1]("}
+APP_V2 = {"id": "app1", "name": "Payments", "delivery": "[dateTime: 2025-02-01T00:00:00, name: d2]("}
+
+async def test_repeat_calls_hit_the_cache():
+    cache = ToolResultCache(TieredCache(LRUCache(16)))
+    session = CountingSession()
+    first = await cache.call(session, "bb7_stats", {"app_id": "app1"}, base="stats", app=APP_V1)
+    second = await cache.call(session, "bb7_stats", {"app_id": "app1"}, base="stats", app=APP_V1)
+    assert first == second
+    assert session.calls == ["bb7_stats"]
+
+async def test_new_delivery_and_non_cacheable_tools_miss():
+    cache = ToolResultCache(TieredCache(LRUCache(16)))
+    session = CountingSession()
+    await cache.call(session, "stats", {"app_id": "app1"}, base="stats", app=APP_V1)
+    await cache.call(session, "stats", {"app_id": "app1"}, base="stats", app=APP_V2)
+    await cache.call(session, "object_details", {"app_id": "app1"}, base="object_details", app=APP_V1)
+    await cache.call(session, "object_details", {"app_id": "app1"}, base="object_details", app=APP_V1)
+    assert session.calls == ["stats", "stats", "object_details", "object_details"]
+
+async def test_per_tool_ttl_and_inventory_invalidation():
+    cache = ToolResultCache(TieredCache(LRUCache(16)), ttls={"packages": 0})
+    session = CountingSession()
+    for _ in range(2):
+        await cache.call(session, "packages", {"app_id": "app1"}, base="packages", app=APP_V1)
+    assert session.calls.count("packages") == 2
+
+    await cache.call(session, "stats", {"app_id": "app1"}, base="stats", app=APP_V1)
+    from app.mcp_client import imaging_endpoint_key
+    await cache.invalidate_applications(imaging_endpoint_key(), {"app1"})
+    await cache.call(session, "stats", {"app_id": "app1"}, base="stats", app=APP_V1)
+    assert session.calls.count("stats") == 2
+
+async def test_disk_tier_survives_memory_eviction(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "results.db"))
+    cache = ToolResultCache(TieredCache(LRUCache(16), disk))
+    session = CountingSession()
+    await cache.call(session, "stats", {"app_id": "app1"}, base="stats", app=APP_V1)
+    cache.store.memory.clear()
+    await cache.call(session, "stats", {"app_id": "app1"}, base="stats", app=APP_V1)
+    assert session.calls == ["stats"]
+    assert cache.stats()["disk_hits"] == 1
+
+async def test_disk_tier_invalidation_runs_in_a_worker_thread(tmp_path, monkeypatch):
+    import asyncio
+    from app.mcp_client import imaging_endpoint_key
+
+    disk = SQLiteCache(str(tmp_path / "results.db"))
+    cache = ToolResultCache(TieredCache(LRUCache(16), disk))
+    session = CountingSession()
+    await cache.call(session, "stats", {"app_id": "app1"}, base="stats", app=APP_V1)
+
+    offloaded = []
+    to_thread = asyncio.to_thread
+
+    async def recording(fn, *args):
+        offloaded.append(fn.__name__)
+        return await to_thread(fn, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", recording)
+    await cache.invalidate_applications(imaging_endpoint_key(), {"app1"})
+    await cache.clear()
+    assert offloaded == ["delete_tag", "clear"]
+
+    await cache.call(session, "stats", {"app_id": "app1"}, base="stats", app=APP_V1)
+    assert session.calls == ["stats", "stats"]
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+
+from app.scheduler import PlanError, ToolCall, run_plan
+
+pytestmark = pytest.mark.asyncio
+
+def _after(delay, value):
+    async def run(deps):
+        await asyncio.sleep(delay)
+        return value(deps) if callable(value) else value
+    return run
+
+async def test_independent_steps_overlap_and_dependents_get_results():
+    in_flight = []
+    events = []
+
+    def tracked(name, value):
+        async def run(deps):
+            in_flight.append(name)
+            events.append(("start", name, tuple(in_flight)))
+            await asyncio.sleep(0.01)
+            in_flight.remove(name)
+            return value(deps) if callable(value) else value
+        return run
+
+    plan = await run_plan([
+        ToolCall("a", tracked("a", 1)),
+        ToolCall("b", tracked("b", 2)),
+        ToolCall("c", tracked("c", lambda deps: deps["a"] + deps["b"]), depends_on=["a", "b"]),
+    ])
+    assert plan["c"] == 3
+    # a and b run at the same time; c starts alone, once both are done.
+    assert max(len(running) for _, _, running in events) == 2
+    assert events[-1] == ("start", "c", ("c",))
+    assert set(plan.timings) == {"a", "b", "c", "_total"}
+
+async def test_optional_failures_are_collected_and_skip_dependents():
+    async def boom(_):
+        raise ValueError("tool exploded")
+
+    plan = await run_plan([
+        ToolCall("ok", _after(0, "fine")),
+        ToolCall("bad", boom),
+        ToolCall("after_bad", _after(0, "never"), depends_on=["bad"]),
+        ToolCall("missing", None),
+    ])
+    assert plan["ok"] == "fine"
+    assert plan["bad"] is None and plan.errors == {"bad": "tool exploded"}
+    assert plan["after_bad"] is None
+    assert set(plan.skipped) == {"after_bad", "missing"}
+
+async def test_required_failure_aborts_and_cancels_the_rest():
+    cancelled = []
+
+    async def slow(_):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def boom(_):
+        raise LookupError("no such object")
+
+    with pytest.raises(PlanError) as info:
+        await run_plan([ToolCall("slow", slow), ToolCall("root", boom, required=True)])
+    assert info.value.step == "root"
+    assert isinstance(info.value.cause, LookupError)
+    assert cancelled == [True]
+
+async def test_per_step_timeout():
+    plan = await run_plan([ToolCall("slow", _after(1, "late"), timeout=0.01)])
+    assert plan["slow"] is None
+    assert "timed out" in plan.errors["slow"]
+
+async def test_invalid_plans_are_rejected():
+    with pytest.raises(ValueError, match="unknown step"):
+        await run_plan([ToolCall("a", _after(0, 1), depends_on=["nope"])])
+    with pytest.raises(ValueError, match="Cycle"):
+        await run_plan([
+            ToolCall("a", _after(0, 1), depends_on=["b"]),
+            ToolCall("b", _after(0, 1), depends_on=["a"]),
+        ])
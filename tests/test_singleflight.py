@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+
+from app.singleflight import SingleFlight, normalize_text
+
+pytestmark = pytest.mark.asyncio
+
+async def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 4}
+
+    # The key is released once done: a later call recomputes.
+    await flight.do("k", work)
+    assert len(calls) == 2
+
+async def test_errors_fan_out_to_every_waiter():
+    flight = SingleFlight("test")
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("mcp down")
+
+    results = await asyncio.gather(*(flight.do("k", boom) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+async def test_computation_survives_partial_cancellation_and_stops_when_all_leave():
+    flight = SingleFlight("test")
+    started = asyncio.Event()
+    release = asyncio.Event()
+    cancelled = []
+
+    async def slow():
+        started.set()
+        try:
+            await release.wait()
+            return "done"
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    first = asyncio.create_task(flight.do("k", slow))
+    second = asyncio.create_task(flight.do("k", slow))
+    await started.wait()
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await second == "done"
+    assert cancelled == []
+
+    release.clear()
+    started.clear()
+    lone = asyncio.create_task(flight.do("k2", slow))
+    await started.wait()
+    lone.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await lone
+    await asyncio.sleep(0)
+    assert cancelled == [1]
+    assert flight.in_flight() == 0
+
+async def test_normalize_text():
+    assert normalize_text("  What  BREAKS ") == "what breaks"
+    assert normalize_text(None) == ""
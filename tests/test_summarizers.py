@@ -16,14 +16,25 @@ class FakeMessagesAPI:
         return FakeMsgResp(self._ret_text)
 
 class FakeAnthropicClient:
-    def __init__(self, api_key=None):  # signature compatibility
+    def __init__(self, api_key=None, **kwargs):  # signature compatibility
         self.messages = FakeMessagesAPI("OK!")
 
+class FakeAsyncMessagesAPI(FakeMessagesAPI):
+    async def create(self, **kwargs):
+        return FakeMessagesAPI.create(self, **kwargs)
+
+class FakeAsyncAnthropicClient:
+    def __init__(self):
+        self.messages = FakeAsyncMessagesAPI("ASYNC OK!")
+
 @pytest.fixture(autouse=True)
 def patch_anthropic(monkeypatch):
     # Replace anthropic.Anthropic with our fake client
     import app.summarizers as s
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
     monkeypatch.setattr(s, "anthropic", types.SimpleNamespace(Anthropic=FakeAnthropicClient))
+    shared = FakeAsyncAnthropicClient()
+    monkeypatch.setattr(s, "get_anthropic_client", lambda: shared)
     yield
 
 def test_summarize_with_anthropic_basic():
@@ -46,3 +57,146 @@ def test_summarize_impact_with_anthropic_basic():
     }
     out = summarizers.summarize_impact_with_anthropic(payload)
     assert "OK!" in out
+
+@pytest.mark.asyncio
+async def test_summarize_with_anthropic_async_uses_shared_client():
+    payload = {
+        "question": "Summarize app",
+        "selected_application": {"id": "app1", "name": "Payments"},
+    }
+    out = await summarizers.summarize_with_anthropic_async(payload)
+    assert out == "ASYNC OK!"
+
+@pytest.mark.asyncio
+async def test_summarize_impact_with_anthropic_async_uses_shared_client():
+    payload = {
+        "question": "What breaks?",
+        "selected_application": {"id": "app1", "name": "Payments"},
+        "object_details": {"id": "obj-1"},
+    }
+    out = await summarizers.summarize_impact_with_anthropic_async(payload)
+    assert out == "ASYNC OK!"
+
+class FakeStream:
+    def __init__(self, chunks, blocks=None):
+        self._chunks = chunks
+        self._blocks = ["".join(chunks)] if blocks is None else blocks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for c in self._chunks:
+            yield c
+
+    async def get_final_message(self):
+        return types.SimpleNamespace(
+            content=[types.SimpleNamespace(type="text", text=t) for t in self._blocks],
+            usage=types.SimpleNamespace(input_tokens=42, output_tokens=3),
+            stop_reason="end_turn",
+        )
+
+@pytest.mark.asyncio
+async def test_stream_summary_with_anthropic_yields_deltas_then_usage(monkeypatch):
+    client = FakeAsyncAnthropicClient()
+    client.messages.stream = lambda **kwargs: FakeStream(["A", "B"])
+    monkeypatch.setattr(summarizers, "get_anthropic_client", lambda: client)
+    events = [e async for e in summarizers.stream_summary_with_anthropic({"question": "q"})]
+    assert [e["type"] for e in events] == ["delta", "delta", "usage"]
+    assert events[-1]["usage"] == {"input_tokens": 42, "output_tokens": 3}
+
+@pytest.mark.asyncio
+async def test_streamed_summary_is_cached_like_a_created_one(monkeypatch):
+    client = FakeAsyncAnthropicClient()
+    client.messages.stream = lambda **kwargs: FakeStream(["Over", "view", "Risks"], blocks=["Overview", "Risks"])
+    monkeypatch.setattr(summarizers, "get_anthropic_client", lambda: client)
+    payload = {"question": "q", "selected_application": {"id": "app1"}}
+    [e async for e in summarizers.stream_summary_with_anthropic(payload)]
+
+    replayed = [e async for e in summarizers.stream_summary_with_anthropic(payload)]
+    assert replayed[0] == {"type": "delta", "text": "Overview\nRisks"}
+    assert replayed[-1]["cached"]
+
+@pytest.mark.asyncio
+async def test_async_summaries_are_served_from_cache(monkeypatch):
+    client = FakeAsyncAnthropicClient()
+    calls = []
+    original = client.messages.create
+
+    async def counting_create(**kwargs):
+        calls.append(kwargs)
+        return await original(**kwargs)
+
+    client.messages.create = counting_create
+    monkeypatch.setattr(summarizers, "get_anthropic_client", lambda: client)
+    payload = {"question": "Summarize app", "selected_application": {"id": "app1"}}
+    assert await summarizers.summarize_with_anthropic_async(payload) == "ASYNC OK!"
+    assert await summarizers.summarize_with_anthropic_async(payload) == "ASYNC OK!"
+    assert len(calls) == 1
+    await summarizers.summarize_with_anthropic_async(payload, cache_mode="refresh")
+    assert len(calls) == 2
+
+def test_impact_batch_request_toggles_per_object_section():
+    payload = {
+        "question": "What breaks?",
+        "selected_application": {"id": "app1"},
+        "object_summaries": [{"object": "A", "details": {"id": "1"}, "transactions": 1}],
+        "transactions": [{"record": {"id": "t"}, "objects": ["A"]}],
+    }
+    with_sections = summarizers._prompt_text(summarizers._impact_batch_request(payload, per_object=True))
+    without = summarizers._prompt_text(summarizers._impact_batch_request(payload, per_object=False))
+    assert "Per-Object Notes" in with_sections
+    assert "Per-Object Notes" not in without
+    assert '"transactions":1' in with_sections
+
+def test_output_budget_per_request_kind():
+    payload = {"question": "q", "selected_application": {"id": "app1"}}
+    assert summarizers._summary_request(payload)["max_tokens"] == 1200
+    assert summarizers._impact_request(payload)["max_tokens"] == 1400
+    assert summarizers._impact_batch_request(payload)["max_tokens"] == 2000
+    mapped = summarizers._map_request({"id": "app1"}, "transactions", 1, 2, [{"id": "t"}], 0)
+    assert mapped["max_tokens"] == summarizers.MAP_OUTPUT_TOKENS
+
+def test_requests_put_cache_breakpoints_before_the_question(monkeypatch):
+    payload = {"question": "What does it do?", "selected_application": {"id": "A"}, "stats": {"loc": 1}}
+    first = summarizers._summary_request(payload)
+    second = summarizers._summary_request({**payload, "question": "Where are the risks?"})
+
+    assert first["system"][0]["cache_control"] == {"type": "ephemeral"}
+    context, question = first["messages"][0]["content"]
+    assert context["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in question and question["text"].endswith("What does it do?")
+    # Everything up to the last breakpoint is shared across questions.
+    assert first["system"] == second["system"]
+    assert context == second["messages"][0]["content"][0]
+
+    monkeypatch.setattr(summarizers, "PROMPT_CACHING_ENABLED", False)
+    plain = summarizers._summary_request(payload)
+    assert "cache_control" not in plain["system"][0]
+    assert all("cache_control" not in b for b in plain["messages"][0]["content"])
+
+def test_cache_usage_is_reported_and_observed():
+    from app.metrics import registry
+
+    resp = types.SimpleNamespace(usage=types.SimpleNamespace(
+        input_tokens=12, output_tokens=3, cache_read_input_tokens=2048, cache_creation_input_tokens=0,
+    ))
+    usage = summarizers._usage_dict(resp)
+    assert usage["cache_read_input_tokens"] == 2048
+    summarizers._observe_usage(usage, "summary")
+    text = registry.render()
+    assert 'direction="cache_read"' in text and 'direction="cache_write"' in text
+
+@pytest.mark.asyncio
+async def test_shared_client_sends_only_the_api_key(monkeypatch):
+    from app.llm_client import create_anthropic_client
+
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-test")
+    monkeypatch.setenv("ANTHROPIC_AUTH_TOKEN", "ambient-token")
+    client = create_anthropic_client()
+    assert client.api_key == "sk-test" and client.auth_token is None
+    await client.close()
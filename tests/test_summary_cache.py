@@ -0,0 +1,42 @@
+import pytest
+
+from app.cache import LRUCache, TieredCache
+from app.summary_cache import SummaryCache, request_fingerprint
+
+pytestmark = pytest.mark.asyncio
+
+REQUEST = {
+    "model": "claude",
+    "max_tokens": 1200,
+    "temperature": 0.2,
+    "system": "You are a copilot.",
+    "messages": [{"role": "user", "content": "Question: summarize\nStats: {}"}],
+}
+
+def counting_producer():
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        return f"summary #{len(calls)}"
+
+    return produce, calls
+
+async def test_fingerprint_is_stable_and_content_sensitive():
+    same = {k: REQUEST[k] for k in reversed(list(REQUEST))}
+    assert request_fingerprint(REQUEST) == request_fingerprint(same)
+    changed = {**REQUEST, "messages": [{"role": "user", "content": "Question: summarize\nStats: {\"loc\":1}"}]}
+    assert request_fingerprint(REQUEST) != request_fingerprint(changed)
+    assert request_fingerprint(REQUEST) != request_fingerprint({**REQUEST, "temperature": 0.0})
+
+async def test_cache_modes():
+    cache = SummaryCache(TieredCache(LRUCache(8)))
+    produce, calls = counting_producer()
+
+    assert await cache.get_or_create(REQUEST, produce) == "summary #1"
+    assert await cache.get_or_create(REQUEST, produce) == "summary #1"
+    assert await cache.get_or_create(REQUEST, produce, mode="bypass") == "summary #2"
+    assert await cache.get_or_create(REQUEST, produce) == "summary #1"
+    assert await cache.get_or_create(REQUEST, produce, mode="refresh") == "summary #3"
+    assert await cache.get_or_create(REQUEST, produce) == "summary #3"
+    assert len(calls) == 3
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from app import symbol_index
+from app.services import impact_service
+from app.services.impact_service import fetch_impact_analysis
+from app.symbol_index import SymbolIndex, SymbolIndexStore, object_symbols, write_symbol_file
+
+OBJECTS = [
+    {"id": "obj-1", "name": "OrderService", "fullName": "com.acme.service.OrderService", "type": "Java Class"},
+    {"id": "obj-2", "name": "OrderController", "fullName": "com.acme.web.OrderController", "type": "Java Class"},
+    {"id": "obj-3", "name": "PaymentGateway", "fullName": "com.acme.integration.PaymentGateway", "type": "Java Class"},
+    {"id": "obj-4", "name": "Mapper", "fullName": "com.acme.orders.Mapper", "type": "Java Class"},
+    {"id": "obj-5", "name": "Mapper", "fullName": "com.acme.billing.Mapper", "type": "Java Class"},
+    {"name": "NoId"},
+]
+
+@pytest.fixture
+def index(tmp_path):
+    path = str(tmp_path / "app.symidx")
+    write_symbol_file(path, object_symbols(OBJECTS))
+    index = SymbolIndex(path)
+    yield index
+    index.close()
+
+def test_exact_prefix_and_fuzzy_lookups(index):
+    assert [o["id"] for o in index.exact("orderservice")] == ["obj-1"]
+    assert [o["id"] for o in index.exact("COM.ACME.WEB.OrderController")] == ["obj-2"]
+    assert [o["id"] for o in index.exact("obj-3")] == ["obj-3"]
+    assert {o["id"] for o in index.prefix("Order")} == {"obj-1", "obj-2"}
+    assert index.fuzzy("PaymentGatway")[0]["id"] == "obj-3"
+    assert index.exact("NoId") == []
+
+def test_lookup_resolves_or_suggests(index):
+    assert index.lookup("OrderService")["object"]["id"] == "obj-1"
+    assert index.lookup("PaymentGate")["match"] == "prefix"
+    assert index.lookup("PaymentGatway")["match"] == "fuzzy"
+
+    ambiguous = index.lookup("Mapper")
+    assert ambiguous["match"] == "ambiguous" and ambiguous["object"] is None
+    assert {c["fullName"] for c in ambiguous["candidates"]} == {"com.acme.orders.Mapper", "com.acme.billing.Mapper"}
+
+    unknown = index.lookup("OrdrServise")
+    assert unknown["object"] is None and unknown["candidates"][0]["id"] == "obj-1"
+    assert index.complete("order", limit=3)[:2] == index.prefix("order")
+
+def test_file_rejects_foreign_content(tmp_path):
+    path = tmp_path / "bad.symidx"
+    path.write_bytes(b"not an index at all, just some bytes")
+    with pytest.raises(ValueError):
+        SymbolIndex(str(path))
+
+@pytest.mark.asyncio
+async def test_store_keys_indexes_by_delivery(tmp_path, monkeypatch):
+    store = SymbolIndexStore(str(tmp_path))
+    assert store.get("Payments", "2025-01-01", endpoint="e") is None
+    await store.build("Payments", "2025-01-01", OBJECTS, endpoint="e")
+    assert store.get("Payments", "2025-01-01", endpoint="e").exact("OrderService")
+    assert store.get("Payments", "2025-02-01", endpoint="e") is None
+
+    # Records are turned into symbols in the worker thread, not on the event loop.
+    threads = []
+    extract = symbol_index.object_symbols
+
+    def recording(records):
+        threads.append(threading.current_thread())
+        return extract(records)
+
+    monkeypatch.setattr(symbol_index, "object_symbols", recording)
+    await store.build("Payments", "2025-03-01", OBJECTS, endpoint="e")
+    assert threads and threads[0] is not threading.main_thread()
+
+    # A new store (process restart) maps the file again instead of rebuilding it.
+    assert SymbolIndexStore(str(tmp_path)).get("Payments", "2025-01-01", endpoint="e") is not None
+
+    store.invalidate_applications("e", {"Payments"})
+    assert list(tmp_path.iterdir()) == []
+    assert store.get("Payments", "2025-01-01", endpoint="e") is None
+
+@pytest.fixture
+def local_symbols(index, monkeypatch):
+    calls = []
+    original = impact_service.call_tool
+
+    async def recording_call_tool(session, tool, args):
+        calls.append((tool, args))
+        return await original(session, tool, args)
+
+    monkeypatch.setattr(impact_service, "application_symbols", lambda app: index)
+    monkeypatch.setattr(impact_service, "call_tool", recording_call_tool)
+    return calls
+
+@pytest.mark.asyncio
+async def test_impact_resolves_hints_locally_then_calls_object_details_once(local_symbols):
+    payload = await fetch_impact_analysis("What breaks?", object_hint="OrderServce", app_hint="Payments")
+    detail_calls = [args for tool, args in local_symbols if tool == "object_details"]
+    assert detail_calls == [{"app_id": "app1", "object_id": "obj-1"}]
+    assert payload["object_details"]["id"] == "obj-123"
+
+@pytest.mark.asyncio
+async def test_impact_on_unknown_object_fails_with_suggestions(local_symbols):
+    with pytest.raises(RuntimeError, match="Did you mean: com.acme.orders.Mapper"):
+        await fetch_impact_analysis("What breaks?", object_hint="Mapper", app_hint="Payments")
+    assert not [tool for tool, _ in local_symbols if tool == "object_details"]
@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+
+from app.tool_args import arg_mapping, build_args, first_success, object_hint_keys, shape_memory
+from app.tool_catalog import ToolCatalog
+from app.services.impact_service import _resolve_object_details
+
+OD_SCHEMA = {
+    "type": "object",
+    "properties": {"application": {"type": "string"}, "name": {"type": "string"}},
+    "required": ["application", "name"],
+}
+
+class RecordingSession:
+    """object_details that only answers to the `name` argument."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, tool_name, args):
+        self.calls.append(dict(args))
+        await asyncio.sleep(0.01 if "name" in args else 0)
+        if "name" in args:
+            return {"id": "obj-1", "name": args["name"]}
+        raise ValueError(f"unknown arguments {sorted(args)}")
+
+def test_args_follow_the_schema_spelling_and_drop_undeclared_parameters():
+    schema = {"properties": {"application_id": {}, "max_results": {}}}
+    assert build_args(arg_mapping(schema), schema, {"app_id": 7, "limit": 50, "granularity": "x"}) == {
+        "application_id": 7,
+        "max_results": 50,
+    }
+    # No schema: arguments pass through unchanged.
+    assert build_args(arg_mapping(None), None, {"app_id": 7, "limit": 50}) == {"app_id": 7, "limit": 50}
+    assert object_hint_keys(OD_SCHEMA) == ["name"]
+
+def test_catalog_keeps_schemas_and_shapes_args():
+    catalog = ToolCatalog(["object_details", "stats"], {"object_details": OD_SCHEMA})
+    assert catalog.schema("object_details") is OD_SCHEMA
+    assert catalog.args("object_details", app_id="app1") == {"application": "app1"}
+    assert catalog.args("stats", app_id="app1") == {"app_id": "app1"}
+
+@pytest.mark.asyncio
+async def test_schema_resolves_the_object_in_one_round_trip():
+    session = RecordingSession()
+    catalog = ToolCatalog(["object_details"], {"object_details": OD_SCHEMA})
+    result = await _resolve_object_details(session, catalog, "app1", "OrderService")
+    assert result["id"] == "obj-1"
+    assert session.calls == [{"application": "app1", "name": "OrderService"}]
+
+@pytest.mark.asyncio
+async def test_without_schema_shapes_are_probed_concurrently_then_remembered():
+    session = RecordingSession()
+    catalog = ToolCatalog(["object_details"])
+    result = await _resolve_object_details(session, catalog, "app1", "OrderService")
+    assert result["name"] == "OrderService"
+    assert len(session.calls) == len(object_hint_keys(None))
+    assert "name" in shape_memory.stats().values()
+
+    session.calls.clear()
+    await _resolve_object_details(session, catalog, "app1", "PaymentService")
+    assert session.calls == [{"app_id": "app1", "name": "PaymentService"}]
+
+@pytest.mark.asyncio
+async def test_first_success_reports_last_error_when_all_fail():
+    async def fail():
+        raise LookupError("nope")
+
+    label, result, error = await first_success([("a", fail), ("b", fail)])
+    assert label is None and result is None
+    assert isinstance(error, LookupError)
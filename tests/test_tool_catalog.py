@@ -0,0 +1,48 @@
+import pytest
+from types import SimpleNamespace
+
+from app.tool_catalog import ToolCatalog, ToolCatalogCache
+
+class CountingSession:
+    def __init__(self, names):
+        self.names = names
+        self.calls = 0
+
+    async def list_tools(self):
+        self.calls += 1
+        return SimpleNamespace(tools=[SimpleNamespace(name=n) for n in self.names])
+
+def test_catalog_precomputes_resolution_map():
+    catalog = ToolCatalog(["bb7_applications", "bb7_stats", "bb7_datagraphs_involving_object"])
+    assert catalog.resolve("applications") == "bb7_applications"
+    assert catalog.resolve("stats") == "bb7_stats"
+    assert catalog.resolve("packages") is None
+    assert catalog.base_name("bb7_stats") == "stats"
+
+def test_optional_tools_resolve_without_fuzzy_matching():
+    catalog = ToolCatalog(["bb7_object_details", "bb7_object_callers"])
+    assert catalog.resolve("object_callers") == "bb7_object_callers"
+    assert catalog.resolve("objects") is None  # not object_details
+    assert ToolCatalog(["bb7_objects"]).resolve("objects") == "bb7_objects"
+
+@pytest.mark.asyncio
+async def test_cache_hits_until_ttl_or_invalidation():
+    session = CountingSession(["applications", "stats"])
+    cache = ToolCatalogCache(ttl=60)
+    first = await cache.get(session, key="http://imaging/mcp/")
+    second = await cache.get(session, key="http://imaging/mcp/")
+    assert first is second
+    assert session.calls == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+    cache.invalidate("http://imaging/mcp/")
+    await cache.get(session, key="http://imaging/mcp/")
+    assert session.calls == 2
+
+@pytest.mark.asyncio
+async def test_cache_refreshes_expired_catalog():
+    session = CountingSession(["applications"])
+    cache = ToolCatalogCache(ttl=0)
+    await cache.get(session, key="k")
+    await cache.get(session, key="k")
+    assert session.calls == 2
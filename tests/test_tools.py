@@ -22,3 +22,8 @@ def test_normalize_app_id_prefers_id():
 def test_normalize_app_id_fallbacks():
     assert normalize_app_id({"applicationId": "X"}) == "X"
     assert normalize_app_id({"name": "Y"}) == "Y"
+
+def test_match_tool_name_without_fuzzy():
+    names = ["bb7_object_details", "bb7_objects"]
+    assert match_tool_name(names, "objects", fuzzy=False) == "bb7_objects"
+    assert match_tool_name(["bb7_object_details"], "objects", fuzzy=False) is None
@@ -0,0 +1,76 @@
+import asyncio
+import httpx
+import pytest
+
+from app.warmup import Warmup, prefetch_all
+
+pytestmark = pytest.mark.asyncio
+
+async def test_steps_run_in_order_and_failures_degrade():
+    order = []
+
+    async def first():
+        order.append("first")
+        return {"sessions": 2}
+
+    async def broken():
+        order.append("broken")
+        raise RuntimeError("imaging down")
+
+    async def last():
+        order.append("last")
+
+    warmup = Warmup(timeout=5)
+    assert not warmup.ready
+    await warmup.run([("first", first), ("broken", broken), ("last", last)])
+
+    assert order == ["first", "broken", "last"]
+    assert warmup.status == "degraded" and warmup.ready
+    report = warmup.report()
+    assert report["steps"]["first"]["result"] == {"sessions": 2}
+    assert report["steps"]["broken"]["error"] == "imaging down"
+    assert report["steps"]["last"]["status"] == "ok"
+
+async def test_timeout_still_reports_ready():
+    warmup = Warmup(timeout=0.05)
+    await warmup.run([("slow", lambda: asyncio.sleep(5))])
+    assert warmup.status == "timed_out"
+    assert warmup.ready
+
+async def test_prefetch_all_only_fails_when_every_prefetch_fails():
+    async def prefetch(name):
+        if name == "Broken":
+            raise ValueError("no such app")
+
+    assert await prefetch_all(["Payments", "Broken"], prefetch) == {
+        "Payments": "ok",
+        "Broken": "error: no such app",
+    }
+    with pytest.raises(RuntimeError):
+        await prefetch_all(["Broken"], prefetch)
+
+async def test_readiness_follows_warmup_and_liveness_does_not(monkeypatch):
+    import app.api.main as api_main
+
+    class FakePool:
+        size = 1
+
+        async def start(self):
+            pass
+
+        def stats(self):
+            return {"size": 1}
+
+    warmup = Warmup(timeout=5)
+    monkeypatch.setattr(api_main, "warmup", warmup)
+
+    transport = httpx.ASGITransport(app=api_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/livez")).status_code == 200
+        assert (await client.get("/readyz")).status_code == 503
+
+        await warmup.run(api_main._warmup_steps(FakePool()))
+        resp = await client.get("/readyz")
+        assert resp.status_code == 200
+        steps = resp.json()["steps"]
+        assert steps["tool_catalog_and_inventory"]["result"] == {"tools": 12, "applications": 1}